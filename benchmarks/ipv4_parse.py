@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Compare the single-pass :func:`iptools.ipv4.ip2long` parser with the regex
+based implementation it replaced.
+
+Run from the root of the source tree::
+
+    python benchmarks/ipv4_parse.py
+"""
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..')))
+
+from iptools import ipv4  # noqa: E402
+
+_DOTTED_QUAD_RE = re.compile(r'^(\d{1,3}\.){0,3}\d{1,3}$')
+
+
+def legacy_validate_ip(s):
+    if _DOTTED_QUAD_RE.match(s):
+        quads = s.split('.')
+        for q in quads:
+            if int(q) > 255:
+                return False
+        return True
+    return False
+
+
+def legacy_ip2long(ip):
+    if not legacy_validate_ip(ip):
+        return None
+    quads = ip.split('.')
+    if len(quads) == 1:
+        quads = quads + [0, 0, 0]
+    elif len(quads) < 4:
+        host = quads[-1:]
+        quads = quads[:-1] + [0, ] * (4 - len(quads)) + host
+
+    lngip = 0
+    for q in quads:
+        lngip = (lngip << 8) | int(q)
+    return lngip
+
+
+SAMPLES = (
+    '127.0.0.1',
+    '192.168.100.254',
+    '10.1',
+    '255.255.255.255',
+    '256.1.1.1',
+    'not an ip',
+)
+
+
+def bench(label, func, number=200000):
+    best = min(timeit.repeat(
+        lambda: [func(ip) for ip in SAMPLES], repeat=5, number=number))
+    per_call = best / (number * len(SAMPLES)) * 1e9
+    print('%-28s %8.1f ns/call' % (label, per_call))
+    return per_call
+
+
+def main():
+    for ip in SAMPLES:
+        assert legacy_ip2long(ip) == ipv4.ip2long(ip), ip
+
+    old = bench('regex ip2long', legacy_ip2long)
+    new = bench('single-pass ip2long', ipv4.ip2long)
+    strict = bench(
+        'single-pass ip2long strict', lambda ip: ipv4.ip2long(ip, True))
+    print('speedup: %.1fx (strict %.1fx)' % (old / new, old / strict))
+
+
+if __name__ == '__main__':
+    main()
@@ -44,28 +44,755 @@ except ImportError:
     Sequence = object
 # end compatibility "fixes'
 
+import collections
+import itertools
+import threading
+from bisect import bisect_right
+
+try:
+    import numpy
+except ImportError:
+    # numpy is optional and only needed for vectorized lookups
+    numpy = None
+
 from . import ipv4
 from . import ipv6
 
+#: Types parsed as address text. Binary values must hold ASCII text.
+_ADDRESS_TYPES = (basestring, bytes) + ipv4._BUFFERS
+
+#: Colon to search bytes addresses for. Finding an int is much faster than
+#: finding a one byte string on python3.
+_BYTES_COLON = b':' if bytes is str else ord(':')
+
 __version__ = '0.7.0'
 
 __all__ = (
+    'disable_parse_cache',
+    'enable_parse_cache',
+    'get_parse_cache',
+    'IpAddress',
     'IpRange',
     'IpRangeList',
+    'IpRangeSlice',
+    'ParseCache',
 )
 
+#: Statistics reported by :meth:`ParseCache.info`
+CacheInfo = collections.namedtuple(
+    'CacheInfo', 'hits misses evictions maxsize currsize')
+
+
+class ParseCache (object):
+    """
+    Bounded least recently used cache of parsed address strings.
+
+    Maps address strings to ``(integer, family)`` tuples where family is
+    ``4`` or ``6``. Invalid addresses are not cached. The cache is safe to
+    share between threads; parsing a missed address happens outside of the
+    lock.
+
+
+    >>> cache = ParseCache(maxsize=2)
+    >>> cache.lookup('127.0.0.1')
+    (2130706433, 4)
+    >>> cache.lookup('::1')
+    (1, 6)
+    >>> cache.lookup('127.0.0.1')
+    (2130706433, 4)
+    >>> cache.lookup('10.0.0.1')
+    (167772161, 4)
+    >>> cache.lookup('invalid') is None
+    True
+    >>> cache.info()
+    CacheInfo(hits=1, misses=4, evictions=1, maxsize=2, currsize=2)
+    >>> cache.clear()
+    >>> cache.info()
+    CacheInfo(hits=0, misses=0, evictions=0, maxsize=2, currsize=0)
+
+
+    :param maxsize: Maximum number of addresses to keep.
+    :type maxsize: int
+    """
+    def __init__(self, maxsize=4096):
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1')
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+    # end __init__
+
+    def lookup(self, address):
+        """
+        Parse an address, using the cached result if there is one.
+
+        :param address: Ip address string.
+        :type address: str, bytes, bytearray or memoryview
+        :returns: ``(integer, family)`` tuple or ``None`` if the address is
+            invalid.
+        """
+        if isinstance(address, ipv4._BUFFERS):
+            # unhashable or bound to a larger buffer
+            address = ipv4._buffer2bytes(address)
+        with self._lock:
+            try:
+                # re-insert to mark as most recently used
+                parsed = self._data.pop(address)
+            except KeyError:
+                self.misses += 1
+            else:
+                self._data[address] = parsed
+                self.hits += 1
+                return parsed
+
+        parsed = _parse_address(address)
+        if parsed is None:
+            return None
+
+        with self._lock:
+            self._data[address] = parsed
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return parsed
+    # end lookup
+
+    def clear(self):
+        """
+        Remove all cached addresses and reset the statistics.
+        """
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+    # end clear
+
+    def info(self):
+        """
+        Report cache statistics.
+
+        :returns: :data:`CacheInfo` of hits, misses, evictions, maxsize and
+            currsize.
+        """
+        with self._lock:
+            return CacheInfo(
+                self.hits, self.misses, self.evictions, self.maxsize,
+                len(self._data))
+    # end info
+
+    def __len__(self):
+        return len(self._data)
+    # end __len__
+# end class ParseCache
+
+
+#: Cache used by :func:`_address2long`, ``None`` when disabled
+_parse_cache = None
+
+
+def enable_parse_cache(maxsize=4096):
+    """
+    Cache the results of parsing address strings for membership tests and
+    range construction.
+
+    Replaces any cache that was already enabled.
+
+
+    >>> private = IpRangeList('10/8', '172.16/12', '192.168/16')
+    >>> cache = enable_parse_cache(maxsize=16)
+    >>> '10.0.0.1' in private
+    True
+    >>> '10.0.0.1' in private
+    True
+    >>> cache.info()
+    CacheInfo(hits=1, misses=1, evictions=0, maxsize=16, currsize=1)
+    >>> get_parse_cache() is cache
+    True
+    >>> disable_parse_cache()
+    >>> get_parse_cache() is None
+    True
+
+
+    :param maxsize: Maximum number of addresses to keep.
+    :type maxsize: int
+    :returns: The new :class:`ParseCache`.
+    """
+    global _parse_cache
+    _parse_cache = ParseCache(maxsize)
+    return _parse_cache
+# end enable_parse_cache
+
+
+def disable_parse_cache():
+    """
+    Stop caching the results of parsing address strings.
+    """
+    global _parse_cache
+    _parse_cache = None
+# end disable_parse_cache
+
+
+def get_parse_cache():
+    """
+    Get the active parse cache.
+
+    :returns: The active :class:`ParseCache` or ``None`` if disabled.
+    """
+    return _parse_cache
+# end get_parse_cache
+
+
+def _binary2text(value):
+    """
+    Convert a binary range specification to text.
+
+    The CIDR and netmask patterns only match text. Bytes other than ASCII
+    are kept as their latin-1 characters so they fail to parse like any
+    other invalid text.
+
+
+    >>> print(_binary2text(memoryview(b'10/8')))
+    10/8
+    >>> print(_binary2text('::1'))
+    ::1
+    """
+    if isinstance(value, ipv4._BUFFERS):
+        value = ipv4._buffer2bytes(value)
+    if isinstance(value, bytes) and not isinstance(value, str):
+        value = value.decode('latin-1')
+    return value
+# end _binary2text
+
+
+def _parse_address(address):
+    """
+    Convert an address string to an ``(integer, family)`` tuple.
+
+    The address family is chosen from the separators present in the string.
+    Any ':' means IPv6 (including addresses with an embedded dotted-quad),
+    anything else can only be IPv4.
+
+
+    >>> _parse_address('127.0.0.1')
+    (2130706433, 4)
+    >>> _parse_address('::ffff:127.0.0.1')
+    (281472812449793, 6)
+    >>> _parse_address('invalid') is None
+    True
+    >>> _parse_address(memoryview(b'::1'))
+    (1, 6)
+    """
+    if isinstance(address, ipv4._BUFFERS):
+        address = ipv4._buffer2bytes(address)
+    if (_BYTES_COLON if isinstance(address, bytes) else ':') in address:
+        parsed = ipv6.ip2long(address)
+        return None if parsed is None else (parsed, 6)
+    parsed = ipv4.ip2long(address)
+    return None if parsed is None else (parsed, 4)
+# end _parse_address
+
 
 def _address2long(address):
     """
     Convert an address string to a long.
+
+    Uses the parse cache when one is enabled with
+    :func:`enable_parse_cache`.
+
+
+    >>> _address2long('127.0.0.1')
+    2130706433
+    >>> _address2long('::ffff:127.0.0.1')
+    281472812449793
+    >>> _address2long('invalid') is None
+    True
     """
-    parsed = ipv4.ip2long(address)
-    if parsed is None:
-        parsed = ipv6.ip2long(address)
-    return parsed
+    cache = _parse_cache
+    if cache is not None:
+        parsed = cache.lookup(address)
+    else:
+        parsed = _parse_address(address)
+    return None if parsed is None else parsed[0]
 # end _addess2long
 
 
+def _merge_ranges(pairs):
+    """
+    Sort a sequence of ``(start, end)`` pairs and merge the ones that overlap
+    or are adjacent.
+
+
+    >>> _merge_ranges([(10, 20), (1, 5), (15, 30), (6, 8), (40, 40)])
+    [[1, 8], [10, 30], [40, 40]]
+    >>> _merge_ranges([])
+    []
+
+
+    :param pairs: Iterable of ``(start, end)`` integer pairs.
+    :type pairs: iterable
+    :returns: Sorted list of disjoint ``[start, end]`` pairs.
+    """
+    merged = []
+    for start, end in sorted(pairs):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+# end _merge_ranges
+
+
+def _combine_ranges(a, b, keep):
+    """
+    Combine two lists of disjoint ``(start, end)`` pairs with a sweep over
+    their sorted endpoints.
+
+    `keep` is called with whether the current position is in `a` and in `b`
+    and decides whether it is part of the result.
+
+
+    >>> a, b = [(1, 10), (20, 30)], [(5, 25)]
+    >>> _combine_ranges(a, b, lambda x, y: x or y)
+    [(1, 30)]
+    >>> _combine_ranges(a, b, lambda x, y: x and y)
+    [(5, 10), (20, 25)]
+    >>> _combine_ranges(a, b, lambda x, y: x and not y)
+    [(1, 4), (26, 30)]
+    >>> _combine_ranges(a, b, lambda x, y: x != y)
+    [(1, 4), (11, 19), (26, 30)]
+
+
+    :param a: Sorted disjoint ``(start, end)`` pairs.
+    :param b: Sorted disjoint ``(start, end)`` pairs.
+    :param keep: Predicate of membership in `a` and `b`.
+    :returns: Sorted list of disjoint, non-adjacent ``(start, end)`` pairs.
+    """
+    # (position, set, +1 for entering or -1 for leaving the set)
+    events = []
+    for which, pairs in ((0, a), (1, b)):
+        for start, end in pairs:
+            events.append((start, which, 1))
+            events.append((end + 1, which, -1))
+    events.sort()
+
+    depth = [0, 0]
+    result = []
+    start = None
+    i, n = 0, len(events)
+    while i < n:
+        position = events[i][0]
+        # apply every event at this position before testing membership
+        while i < n and events[i][0] == position:
+            depth[events[i][1]] += events[i][2]
+            i += 1
+        inside = keep(depth[0] > 0, depth[1] > 0)
+        if inside and start is None:
+            start = position
+        elif not inside and start is not None:
+            result.append((start, position - 1))
+            start = None
+    return result
+# end _combine_ranges
+
+
+class _RangeIndex (object):
+    """
+    Sorted, merged interval index for fast membership tests.
+
+    The ranges are coalesced at construction time and stored as two parallel
+    sorted lists of boundaries which are searched with :func:`bisect`.
+
+
+    >>> idx = _RangeIndex([(10, 20), (1, 5), (15, 30)])
+    >>> idx.starts, idx.ends
+    ([1, 10], [5, 30])
+    >>> 3 in idx
+    True
+    >>> 7 in idx
+    False
+    >>> 30 in idx
+    True
+    >>> 0 in _RangeIndex([])
+    False
+
+
+    :param pairs: Iterable of ``(start, end)`` integer pairs.
+    :type pairs: iterable
+    """
+    __slots__ = ('starts', 'ends', '_arrays', '_packed')
+
+    def __init__(self, pairs):
+        merged = _merge_ranges(pairs)
+        self.starts = [start for start, end in merged]
+        self.ends = [end for start, end in merged]
+        self._arrays = None
+        self._packed = None
+    # end __init__
+
+    def __contains__(self, item):
+        pos = bisect_right(self.starts, item) - 1
+        return pos >= 0 and item <= self.ends[pos]
+    # end __contains__
+
+    def contains_array(self, values):
+        """
+        Vectorized membership test for a numpy ``uint64`` or
+        :data:`iptools.ipv6.ARRAY_DTYPE` array.
+
+        The boundaries are converted to numpy arrays on first use. For
+        ``uint64`` input, ranges starting above the largest 64-bit value can
+        never match and are left out. For :data:`iptools.ipv6.ARRAY_DTYPE`
+        input the boundaries and values are compared as packed 16 byte
+        strings, which sort in numeric order.
+
+        :param values: Integers to look up.
+        :type values: numpy.ndarray
+        :returns: ``bool`` array which is ``True`` where the value is in the
+            index.
+        """
+        if values.dtype == ipv6.ARRAY_DTYPE:
+            if self._packed is None:
+                self._packed = (
+                    ipv6.long2array(self.starts).view('S16'),
+                    ipv6.long2array(self.ends).view('S16'))
+            starts, ends = self._packed
+            values = numpy.ascontiguousarray(values).view('S16')
+        else:
+            if self._arrays is None:
+                limit = 0xffffffffffffffff
+                count = bisect_right(self.starts, limit)
+                self._arrays = (
+                    numpy.array(self.starts[:count], dtype=numpy.uint64),
+                    numpy.array(
+                        [min(end, limit) for end in self.ends[:count]],
+                        dtype=numpy.uint64))
+            starts, ends = self._arrays
+        if not len(starts):
+            return numpy.zeros(values.shape, dtype=bool)
+        pos = numpy.searchsorted(starts, values, side='right') - 1
+        found = pos >= 0
+        return found & (values <= ends[numpy.maximum(pos, 0)])
+    # end contains_array
+
+    def __len__(self):
+        return len(self.starts)
+    # end __len__
+# end class _RangeIndex
+
+
+def _contains_array(v4, v6, values):
+    """
+    Vectorized membership test of a numpy integer or
+    :data:`iptools.ipv6.ARRAY_DTYPE` array against a pair of IPv4 and IPv6
+    range indexes.
+
+    IPv4 mapped IPv6 values get a second lookup in the IPv4 index after
+    being downcast, just like :meth:`IpRange._cast` does for single values.
+    """
+    if values.dtype == ipv6.ARRAY_DTYPE:
+        found = v4.contains_array(values)
+        found |= v6.contains_array(values)
+        mapped = (values['hi'] == 0) & \
+            (values['lo'] >> numpy.uint64(32) == numpy.uint64(0xffff))
+        if mapped.any():
+            downcast = numpy.zeros(
+                numpy.count_nonzero(mapped), dtype=ipv6.ARRAY_DTYPE)
+            downcast['lo'] = values['lo'][mapped] & numpy.uint64(ipv4.MAX_IP)
+            found[mapped] |= v4.contains_array(downcast)
+        return found
+
+    longs = values.astype(numpy.uint64)
+    found = v4.contains_array(longs)
+    found |= v6.contains_array(longs)
+    mapped = (longs >= _IPV6_MAPPED_IPV4.startIp) & \
+        (longs <= _IPV6_MAPPED_IPV4.endIp)
+    if mapped.any():
+        found[mapped] |= v4.contains_array(
+            longs[mapped] & numpy.uint64(ipv4.MAX_IP))
+    if values.dtype.kind == 'i':
+        found &= values >= 0
+    return found
+# end _contains_array
+
+
+def _contains_many(container, v4, v6, values):
+    """
+    Shared implementation of :meth:`IpRange.contains_many` and
+    :meth:`IpRangeList.contains_many`.
+    """
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        if values.dtype.kind in 'ui' or values.dtype == ipv6.ARRAY_DTYPE:
+            return _contains_array(v4, v6, values)
+        return numpy.array(
+            [v in container for v in values.flat], dtype=bool
+        ).reshape(values.shape)
+    return [v in container for v in values]
+# end _contains_many
+
+
+def _aligned_blocks(start, stop, size=4096):
+    """
+    Split ``range(start, stop)`` into ranges that do not cross a multiple of
+    `size`, which must be a power of two.
+
+
+    >>> [(r[0], r[-1]) for r in _aligned_blocks(4094, 8200)]
+    [(4094, 4095), (4096, 8191), (8192, 8199)]
+    """
+    mask = size - 1
+    while start < stop:
+        block_stop = min((start | mask) + 1, stop)
+        yield ipv4._long_range(start, block_stop)
+        start = block_stop
+# end _aligned_blocks
+
+
+def _iter_batches(ranges, size, as_strings):
+    """
+    Yield lists of up to `size` consecutive addresses from `ranges`.
+
+    Batches are filled across range boundaries so only the last batch can be
+    short.
+    """
+    if size < 1:
+        raise ValueError('size must be at least 1')
+    batch = []
+    for r in ranges:
+        convert = r._ipver.long2ip_many if as_strings else list
+        start, stop = r.startIp, r.endIp + 1
+        while start < stop:
+            end = min(stop, start + size - len(batch))
+            if batch:
+                batch.extend(convert(ipv4._long_range(start, end)))
+            else:
+                batch = convert(ipv4._long_range(start, end))
+            start = end
+            if len(batch) == size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+# end _iter_batches
+
+
+def _cast(ipver, item):
+    """
+    Convert `item` to an integer address for comparison with ranges of the
+    `ipver` address family.
+    """
+    if isinstance(item, IpAddress):
+        if item._v4 is not None and ipv4 == ipver:
+            return item._v4
+        return item.value
+    if isinstance(item, _ADDRESS_TYPES):
+        item = _address2long(item)
+    if type(item) not in (type(1), type(ipv4.MAX_IP), type(ipv6.MAX_IP)):
+        raise TypeError(
+            "expected ip address, 32-bit integer or 128-bit integer")
+
+    if ipv4 == ipver and item > ipv4.MAX_IP:
+        # casting an ipv6 in an ipv4 range
+        # downcast to ipv4 iff address is in the IPv4 mapped block
+        if item in _IPV6_MAPPED_IPV4:
+            item = item & ipv4.MAX_IP
+    # end if
+
+    return item
+# end _cast
+
+
+def _address_families(item):
+    """
+    Split an address into the values to look up in IPv4 and IPv6 tables.
+
+    IPv4-mapped IPv6 addresses have both values. Integers are IPv4 if they
+    fit in 32 bits.
+
+
+    >>> _address_families('127.0.0.1')
+    (2130706433, None)
+    >>> _address_families('::ffff:127.0.0.1')
+    (2130706433, 281472812449793)
+    >>> _address_families(IpAddress('::1'))
+    (None, 1)
+
+
+    :param item: Ip address.
+    :type item: str, int or IpAddress
+    :returns: Tuple of IPv4 and IPv6 integer values, either may be ``None``.
+    :raises: TypeError
+    """
+    if isinstance(item, IpAddress):
+        value, version = item.value, item.version
+    elif isinstance(item, _ADDRESS_TYPES):
+        cache = _parse_cache
+        parsed = _parse_address(item) if cache is None else cache.lookup(item)
+        if parsed is None:
+            raise TypeError(
+                "expected ip address, 32-bit integer or 128-bit integer")
+        value, version = parsed
+    else:
+        value = _cast(ipv6, item)
+        if value < 0 or value > ipv6.MAX_IP:
+            raise TypeError(
+                "expected ip address, 32-bit integer or 128-bit integer")
+        version = 4 if value <= ipv4.MAX_IP else 6
+
+    if version == 4:
+        return value, None
+    if value >> 32 == 0xffff:
+        return value & ipv4.MAX_IP, value
+    return None, value
+# end _address_families
+
+
+class IpAddress (object):
+    """
+    Parsed ip address.
+
+    Parse an address once and reuse it for membership tests against any
+    number of :class:`IpRange` and :class:`IpRangeList` objects. Instances
+    are immutable and hashable.
+
+
+    >>> ip = IpAddress('::ffff:192.0.2.128')
+    >>> ip
+    IpAddress('::ffff:c000:280')
+    >>> ip.value, ip.version
+    (281473902969472, 6)
+    >>> ip in IpRange('192.0.2.0/24')
+    True
+    >>> ip in IpRangeList('10/8', '::ffff:0:0/96')
+    True
+    >>> IpRange('192.0.2.0/24').index(ip)
+    128
+    >>> IpAddress(2130706433)
+    IpAddress('127.0.0.1')
+    >>> IpAddress(1, 6)
+    IpAddress('::1')
+    >>> IpAddress('invalid')
+    Traceback (most recent call last):
+        ...
+    ValueError: invalid ip address 'invalid'
+    >>> ip.value = 1
+    Traceback (most recent call last):
+        ...
+    AttributeError: IpAddress is immutable
+
+
+    :param address: Ip address string, integer or :class:`IpAddress`. Binary
+        strings must hold ASCII text.
+    :type address: str, bytes, bytearray, memoryview or int
+    :param version: Address family of an integer address, ``4`` or ``6``.
+        Defaults to the smallest family that can hold the value.
+    :type version: int
+    :raises: TypeError, ValueError
+    """
+    __slots__ = ('value', 'version', '_v4')
+
+    def __init__(self, address, version=None):
+        if isinstance(address, IpAddress):
+            value, version = address.value, address.version
+
+        elif isinstance(address, _ADDRESS_TYPES):
+            cache = _parse_cache
+            if cache is not None:
+                parsed = cache.lookup(address)
+            else:
+                parsed = _parse_address(address)
+            if parsed is None:
+                raise ValueError('invalid ip address %r' % (address,))
+            value, version = parsed
+
+        elif type(address) in (type(1), type(ipv4.MAX_IP), type(ipv6.MAX_IP)):
+            value = address
+            if version is None:
+                version = 4 if value <= ipv4.MAX_IP else 6
+            if version not in (4, 6):
+                raise ValueError('version must be 4 or 6')
+            max_ip = ipv4.MAX_IP if version == 4 else ipv6.MAX_IP
+            if value < 0 or value > max_ip:
+                raise ValueError(
+                    'address out of range for IPv%d' % version)
+
+        else:
+            raise TypeError(
+                "expected ip address, 32-bit integer or 128-bit integer")
+
+        if version == 4:
+            v4 = value
+        elif value >> 32 == 0xffff:
+            # IPv4 mapped IPv6 address
+            v4 = value & ipv4.MAX_IP
+        else:
+            v4 = None
+
+        object.__setattr__(self, 'value', value)
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, '_v4', v4)
+    # end __init__
+
+    def __setattr__(self, name, value):
+        raise AttributeError('IpAddress is immutable')
+    # end __setattr__
+
+    def __delattr__(self, name):
+        raise AttributeError('IpAddress is immutable')
+    # end __delattr__
+
+    def __reduce__(self):
+        return (IpAddress, (self.value, self.version))
+    # end __reduce__
+
+    def __repr__(self):
+        return 'IpAddress(%r)' % (str(self),)
+    # end __repr__
+
+    def __str__(self):
+        """
+        >>> str(IpAddress('127.0.0.1'))
+        '127.0.0.1'
+        >>> str(IpAddress('::ffff:127.0.0.1'))
+        '::ffff:7f00:1'
+        """
+        if self.version == 4:
+            return ipv4.long2ip(self.value)
+        return ipv6.long2ip(self.value)
+    # end __str__
+
+    def __int__(self):
+        return self.value
+    # end __int__
+
+    __index__ = __int__
+
+    def __eq__(self, other):
+        """
+        >>> IpAddress('127.0.0.1') == IpAddress(2130706433)
+        True
+        >>> IpAddress('0.0.0.1') == IpAddress('::1')
+        False
+        """
+        return isinstance(other, IpAddress) and \
+            self.value == other.value and \
+            self.version == other.version
+    # end __eq__
+
+    def __ne__(self, other):
+        return not self == other
+    # end __ne__
+
+    def __hash__(self):
+        return hash((self.value, self.version))
+    # end __hash__
+# end class IpAddress
+
+
 class IpRange (Sequence):
     """
     Range of ip addresses.
@@ -124,15 +851,20 @@ class IpRange (Sequence):
 
     :param start: Ip address in dotted quad format, CIDR notation, subnet
         format or ``(start, end)`` tuple of ip addresses in dotted quad format.
-    :type start: str or tuple
+        Binary strings must hold ASCII text.
+    :type start: str, bytes, bytearray, memoryview or tuple
     :param end: Ip address in dotted quad format or ``None``.
-    :type end: str
+    :type end: str, bytes, bytearray or memoryview
     """
+    __slots__ = ('startIp', 'endIp', '_len', '_ipver')
+
     def __init__(self, start, end=None):
         if end is None:
+            start = _binary2text(start)
             if isinstance(start, IpRange):
                 # copy constructor
-                start, end = start[0], start[-1]
+                self._set_longs(start.startIp, start.endIp, start._ipver)
+                return
 
             elif isinstance(start, tuple):
                 # occurs when IpRangeList calls via map to pass start and end
@@ -154,16 +886,82 @@ class IpRange (Sequence):
                 # degenerate range
                 end = start
 
-        start = _address2long(start)
-        end = _address2long(end)
+        self._set_longs(_address2long(start), _address2long(end))
+    # end __init__
+
+    @classmethod
+    def from_longs(cls, start, end, version=None):
+        """
+        Create a range directly from integer start and end addresses.
+
+        Skips all string parsing. When `version` is ``None`` the address
+        family is chosen the same way as for string input: ranges ending
+        above :data:`ipv4.MAX_IP` are IPv6, all others are IPv4.
+
+
+        >>> IpRange.from_longs(2130706432, 2147483647)
+        IpRange('127.0.0.0', '127.255.255.255')
+        >>> IpRange.from_longs(1, 1, 6)
+        IpRange('::1', '::1')
+        >>> IpRange.from_longs(2**32, 0, 4)
+        Traceback (most recent call last):
+            ...
+        ValueError: address out of range for IPv4
+
+
+        :param start: Start address.
+        :type start: int
+        :param end: End address.
+        :type end: int
+        :param version: Address family, ``4``, ``6`` or ``None``.
+        :type version: int
+        :returns: New :class:`IpRange`.
+        :raises: TypeError, ValueError
+        """
+        if version is None:
+            ipver = None
+            max_ip = ipv6.MAX_IP
+        elif version == 4:
+            ipver = ipv4
+            max_ip = ipv4.MAX_IP
+        elif version == 6:
+            ipver = ipv6
+            max_ip = ipv6.MAX_IP
+        else:
+            raise ValueError('version must be 4, 6 or None')
+
+        for lngip in (start, end):
+            if type(lngip) not in (
+                    type(1), type(ipv4.MAX_IP), type(ipv6.MAX_IP)):
+                raise TypeError('expected 32-bit or 128-bit integer')
+            if lngip < 0 or lngip > max_ip:
+                raise ValueError(
+                    'address out of range for IPv%d' % (version or 6))
+
+        self = cls.__new__(cls)
+        self._set_longs(start, end, ipver)
+        return self
+    # end from_longs
+
+    def _set_longs(self, start, end, ipver=None):
         self.startIp = min(start, end)
         self.endIp = max(start, end)
         self._len = self.endIp - self.startIp + 1
+        if ipver is None:
+            ipver = ipv6 if self.endIp > ipv4.MAX_IP else ipv4
+        self._ipver = ipver
+    # end _set_longs
 
-        self._ipver = ipv4
-        if self.endIp > ipv4.MAX_IP:
-            self._ipver = ipv6
-    # end __init__
+    def __reduce__(self):
+        """
+        >>> import pickle
+        >>> pickle.loads(pickle.dumps(IpRange.from_longs(1, 1, 6)))
+        IpRange('::1', '::1')
+        """
+        version = 4 if self._ipver is ipv4 else 6
+        return (_range_from_longs,
+                (type(self), self.startIp, self.endIp, version))
+    # end __reduce__
 
     def __repr__(self):
         """
@@ -240,20 +1038,7 @@ class IpRange (Sequence):
     # end __hash__
 
     def _cast(self, item):
-        if isinstance(item, basestring):
-            item = _address2long(item)
-        if type(item) not in (type(1), type(ipv4.MAX_IP), type(ipv6.MAX_IP)):
-            raise TypeError(
-                "expected ip address, 32-bit integer or 128-bit integer")
-
-        if ipv4 == self._ipver and item > ipv4.MAX_IP:
-            # casting an ipv6 in an ipv4 range
-            # downcast to ipv4 iff address is in the IPv4 mapped block
-            if item in _IPV6_MAPPED_IPV4:
-                item = item & ipv4.MAX_IP
-        # end if
-
-        return item
+        return _cast(self._ipver, item)
     # end _cast
 
     def index(self, item):
@@ -314,6 +1099,30 @@ class IpRange (Sequence):
         return self.startIp <= item <= self.endIp
     # end __contains__
 
+    def contains_many(self, values):
+        """
+        Test many addresses for membership in the range at once.
+
+        See :meth:`IpRangeList.contains_many` for the accepted inputs.
+
+
+        >>> r = IpRange('127/8')
+        >>> r.contains_many(['127.0.0.1', '::ffff:127.0.0.1', '10.0.0.1'])
+        [True, True, False]
+
+
+        :param values: Addresses to test.
+        :type values: numpy.ndarray or iterable of str and/or int
+        :returns: Mask which is ``True`` where the address is in the range.
+        :raises: TypeError
+        """
+        index = _RangeIndex(((self.startIp, self.endIp),))
+        empty = _RangeIndex(())
+        if ipv4 == self._ipver:
+            return _contains_many(self, index, empty, values)
+        return _contains_many(self, empty, index, values)
+    # end contains_many
+
     def __getitem__(self, index):
         """
         >>> r = IpRange('127.0.0.1', '127.255.255.255')
@@ -341,14 +1150,17 @@ class IpRange (Sequence):
         >>> r[:-2]
         IpRange('127.0.0.1', '127.255.255.253')
         >>> r[::2]
-        Traceback (most recent call last):
-            ...
-        ValueError: slice step not supported
+        IpRangeSlice('127.0.0.1', 2, 8388608)
+        >>> r[::2][-1]
+        '127.255.255.255'
         """
         if isinstance(index, slice):
             if index.step not in (None, 1):
-                # TODO: return an IpRangeList
-                raise ValueError('slice step not supported')
+                # lazy view, the range may be far too large to materialize
+                start, stop, step = _slice_indices(index, self._len)
+                return IpRangeSlice._from_longs(
+                    self.startIp + start, step,
+                    _slice_len(start, stop, step), self._ipver)
             start = index.start or 0
             if start < 0:
                 start = max(0, start + self._len)
@@ -360,9 +1172,10 @@ class IpRange (Sequence):
                 stop = max(start, stop + self._len)
             if stop > self._len:
                 raise IndexError('stop index out of range')
-            return IpRange(
-                self._ipver.long2ip(self.startIp + start),
-                self._ipver.long2ip(self.startIp + stop - 1))
+            r = IpRange.__new__(IpRange)
+            r._set_longs(
+                self.startIp + start, self.startIp + stop - 1, self._ipver)
+            return r
 
         else:
             if index < 0:
@@ -387,14 +1200,353 @@ class IpRange (Sequence):
             ...
         StopIteration
         """
-        i = self.startIp
-        while i <= self.endIp:
-            yield self._ipver.long2ip(i)
-            i += 1
+        # format aligned blocks of consecutive addresses so the text shared
+        # by neighbouring addresses is only formatted once per block
+        return itertools.chain.from_iterable(map(
+            self._ipver.long2ip_many,
+            _aligned_blocks(self.startIp, self.endIp + 1)))
     # end __iter__
+
+    def iter_longs(self):
+        """
+        Return an iterable of the integer addresses in the range.
+
+        Unlike iterating the range itself no strings are formatted.
+
+
+        >>> list(IpRange('127/30').iter_longs())
+        [2130706432, 2130706433, 2130706434, 2130706435]
+        >>> list(IpRange('::ffff:0:0/127').iter_longs())
+        [281470681743360, 281470681743361]
+
+
+        :returns: ``range`` of integer addresses.
+        """
+        return ipv4._long_range(self.startIp, self.endIp + 1)
+    # end iter_longs
+
+    def iter_batches(self, size, as_strings=False):
+        """
+        Yield the addresses in the range as lists of `size` addresses.
+
+        The last list may be shorter than `size`.
+
+
+        >>> list(IpRange('127/30').iter_batches(3))
+        [[2130706432, 2130706433, 2130706434], [2130706435]]
+        >>> list(IpRange('127/30').iter_batches(2, as_strings=True))
+        [['127.0.0.0', '127.0.0.1'], ['127.0.0.2', '127.0.0.3']]
+
+
+        :param size: Maximum number of addresses per list.
+        :type size: int
+        :param as_strings: Yield formatted addresses instead of integers.
+        :type as_strings: bool
+        :returns: Generator of lists.
+        :raises: ValueError
+        """
+        return _iter_batches((self,), size, as_strings)
+    # end iter_batches
+
+    def to_cidrs(self):
+        """
+        Return the shortest list of CIDR blocks that covers the range.
+
+
+        >>> IpRange('10.0.0.0', '10.0.255.255').to_cidrs()
+        ['10.0.0.0/16']
+        >>> IpRange('10.0.0.0', '10.0.2.4').to_cidrs()
+        ['10.0.0.0/23', '10.0.2.0/30', '10.0.2.4/32']
+        >>> IpRange('fe80::', 'fe80::1:ffff').to_cidrs()
+        ['fe80::/111']
+
+
+        :returns: List of CIDR notation blocks.
+        """
+        return self._ipver.range2cidrs(self.startIp, self.endIp)
+    # end to_cidrs
 # end class IpRange
 
 
+def _range_from_longs(cls, start, end, version):
+    # module level so that pickle can find it
+    return cls.from_longs(start, end, version)
+# end _range_from_longs
+
+
+def _slice_len(start, stop, step):
+    """
+    Number of items in ``range(start, stop, step)`` without the size limits
+    of ``len()``.
+
+
+    >>> _slice_len(0, 10, 3), _slice_len(9, -1, -2), _slice_len(5, 1, 1)
+    (4, 5, 0)
+    """
+    if step > 0:
+        return max(0, (stop - start + step - 1) // step)
+    return max(0, (start - stop - step - 1) // -step)
+# end _slice_len
+
+
+def _slice_indices(index, length):
+    """
+    ``index.indices(length)`` for lengths past ``sys.maxsize``, which python2
+    rejects with OverflowError.
+
+
+    >>> _slice_indices(slice(None, None, -2), 10)
+    (9, -1, -2)
+    >>> _slice_indices(slice(-3, 2**130), 2**128) == (2**128 - 3, 2**128, 1)
+    True
+    """
+    step = 1 if index.step is None else index.step
+    if not step:
+        raise ValueError('slice step cannot be zero')
+    lower, upper = (-1, length - 1) if step < 0 else (0, length)
+
+    def clamp(value, default):
+        if value is None:
+            return default
+        if value < 0:
+            value += length
+        return min(max(value, lower), upper)
+    # end clamp
+
+    start = clamp(index.start, upper if step < 0 else lower)
+    stop = clamp(index.stop, lower if step < 0 else upper)
+    return start, stop, step
+# end _slice_indices
+
+
+class IpRangeSlice (Sequence):
+    """
+    Lazy view of every `step`-th address of a range.
+
+    Returned by stepped slices of :class:`IpRange`. Only the first address,
+    step and length are stored, so views of even the largest IPv6 blocks use
+    constant memory. Membership tests use modulo arithmetic.
+
+
+    >>> r = IpRange('fe80::/10')[::2**64]
+    >>> r
+    IpRangeSlice('fe80::', 18446744073709551616, 18014398509481984)
+    >>> r[1]
+    'fe80:0:0:1::'
+    >>> 'fe80:0:0:ff::' in r
+    True
+    >>> 'fe80:0:0:ff::1' in r
+    False
+    >>> r.index('fe80:0:0:ff::')
+    255
+    >>> r[2::2**42][:3]
+    IpRangeSlice('fe80:0:0:2::', 81129638414606681695789005144064, 3)
+    >>> list(IpRange('127/28')[1::5])
+    ['127.0.0.1', '127.0.0.6', '127.0.0.11']
+    >>> list(IpRange('127/28')[::-6])
+    ['127.0.0.15', '127.0.0.9', '127.0.0.3']
+
+
+    :param start: First address in the view.
+    :type start: str or IpAddress
+    :param step: Difference between consecutive addresses, may be negative.
+    :type step: int
+    :param length: Number of addresses in the view.
+    :type length: int
+    :raises: TypeError, ValueError
+    """
+    __slots__ = ('_first', '_step', '_len', '_ipver')
+
+    def __init__(self, start, step, length):
+        address = IpAddress(start)
+        ipver = ipv4 if 4 == address.version else ipv6
+        if not step:
+            raise ValueError('step must not be zero')
+        if length < 0:
+            raise ValueError('length must not be negative')
+        if length and not \
+                ipver.MIN_IP <= address.value + step * (length - 1) <= \
+                ipver.MAX_IP:
+            raise ValueError('last address out of range')
+        self._set(address.value, step, length, ipver)
+    # end __init__
+
+    @classmethod
+    def _from_longs(cls, first, step, length, ipver):
+        self = cls.__new__(cls)
+        self._set(first, step, length, ipver)
+        return self
+    # end _from_longs
+
+    def _set(self, first, step, length, ipver):
+        self._first = first
+        self._step = step
+        self._len = length
+        self._ipver = ipver
+    # end _set
+
+    def __reduce__(self):
+        version = 4 if self._ipver is ipv4 else 6
+        return (IpRangeSlice,
+                (IpAddress(self._first, version), self._step, self._len))
+    # end __reduce__
+
+    def __repr__(self):
+        return 'IpRangeSlice(%r, %d, %d)' % (
+            self._ipver.long2ip(self._first), self._step, self._len)
+    # end __repr__
+
+    def __eq__(self, other):
+        """
+        >>> IpRange('10/8')[::2] == IpRange('10/8')[::2]
+        True
+        >>> IpRange('10/8')[::2] == IpRange('10/8')[1::2]
+        False
+        """
+        return isinstance(other, IpRangeSlice) and \
+            self._key() == other._key()
+    # end __eq__
+
+    def __ne__(self, other):
+        return not self == other
+    # end __ne__
+
+    def __hash__(self):
+        return hash(self._key())
+    # end __hash__
+
+    def _key(self):
+        return (self._first, self._step, self._len, self._ipver.__name__)
+    # end _key
+
+    def __len__(self):
+        """
+        Return the number of addresses in the view.
+
+
+        >>> len(IpRange('127/24')[::3])
+        86
+        >>> IpRange('::/0')[::2].__len__() == 2**127
+        True
+        """
+        return self._len
+    # end __len__
+
+    def __getitem__(self, index):
+        """
+        >>> r = IpRange('10/8')[::256]
+        >>> r[0], r[1], r[-1]
+        ('10.0.0.0', '10.0.1.0', '10.255.255.0')
+        >>> r[1::2][:2]
+        IpRangeSlice('10.0.1.0', 512, 2)
+        >>> r[len(r)]
+        Traceback (most recent call last):
+            ...
+        IndexError: index out of range
+        """
+        if isinstance(index, slice):
+            start, stop, step = _slice_indices(index, self._len)
+            return IpRangeSlice._from_longs(
+                self._first + start * self._step, step * self._step,
+                _slice_len(start, stop, step), self._ipver)
+        if index < 0:
+            index = self._len + index
+        if index < 0 or index >= self._len:
+            raise IndexError('index out of range')
+        return self._ipver.long2ip(self._first + index * self._step)
+    # end __getitem__
+
+    def _offset(self, item):
+        # position of item in the view or None
+        position, remainder = divmod(
+            _cast(self._ipver, item) - self._first, self._step)
+        if remainder or position < 0 or position >= self._len:
+            return None
+        return position
+    # end _offset
+
+    def __contains__(self, item):
+        """
+        Implements membership test operators ``in`` and ``not in`` for the
+        view.
+
+
+        >>> r = IpRange('127/8')[1::4]
+        >>> '127.0.0.5' in r
+        True
+        >>> '127.0.0.6' in r
+        False
+        >>> '::ffff:127.0.0.9' in r
+        True
+
+
+        :param item: Ip address.
+        :type item: str, int or IpAddress
+        :returns: ``True`` if address is in the view, ``False`` otherwise.
+        :raises: TypeError
+        """
+        return self._offset(item) is not None
+    # end __contains__
+
+    def index(self, item):
+        """
+        Return the 0-based position of `item` in the view.
+
+
+        >>> IpRange('127/8')[1::4].index('127.0.1.1')
+        64
+        >>> IpRange('127/8')[1::4].index('127.0.1.2')
+        Traceback (most recent call last):
+            ...
+        ValueError: 127.0.1.2 is not in range
+        """
+        position = self._offset(item)
+        if position is None:
+            raise ValueError('%s is not in range' % (
+                self._ipver.long2ip(_cast(self._ipver, item)),))
+        return int(position)
+    # end index
+
+    def count(self, item):
+        return int(item in self)
+    # end count
+
+    def iter_longs(self):
+        """
+        Return an iterable of the integer addresses in the view.
+
+
+        >>> list(IpRange('127/30')[::2].iter_longs())
+        [2130706432, 2130706434]
+
+
+        :returns: ``range`` of integer addresses.
+        """
+        return ipv4._long_range(
+            self._first, self._first + self._step * self._len, self._step)
+    # end iter_longs
+
+    def _blocks(self, size=4096):
+        for offset in ipv4._long_range(0, self._len, size):
+            start = self._first + offset * self._step
+            yield ipv4._long_range(
+                start, start + min(size, self._len - offset) * self._step,
+                self._step)
+    # end _blocks
+
+    def __iter__(self):
+        """
+        Return an iterator over ip addresses in the view.
+
+        Addresses are formatted in blocks so that only a bounded number of
+        them exist at once.
+        """
+        return itertools.chain.from_iterable(map(
+            self._ipver.long2ip_many, self._blocks()))
+    # end __iter__
+# end class IpRangeSlice
+
+
 _IPV6_MAPPED_IPV4 = IpRange(ipv6.IPV4_MAPPED)
 
 
@@ -407,11 +1559,18 @@ class IpRangeList (object):
     of the addresses in the range.
 
     :param \*args: List of ip addresses or CIDR notation and/or
-            ``(start, end)`` tuples of ip addresses.
-    :type \*args: list of str and/or tuple
+            ``(start, end)`` tuples of ip addresses. Binary strings must
+            hold ASCII text.
+    :type \*args: list of str, bytes, bytearray, memoryview and/or tuple
     """
     def __init__(self, *args):
         self.ips = tuple(map(IpRange, args))
+        # split by address family so IPv4 mapped IPv6 addresses can be
+        # downcast and checked against the IPv4 ranges only
+        self._v4 = _RangeIndex(
+            (r.startIp, r.endIp) for r in self.ips if r._ipver is ipv4)
+        self._v6 = _RangeIndex(
+            (r.startIp, r.endIp) for r in self.ips if r._ipver is ipv6)
     # end __init__
 
     def __repr__(self):
@@ -457,27 +1616,75 @@ class IpRangeList (object):
         True
         >>> 2130706433 in r
         True
+        >>> '11.0.0.1' in r
+        False
+        >>> '::ffff:10.1.2.3' in r
+        True
+        >>> '::ffff:11.1.2.3' in r
+        False
+        >>> r = IpRangeList('::ffff:0:0/96', 'fe80::/10')
+        >>> '::ffff:11.1.2.3' in r
+        True
+        >>> '11.1.2.3' in r
+        False
+        >>> b'fe80::1' in r
+        True
+        >>> memoryview(b'from fe80::1 port 22')[5:12] in r
+        True
         >>> 'invalid' in r
         Traceback (most recent call last):
             ...
         TypeError: expected ip address, 32-bit integer or 128-bit integer
 
 
-        :param item: Dotted-quad ip address.
-        :type item: str
+        :param item: Dotted-quad ip address. Binary strings must hold ASCII
+            text. CIDR blocks are not addresses and raise TypeError.
+        :type item: str, bytes, bytearray, memoryview, int or IpAddress
         :returns: ``True`` if address is in list, ``False`` otherwise.
         """
-        if isinstance(item, basestring):
+        if isinstance(item, IpAddress):
+            if item.value in self._v4 or item.value in self._v6:
+                return True
+            # precomputed IPv4 value of an IPv4 mapped IPv6 address
+            return item._v4 is not None and item._v4 in self._v4
+        if isinstance(item, _ADDRESS_TYPES):
             item = _address2long(item)
         if type(item) not in (type(1), type(ipv4.MAX_IP), type(ipv6.MAX_IP)):
             raise TypeError(
                 "expected ip address, 32-bit integer or 128-bit integer")
-        for r in self.ips:
-            if item in r:
-                return True
+        if item in self._v4 or item in self._v6:
+            return True
+        if _IPV6_MAPPED_IPV4.startIp <= item <= _IPV6_MAPPED_IPV4.endIp:
+            # IPv4 mapped IPv6 address may match an IPv4 range
+            return (item & ipv4.MAX_IP) in self._v4
         return False
     # end __contains__
 
+    def contains_many(self, values):
+        """
+        Test many addresses for membership in the list at once.
+
+        A numpy integer array or :data:`iptools.ipv6.ARRAY_DTYPE` array is
+        checked with a vectorized binary search over the sorted range
+        boundaries and a ``bool`` array is returned. Any other iterable of
+        addresses or integers is checked one item at a time and a list of
+        ``bool`` is returned (a ``bool`` array if the input was a numpy
+        array).
+
+
+        >>> r = IpRangeList('127.0.0.1', '10/8', '192.168/16')
+        >>> r.contains_many(['127.0.0.1', '10.1.2.3', '11.1.2.3', 2130706433])
+        [True, True, False, True]
+
+
+        :param values: Addresses to test.
+        :type values: numpy.ndarray or iterable of str and/or int
+        :returns: Mask which is ``True`` where the address is in the list.
+        :raises: TypeError
+        """
+        return _contains_many(self, self._v4, self._v6, values)
+    # end contains_many
+
     def __iter__(self):
         """
         Return an iterator over all ip addresses in the list.
@@ -501,11 +1708,104 @@ class IpRangeList (object):
             ...
         StopIteration
         """
-        for r in self.ips:
-            for ip in r:
-                yield ip
+        return itertools.chain.from_iterable(self.ips)
     # end __iter__
 
+    def iter_longs(self):
+        """
+        Return an iterator of the integer addresses in all ranges.
+
+
+        >>> list(IpRangeList('127.0.0.1', '10/31').iter_longs())
+        [2130706433, 167772160, 167772161]
+
+
+        :returns: Iterator of integer addresses.
+        """
+        return itertools.chain.from_iterable(
+            r.iter_longs() for r in self.ips)
+    # end iter_longs
+
+    def iter_batches(self, size, as_strings=False):
+        """
+        Yield the addresses in all ranges as lists of `size` addresses.
+
+        Lists are filled across range boundaries so only the last list may be
+        shorter than `size`.
+
+
+        >>> r = IpRangeList('127.0.0.1', '10/31', 'fe80::/127')
+        >>> for batch in r.iter_batches(2, as_strings=True):
+        ...     print(batch)
+        ['127.0.0.1', '10.0.0.0']
+        ['10.0.0.1', 'fe80::']
+        ['fe80::1']
+
+
+        :param size: Maximum number of addresses per list.
+        :type size: int
+        :param as_strings: Yield formatted addresses instead of integers.
+        :type as_strings: bool
+        :returns: Generator of lists.
+        :raises: ValueError
+        """
+        return _iter_batches(self.ips, size, as_strings)
+    # end iter_batches
+
+    def normalize(self):
+        """
+        Return an equivalent list with overlapping and adjacent ranges
+        merged.
+
+        Ranges are sorted and merged separately for each address family.
+        IPv4 ranges come first.
+
+
+        >>> r = IpRangeList('10.0.0.128/25', 'fe80::/64', '10/25',
+        ...     '10.0.0.64/26', 'fe80:0:0:1::/64', '192.168/16')
+        >>> r.normalize()
+        ... #doctest: +NORMALIZE_WHITESPACE
+        IpRangeList(IpRange('10.0.0.0', '10.0.0.255'),
+        IpRange('192.168.0.0', '192.168.255.255'),
+        IpRange('fe80::', 'fe80::1:ffff:ffff:ffff:ffff'))
+        >>> r = IpRangeList('10/24', '10.0.0.1', '10.0.0.255', '10.0.1.0')
+        >>> len(r), len(r.normalize())
+        (259, 257)
+
+
+        :returns: New normalized :class:`IpRangeList`.
+        """
+        ranges = [
+            IpRange.from_longs(start, end, 4)
+            for start, end in zip(self._v4.starts, self._v4.ends)]
+        ranges.extend(
+            IpRange.from_longs(start, end, 6)
+            for start, end in zip(self._v6.starts, self._v6.ends))
+        return IpRangeList(*ranges)
+    # end normalize
+
+    def to_cidrs(self):
+        """
+        Return the shortest list of CIDR blocks that covers all of the
+        ranges.
+
+        Overlapping and adjacent ranges are merged before converting.
+
+
+        >>> IpRangeList('10.0.0.0/25', '10.0.0.128/25', '10.0.1.0').to_cidrs()
+        ['10.0.0.0/24', '10.0.1.0/32']
+        >>> IpRangeList('fe80::/11', 'fe80::1', '127.0.0.1').to_cidrs()
+        ['127.0.0.1/32', 'fe80::/11']
+
+
+        :returns: List of CIDR notation blocks.
+        """
+        cidrs = []
+        for r in self.normalize().ips:
+            cidrs.extend(r.to_cidrs())
+        return cidrs
+    # end to_cidrs
+
     def __len__(self):
         """
         Return the length of all ranges in the list.
@@ -556,6 +1856,149 @@ class IpRangeList (object):
         """
         return hash(self) == hash(other)
     # end __eq__
+
+    def _combine(self, other, keep):
+        if isinstance(other, IpRange):
+            other = IpRangeList(other)
+        elif not isinstance(other, IpRangeList):
+            raise TypeError('expected IpRangeList or IpRange')
+        ranges = []
+        for version, mine, theirs in (
+                (4, self._v4, other._v4), (6, self._v6, other._v6)):
+            ranges.extend(
+                IpRange.from_longs(start, end, version)
+                for start, end in _combine_ranges(
+                    zip(mine.starts, mine.ends),
+                    zip(theirs.starts, theirs.ends),
+                    keep))
+        return IpRangeList(*ranges)
+    # end _combine
+
+    def union(self, other):
+        """
+        Return the addresses that are in this list or in `other`.
+
+        The result is normalized. Set operations work on range endpoints so
+        their cost depends on the number of ranges and not the number of
+        addresses. Each address family is combined separately.
+
+
+        >>> IpRangeList('10.0.0.0/25', 'fe80::/64').union(
+        ...     IpRangeList('10.0.0.128/25', 'fe80::1'))
+        ... #doctest: +NORMALIZE_WHITESPACE
+        IpRangeList(IpRange('10.0.0.0', '10.0.0.255'),
+        IpRange('fe80::', 'fe80::ffff:ffff:ffff:ffff'))
+        >>> IpRangeList('10/8') | IpRangeList('11/8')
+        IpRangeList(IpRange('10.0.0.0', '11.255.255.255'),)
+
+
+        :param other: Addresses to add.
+        :type other: IpRangeList or IpRange
+        :returns: New :class:`IpRangeList`.
+        :raises: TypeError
+        """
+        return self._combine(other, lambda a, b: a or b)
+    # end union
+
+    def intersection(self, other):
+        """
+        Return the addresses that are in both this list and `other`.
+
+
+        >>> IpRangeList('10/8', 'fe80::/10') & IpRangeList('10.1/16', '::1')
+        IpRangeList(IpRange('10.1.0.0', '10.1.255.255'),)
+
+
+        :param other: Addresses to intersect with.
+        :type other: IpRangeList or IpRange
+        :returns: New :class:`IpRangeList`.
+        :raises: TypeError
+        """
+        return self._combine(other, lambda a, b: a and b)
+    # end intersection
+
+    def difference(self, other):
+        """
+        Return the addresses that are in this list but not in `other`.
+
+
+        >>> IpRangeList('10/8') - IpRangeList('10.1/16', '10.3/16')
+        ... #doctest: +NORMALIZE_WHITESPACE
+        IpRangeList(IpRange('10.0.0.0', '10.0.255.255'),
+        IpRange('10.2.0.0', '10.2.255.255'),
+        IpRange('10.4.0.0', '10.255.255.255'))
+
+
+        :param other: Addresses to remove.
+        :type other: IpRangeList or IpRange
+        :returns: New :class:`IpRangeList`.
+        :raises: TypeError
+        """
+        return self._combine(other, lambda a, b: a and not b)
+    # end difference
+
+    def symmetric_difference(self, other):
+        """
+        Return the addresses that are in exactly one of this list and
+        `other`.
+
+
+        >>> IpRangeList('10.0.0.0/24') ^ IpRangeList('10.0.0.128/24')
+        IpRangeList()
+        >>> IpRangeList('10.0.0.0/24') ^ IpRangeList('10.0.0.128/25')
+        IpRangeList(IpRange('10.0.0.0', '10.0.0.127'),)
+
+
+        :param other: Addresses to compare with.
+        :type other: IpRangeList or IpRange
+        :returns: New :class:`IpRangeList`.
+        :raises: TypeError
+        """
+        return self._combine(other, lambda a, b: a != b)
+    # end symmetric_difference
+
+    def isdisjoint(self, other):
+        """
+        Return ``True`` if this list and `other` have no addresses in common.
+
+
+        >>> IpRangeList('10/8').isdisjoint(IpRangeList('11/8', '::/0'))
+        True
+        >>> IpRangeList('10/8').isdisjoint(IpRange('10.255.255.255'))
+        False
+
+
+        :param other: Addresses to compare with.
+        :type other: IpRangeList or IpRange
+        :returns: ``True`` if there is no common address.
+        :raises: TypeError
+        """
+        return not self._combine(other, lambda a, b: a and b).ips
+    # end isdisjoint
+
+    def __or__(self, other):
+        if not isinstance(other, (IpRangeList, IpRange)):
+            return NotImplemented
+        return self.union(other)
+    # end __or__
+
+    def __and__(self, other):
+        if not isinstance(other, (IpRangeList, IpRange)):
+            return NotImplemented
+        return self.intersection(other)
+    # end __and__
+
+    def __sub__(self, other):
+        if not isinstance(other, (IpRangeList, IpRange)):
+            return NotImplemented
+        return self.difference(other)
+    # end __sub__
+
+    def __xor__(self, other):
+        if not isinstance(other, (IpRangeList, IpRange)):
+            return NotImplemented
+        return self.symmetric_difference(other)
+    # end __xor__
 # end class IpRangeList
 
 # vim: set sw=4 ts=4 sts=4 et :
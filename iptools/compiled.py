@@ -0,0 +1,587 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2008-2014, Bryan Davis and iptools contributors
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     - Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""
+Compiled binary range tables.
+
+An :class:`iptools.IpRangeList` or :class:`iptools.rangemap.IpRangeMap` is
+compiled once with :func:`compile_ranges` into a file of sorted fixed-width
+range boundaries. :func:`load` maps the file into memory and answers lookups
+directly from the mapped pages, so opening a table is effectively instant and
+processes loading the same file share its pages through the OS page cache.
+
+A parent process can instead :func:`publish` a table in a
+:mod:`multiprocessing.shared_memory` block which worker processes
+:func:`attach` to by name.
+
+File layout (all counts and offsets little-endian)::
+
+    header      magic b'IPRT', format version (u16), flags (u16),
+                IPv4 segment count (u32), IPv6 segment count (u32),
+                payload count (u32), reserved (u32)
+    IPv4        start addresses, then end addresses (u32 each)
+    IPv6        start addresses, then end addresses (16 bytes each, network
+                byte order so that byte strings sort like the integers)
+    payloads    (only if flag 1 is set) payload index of each IPv4 and then
+                each IPv6 segment (u32 each), payload end offsets (u64 each)
+                and the encoded payloads
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_right
+
+from . import IpRangeList
+from . import _address_families
+from .rangemap import IpRangeMap
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # shared memory publishing needs python 3.8+
+    shared_memory = None
+
+try:
+    memoryview.cast
+    _legacy_buffer = None
+except AttributeError:
+    # python2 memoryviews can not be cast or released and mmap objects do
+    # not support them at all, so tables are read through buffer objects
+    _legacy_buffer = buffer  # noqa: F821
+
+__all__ = (
+    'attach',
+    'compile_ranges',
+    'load',
+    'publish',
+    'CompiledRanges',
+    'FORMAT_VERSION',
+)
+
+#: Version of the file layout written by :func:`compile_ranges`
+FORMAT_VERSION = 1
+
+_MAGIC = b'IPRT'
+_HEADER = struct.Struct('<4sHHIIII')
+_FLAG_PAYLOADS = 1
+_V6_KEY = struct.Struct('>QQ')
+_U64 = struct.Struct('<Q')
+_LO_MASK = 0xffffffffffffffff
+
+
+def _v6_key(lngip):
+    """Pack a 128-bit integer as 16 bytes in network byte order."""
+    return _V6_KEY.pack(lngip >> 64, lngip & _LO_MASK)
+# end _v6_key
+
+
+def _u32_array(values):
+    """Little-endian ``u32`` bytes of `values`."""
+    packed = array('I', values)
+    if packed.itemsize != 4:
+        packed = array('L', values)
+    if sys.byteorder != 'little':
+        packed.byteswap()
+    try:
+        return packed.tobytes()
+    except AttributeError:
+        # spelled tostring() before python 3.2
+        return packed.tostring()
+# end _u32_array
+
+
+def _default_encode(value):
+    return json.dumps(value).encode('utf-8')
+# end _default_encode
+
+
+def _default_decode(data):
+    return json.loads(data.decode('utf-8'))
+# end _default_decode
+
+
+def _compile(ranges, encode=None):
+    """
+    Build the chunks of a compiled range table, header first.
+    """
+    if isinstance(ranges, IpRangeList):
+        v4, v6 = ranges._v4, ranges._v6
+        values = None
+    elif isinstance(ranges, IpRangeMap):
+        v4, v6 = ranges._v4, ranges._v6
+        values = ranges._values
+    else:
+        raise TypeError('expected IpRangeList or IpRangeMap')
+
+    chunks = [
+        _u32_array(v4.starts),
+        _u32_array(v4.ends),
+        b''.join(map(_v6_key, v6.starts)),
+        b''.join(map(_v6_key, v6.ends)),
+    ]
+    flags = 0
+    if values is not None:
+        flags |= _FLAG_PAYLOADS
+        encode = encode or _default_encode
+        encoded = [encode(value) for value in values]
+        offsets = []
+        total = 0
+        for data in encoded:
+            total += len(data)
+            offsets.append(total)
+        chunks.extend([
+            _u32_array(v4.values),
+            _u32_array(v6.values),
+            b''.join(map(_U64.pack, offsets)),
+        ])
+        chunks.extend(encoded)
+
+    chunks.insert(0, _HEADER.pack(
+        _MAGIC, FORMAT_VERSION, flags, len(v4.starts), len(v6.starts),
+        0 if values is None else len(values), 0))
+    return chunks
+# end _compile
+
+
+def compile_ranges(ranges, path, encode=None):
+    """
+    Write a compiled range table.
+
+    An :class:`iptools.IpRangeList` is written as its normalized ranges. An
+    :class:`iptools.rangemap.IpRangeMap` is written as its flattened segments
+    and values. The file is written to a temporary file in the same directory
+    and renamed into place so readers never see a partial table.
+
+
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'internal.iprt')
+    >>> compile_ranges(IpRangeList('10/8', '192.168/16', 'fe80::/10'), path)
+    >>> with load(path) as table:
+    ...     '10.1.2.3' in table, '11.0.0.1' in table, 'fe80::1' in table
+    (True, False, True)
+
+
+    :param ranges: Ranges to compile.
+    :type ranges: IpRangeList or IpRangeMap
+    :param path: File to write.
+    :type path: str
+    :param encode: Function converting a payload value to ``bytes``, JSON
+        by default.
+    :type encode: callable
+    :raises: TypeError
+    """
+    chunks = _compile(ranges, encode)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.iprt-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        # mkstemp creates the file readable by the owner only
+        os.chmod(tmp, 0o644)
+        getattr(os, 'replace', os.rename)(tmp, path)
+    except Exception:
+        os.unlink(tmp)
+        raise
+# end compile_ranges
+
+
+class _V6Keys (object):
+    """
+    Sequence view of packed IPv6 boundaries for :func:`bisect`.
+    """
+    __slots__ = ('_buf', '_len')
+
+    def __init__(self, buf):
+        self._buf = buf
+        self._len = len(buf) // 16
+    # end __init__
+
+    def __len__(self):
+        return self._len
+    # end __len__
+
+    def __getitem__(self, index):
+        offset = index * 16
+        return bytes(self._buf[offset:offset + 16])
+    # end __getitem__
+# end class _V6Keys
+
+
+class _Unpacked (object):
+    """
+    Sequence view of little-endian integers for big-endian hosts and
+    buffers that can not be cast.
+    """
+    __slots__ = ('_buf', '_item', '_len')
+
+    def __init__(self, buf, item):
+        self._buf = buf
+        self._item = item
+        self._len = len(buf) // item.size
+    # end __init__
+
+    def __len__(self):
+        return self._len
+    # end __len__
+
+    def __getitem__(self, index):
+        return self._item.unpack_from(self._buf, index * self._item.size)[0]
+    # end __getitem__
+# end class _Unpacked
+
+
+class CompiledRanges (object):
+    """
+    Range table read directly from a compiled buffer.
+
+    Usually created by :func:`load`. Any object supporting the buffer
+    protocol that holds the output of :func:`compile_ranges` can be used.
+    Lookups binary search the boundaries in the buffer without copying them.
+
+
+    :param buffer: Compiled table.
+    :type buffer: buffer
+    :param decode: Function converting payload ``bytes`` to a value, JSON by
+        default.
+    :type decode: callable
+    :raises: ValueError if the buffer does not hold a compiled table.
+    """
+
+    def __init__(self, buffer, decode=None):
+        self._views = []
+        self._closers = []
+        self._decode = decode or _default_decode
+        self._cache = {}
+        try:
+            self._open(buffer)
+        except Exception:
+            self.close()
+            raise
+    # end __init__
+
+    def _view(self, view):
+        # keep every view so close() can release them before the buffer
+        self._views.append(view)
+        return view
+    # end _view
+
+    def _ints(self, view, code):
+        if _legacy_buffer is None and sys.byteorder == 'little':
+            return self._view(view.cast(code))
+        return _Unpacked(view, struct.Struct('<' + code))
+    # end _ints
+
+    def _section(self, view, offset, size=None):
+        if _legacy_buffer is not None:
+            if size is None:
+                return _legacy_buffer(view, offset)
+            return _legacy_buffer(view, offset, size)
+        stop = None if size is None else offset + size
+        return self._view(view[offset:stop])
+    # end _section
+
+    def _open(self, buffer):
+        if _legacy_buffer is not None:
+            if isinstance(buffer, memoryview):
+                buffer = buffer.tobytes()
+            view = buffer
+        else:
+            view = self._view(memoryview(buffer))
+            if view.format != 'B' or view.ndim != 1:
+                view = self._view(view.cast('B'))
+
+        if len(view) < _HEADER.size:
+            raise ValueError('truncated range table')
+        magic, version, flags, n4, n6, npayloads, _ = \
+            _HEADER.unpack_from(view, 0)
+        if magic != _MAGIC:
+            raise ValueError('not a compiled range table')
+        if version != FORMAT_VERSION:
+            raise ValueError(
+                'unsupported range table format version %d' % version)
+
+        sections = [n4 * 4, n4 * 4, n6 * 16, n6 * 16]
+        if flags & _FLAG_PAYLOADS:
+            sections += [n4 * 4, n6 * 4, npayloads * 8]
+        end = _HEADER.size + sum(sections)
+        if flags & _FLAG_PAYLOADS and npayloads and end <= len(view):
+            # payloads run up to the last end offset
+            end += _U64.unpack_from(view, end - 8)[0]
+        if end > len(view):
+            raise ValueError('truncated range table')
+
+        parts = []
+        offset = _HEADER.size
+        for size in sections:
+            parts.append(self._section(view, offset, size))
+            offset += size
+
+        self._v4_starts = self._ints(parts[0], 'I')
+        self._v4_ends = self._ints(parts[1], 'I')
+        self._v6_starts = _V6Keys(parts[2])
+        self._v6_ends = _V6Keys(parts[3])
+
+        self._has_payloads = bool(flags & _FLAG_PAYLOADS)
+        if self._has_payloads:
+            self._v4_values = self._ints(parts[4], 'I')
+            self._v6_values = self._ints(parts[5], 'I')
+            self._offsets = self._ints(parts[6], 'Q')
+            self._payloads = self._section(view, offset)
+    # end _open
+
+    def _find(self, addr):
+        """Return ``(family, segment index)`` of `addr` or ``None``."""
+        v4, v6 = _address_families(addr)
+        if self._has_payloads:
+            # same lookup order as IpRangeMap
+            lookups = ((4, v4), (6, v6))
+        else:
+            # same as IpRangeList.__contains__: the address value in either
+            # family, then the IPv4 part of an IPv4 mapped address
+            value = v4 if v6 is None else v6
+            lookups = ((4, value), (6, value), (4, v4))
+        for family, value in lookups:
+            if value is None:
+                continue
+            if family == 4:
+                pos = bisect_right(self._v4_starts, value) - 1
+                if pos >= 0 and value <= self._v4_ends[pos]:
+                    return 4, pos
+            else:
+                key = _v6_key(value)
+                pos = bisect_right(self._v6_starts, key) - 1
+                if pos >= 0 and key <= self._v6_ends[pos]:
+                    return 6, pos
+        return None
+    # end _find
+
+    def __contains__(self, addr):
+        """
+        Implements membership test operators ``in`` and ``not in``.
+
+        Tables compiled from an :class:`iptools.IpRangeList` answer the same
+        as the list, tables with payloads the same as
+        :meth:`iptools.rangemap.IpRangeMap.get`.
+
+
+        :param addr: Ip address.
+        :type addr: str, int or IpAddress
+        :returns: ``True`` if address is in the table, ``False`` otherwise.
+        :raises: TypeError
+        """
+        return self._find(addr) is not None
+    # end __contains__
+
+    def get(self, addr, default=None):
+        """
+        Return the payload of the segment containing `addr`.
+
+        Tables compiled from an :class:`iptools.IpRangeList` have no payloads
+        and return ``True`` for every address they contain.
+
+
+        >>> import os, tempfile
+        >>> from iptools.rangemap import IpRangeMap
+        >>> path = os.path.join(tempfile.mkdtemp(), 'geo.iprt')
+        >>> compile_ranges(IpRangeMap([
+        ...     ('1.0.0.0/24', {'cc': 'AU'}),
+        ...     ('2001:db8::/32', {'cc': 'ZZ'}),
+        ... ]), path)
+        >>> with load(path) as table:
+        ...     table.get('1.0.0.7') == {'cc': 'AU'}, table.get('10.0.0.1')
+        (True, None)
+
+
+        :param addr: Ip address.
+        :type addr: str, int or IpAddress
+        :param default: Value to return if no segment contains `addr`.
+        :returns: Payload of the matching segment or `default`.
+        :raises: TypeError
+        """
+        found = self._find(addr)
+        if found is None:
+            return default
+        if not self._has_payloads:
+            return True
+        family, pos = found
+        if family == 4:
+            payload = self._v4_values[pos]
+        else:
+            payload = self._v6_values[pos]
+        try:
+            return self._cache[payload]
+        except KeyError:
+            start = self._offsets[payload - 1] if payload else 0
+            value = self._decode(
+                bytes(self._payloads[start:self._offsets[payload]]))
+            self._cache[payload] = value
+            return value
+    # end get
+
+    def __len__(self):
+        """
+        Return the number of segments in the table.
+        """
+        return len(self._v4_starts) + len(self._v6_starts)
+    # end __len__
+
+    def close(self):
+        """
+        Release the buffer and close any file mapping behind it.
+        """
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        for closer in self._closers:
+            closer()
+        self._closers = []
+    # end close
+
+    def __enter__(self):
+        return self
+    # end __enter__
+
+    def __exit__(self, *exc_info):
+        self.close()
+    # end __exit__
+# end class CompiledRanges
+
+
+def load(path, decode=None):
+    """
+    Open a compiled range table by memory mapping it read only.
+
+
+    :param path: File written by :func:`compile_ranges`.
+    :type path: str
+    :param decode: Function converting payload ``bytes`` to a value, JSON by
+        default.
+    :type decode: callable
+    :returns: :class:`CompiledRanges` reading from the mapping.
+    :raises: ValueError if the file is not a compiled table.
+    """
+    with open(path, 'rb') as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        table = CompiledRanges(mapping, decode)
+    except Exception:
+        mapping.close()
+        raise
+    table._closers.append(mapping.close)
+    return table
+# end load
+
+
+def _require_shared_memory():
+    """Raise ImportError if multiprocessing.shared_memory is unavailable."""
+    if shared_memory is None:
+        raise ImportError("multiprocessing.shared_memory is required")
+# end _require_shared_memory
+
+
+def publish(ranges, name=None, encode=None):
+    """
+    Compile a range table into a new shared memory block.
+
+    The caller owns the block: keep the returned object alive while workers
+    use the table, then call its ``close()`` and ``unlink()`` methods::
+
+        block = publish(IpRangeList('10/8', '::ffff:0:0/104'))
+        # in each worker
+        table = attach(block.name)
+        '::ffff:10.1.2.3' in table
+        table.close()
+        # in the publisher once the workers are done
+        block.close()
+        block.unlink()
+
+
+    :param ranges: Ranges to compile.
+    :type ranges: IpRangeList or IpRangeMap
+    :param name: Name of the block, a unique name is chosen if ``None``.
+    :type name: str
+    :param encode: Function converting a payload value to ``bytes``, JSON
+        by default.
+    :type encode: callable
+    :returns: :class:`multiprocessing.shared_memory.SharedMemory` holding
+        the table.
+    :raises: ImportError, TypeError
+    """
+    _require_shared_memory()
+    data = b''.join(_compile(ranges, encode))
+    block = shared_memory.SharedMemory(name=name, create=True, size=len(data))
+    block.buf[:len(data)] = data
+    return block
+# end publish
+
+
+def attach(name, decode=None):
+    """
+    Open a range table published by :func:`publish` in another process.
+
+    The table reads the shared block directly through a read-only view.
+    Closing the table detaches from the block without destroying it.
+
+    Before python 3.13 attaching registers the block with the resource
+    tracker of the attaching process. Worker processes started by the
+    publishing process through :mod:`multiprocessing` share its tracker, but
+    unrelated processes should keep running until the publisher unlinks the
+    block.
+
+
+    :param name: Name of the shared memory block.
+    :type name: str
+    :param decode: Function converting payload ``bytes`` to a value, JSON by
+        default.
+    :type decode: callable
+    :returns: :class:`CompiledRanges` reading from the block.
+    :raises: ImportError, ValueError
+    """
+    _require_shared_memory()
+    try:
+        # the publishing process owns the block, so do not let this
+        # process' resource tracker unlink it on exit (python 3.13+)
+        block = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        block = shared_memory.SharedMemory(name=name)
+    view = block.buf.toreadonly()
+    try:
+        table = CompiledRanges(view, decode)
+    except Exception:
+        view.release()
+        block.close()
+        raise
+    # released last, after the views derived from it
+    table._views.insert(0, view)
+    table._closers.append(block.close)
+    return table
+# end attach
+
+# vim: set sw=4 ts=4 sts=4 et :
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2008-2014, Bryan Davis and iptools contributors
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     - Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""
+Find ip addresses in free text.
+"""
+
+import re
+
+from . import ipv4
+from . import ipv6
+from . import IpAddress
+
+__all__ = (
+    'find_addresses',
+    'iter_addresses',
+)
+
+try:
+    basestring = basestring
+except NameError:
+    # 'basestring' is undefined, must be python3k
+    basestring = str
+
+#: Maximal runs of hex digits, colons and periods holding a colon or period.
+#: Every address is such a run, possibly with a port or punctuation attached.
+_CANDIDATE = r'(?<![0-9A-Fa-f:.])[0-9A-Fa-f:.]*[:.][0-9A-Fa-f:.]*'
+_CANDIDATE_RE = re.compile(_CANDIDATE)
+_CANDIDATE_BYTES_RE = re.compile(_CANDIDATE.encode('ascii'))
+
+#: Characters of candidate runs, periods last
+_CANDIDATE_CHARS = '0123456789ABCDEFabcdef:.'
+_CANDIDATE_BYTES = _CANDIDATE_CHARS.encode('ascii')
+
+#: Longest candidate run :func:`iter_addresses` carries over to the next
+#: read. Addresses are at most 45 characters, 21 for an IPv4 address with a
+#: port, plus a leading and a trailing colon, so a longer run can only hold
+#: an address if the rest of it is trailing periods.
+_MAX_CARRY = 50
+
+
+def _is_word(char):
+    """
+    Check if a one character str or bytes is part of a word.
+    """
+    return char.isalnum() or char in ('_', b'_')
+# end _is_word
+
+
+def _scan(text, base, ranges):
+    """
+    Yield the addresses in `text` with offsets relative to `base`.
+
+    Each candidate run is trimmed of a single leading colon and of trailing
+    periods and colons that are not part of a '::' gap, so 'ip:10.0.0.1' and
+    'from 10.0.0.1.' are found. Candidates touching letters, like the 'd::' of
+    'std::string', are skipped. A dotted-quad followed by a ':port' of up to
+    five digits is accepted too. IPv4 addresses must have all four octets.
+    """
+    if isinstance(text, basestring):
+        finditer = _CANDIDATE_RE.finditer
+    else:
+        finditer = _CANDIDATE_BYTES_RE.finditer
+    size = len(text)
+    for match in finditer(text):
+        start, end = match.span()
+        token = match.group()
+        if not isinstance(token, basestring):
+            # candidates are plain ascii
+            token = token.decode('ascii')
+
+        if token[:1] == ':' and token[:2] != '::':
+            token = token[1:]
+            start += 1
+        elif start and _is_word(text[start - 1:start]):
+            continue
+        trimmed = token.rstrip('.')
+        if trimmed[-1:] == ':' and trimmed[-2:] != '::':
+            trimmed = trimmed[:-1]
+        if trimmed == token and end < size and _is_word(text[end:end + 1]):
+            continue
+        token = trimmed
+
+        if ':' in token:
+            family = 6
+            value = None
+            if token.count('.') in (0, 3):
+                # embedded dotted-quads need all four octets too
+                value = ipv6._parse(token)
+            if value is None and token.count(':') == 1:
+                host, port = token.split(':')
+                if port.isdigit() and len(port) <= 5:
+                    family = 4
+                    value = ipv4._parse(host, strict=True)
+        elif token:
+            family = 4
+            value = ipv4._parse(token, strict=True)
+        else:
+            continue
+
+        if value is None:
+            continue
+        if ranges is not None and IpAddress(value, family) not in ranges:
+            continue
+        yield (base + start, value, family)
+# end _scan
+
+
+def find_addresses(text, ranges=None):
+    """
+    Find the IPv4 and IPv6 addresses in a str or bytes buffer.
+
+    The buffer is scanned once with a single regular expression that finds
+    candidate runs of hex digits, colons and periods. Each candidate is then
+    validated and converted by the same parser as :func:`iptools.ipv4.ip2long`
+    or :func:`iptools.ipv6.ip2long`. When `ranges` is given, addresses outside
+    of it are skipped in the same pass.
+
+
+    >>> line = '2014-07-01 12:34:56 ip:10.1.2.3 -> [2001:db8::1]:443 (v1.2.3)'
+    >>> for offset, value, family in find_addresses(line):
+    ...     print('%d %d %d' % (offset, family, value))
+    23 4 167838211
+    36 6 42540766411282592856903984951653826561
+    >>> find_addresses(b'GET from 192.0.2.8:8080, std::string 300.1.1.1')
+    [(9, 3221225992, 4)]
+    >>> from iptools import IpRangeList
+    >>> find_addresses('10.0.0.1 or 192.0.2.1.', IpRangeList('192.0.2.0/24'))
+    [(12, 3221225985, 4)]
+
+
+    :param text: Text to search.
+    :type text: str or bytes
+    :param ranges: Only find addresses contained in these ranges. Any
+        container that accepts :class:`iptools.IpAddress` in ``in`` tests.
+    :type ranges: IpRangeList
+    :returns: List of ``(offset, integer, family)`` tuples where family is
+        ``4`` or ``6``.
+    """
+    return list(_scan(text, 0, ranges))
+# end find_addresses
+
+
+def iter_addresses(source, ranges=None, chunk_size=65536):
+    """
+    Find the IPv4 and IPv6 addresses in a file without reading it all.
+
+    The file is read in chunks. Text that could be the start of an address
+    split across two reads is carried over to the next read, so the results
+    are the same as :func:`find_addresses` on the whole content. Runs of hex
+    digits, colons and periods too long to be an address are skipped
+    without being carried.
+
+
+    >>> import io
+    >>> data = b'a 10.0.0.1\\nb 2001:db8::2 c\\n' * 2
+    >>> for offset, value, family in iter_addresses(
+    ...         io.BytesIO(data), chunk_size=5):
+    ...     print('%d %d %d' % (offset, value, family))
+    2 167772161 4
+    13 42540766411282592856903984951653826562 6
+    29 167772161 4
+    40 42540766411282592856903984951653826562 6
+
+
+    :param source: Path or open text or binary file.
+    :type source: str or file
+    :param ranges: Only find addresses contained in these ranges.
+    :type ranges: IpRangeList
+    :param chunk_size: Number of characters or bytes per read.
+    :type chunk_size: int
+    :returns: Generator of ``(offset, integer, family)`` tuples. Offsets
+        count characters for text files and bytes for binary files.
+    """
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be at least 1')
+    if isinstance(source, basestring):
+        with open(source, 'rb') as f:
+            for found in iter_addresses(f, ranges, chunk_size):
+                yield found
+        return
+
+    carry = None
+    # offset of carry in the source
+    base = 0
+    # addresses of an overlong run being skipped, found if only periods
+    # follow until the run ends
+    pending = None
+    while True:
+        chunk = source.read(chunk_size)
+        if carry is None:
+            carry = chunk[:0]
+            if isinstance(chunk, basestring):
+                chars = _CANDIDATE_CHARS
+            else:
+                chars = _CANDIDATE_BYTES
+            period = chars[-1:]
+        if not chunk:
+            break
+        if pending is not None:
+            rest = chunk.lstrip(chars)
+            skipped = len(chunk) - len(rest)
+            if chunk[:skipped].strip(period):
+                pending = []
+            base += skipped
+            if not rest:
+                continue
+            for found in pending:
+                yield found
+            pending = None
+            chunk = rest
+
+        text = carry + chunk
+        # split before the trailing candidate run, keeping the character in
+        # front of it as context for the next scan
+        cut = len(text.rstrip(chars))
+        keep = max(cut - 1, 0)
+        for found in _scan(text[:cut], base, ranges):
+            yield found
+        if len(text) - cut > _MAX_CARRY:
+            pending = list(_scan(text[keep:], base + keep, ranges))
+            base += len(text)
+            carry = chunk[:0]
+        else:
+            base += keep
+            carry = text[keep:]
+    if pending:
+        for found in pending:
+            yield found
+    elif carry:
+        for found in _scan(carry, base, ranges):
+            yield found
+# end iter_addresses
+
+# vim: set sw=4 ts=4 sts=4 et :
@@ -24,6 +24,13 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 import re
+import struct
+
+try:
+    import numpy
+except ImportError:
+    # numpy is optional and only needed by the *_array functions
+    numpy = None
 
 # sniff for python2.x / python3k compatibility "fixes'
 try:
@@ -55,6 +62,62 @@ except NameError:
             out.reverse()
             return '0b' + ''.join(out)
     # end bin
+
+try:
+    range_type = xrange
+except NameError:
+    # 'xrange' is undefined, must be python3k
+    range_type = range
+
+
+class _LongRange (object):
+    """
+    Minimal ``xrange`` for python2 bounds past ``sys.maxsize``, where xrange
+    raises OverflowError. Only used through :func:`_long_range`.
+    """
+    __slots__ = ('start', 'stop', 'step')
+
+    def __init__(self, start, stop, step=1):
+        self.start, self.stop, self.step = start, stop, step
+    # end __init__
+
+    def __len__(self):
+        sign = 1 if self.step > 0 else -1
+        return max(0, (self.stop - self.start + self.step - sign) // self.step)
+    # end __len__
+
+    def __getitem__(self, index):
+        length = len(self)
+        if index < 0:
+            index += length
+        if index < 0 or index >= length:
+            raise IndexError('range object index out of range')
+        return self.start + index * self.step
+    # end __getitem__
+
+    def __iter__(self):
+        value, stop, step = self.start, self.stop, self.step
+        while value < stop if step > 0 else value > stop:
+            yield value
+            value += step
+    # end __iter__
+# end class _LongRange
+
+
+def _long_range(start, stop, step=1):
+    """
+    ``range(start, stop, step)`` that also works for 128-bit bounds on
+    python2.
+    """
+    try:
+        return range_type(start, stop, step)
+    except OverflowError:
+        return _LongRange(start, stop, step)
+# end _long_range
+
+
+#: Types of the lazy integer ranges made by :func:`_long_range`
+_RANGE_TYPES = (range_type, _LongRange)
 # end compatibility "fixes'
 
 __all__ = (
@@ -62,9 +125,15 @@ __all__ = (
     'hex2ip',
     'ip2hex',
     'ip2long',
+    'ip2long_array',
     'ip2network',
+    'ip2packed',
     'long2ip',
+    'long2ip_array',
+    'long2ip_many',
     'netmask2prefix',
+    'packed2long',
+    'range2cidrs',
     'subnet2block',
     'validate_cidr',
     'validate_ip',
@@ -94,12 +163,33 @@ __all__ = (
     'TEST_NET_3',
 )
 
-#: Regex for validating an IPv4 address
-_DOTTED_QUAD_RE = re.compile(r'^(\d{1,3}\.){0,3}\d{1,3}$')
-
 #: Regex for validating a CIDR network
 _CIDR_RE = re.compile(r'^(\d{1,3}\.){0,3}\d{1,3}/\d{1,2}$')
 
+#: Octet value lookup for every valid 1-3 digit decimal string (eg. '7',
+#: '07', '007')
+_OCTETS = {}
+for _i in range(256):
+    for _fmt in ('%d', '%02d', '%03d'):
+        _OCTETS[_fmt % _i] = _i
+del _i, _fmt
+
+#: :data:`_OCTETS` keyed by bytes. Kept apart because ASCII str and bytes
+#: hash alike and would collide in one table.
+_BYTE_OCTETS = dict((k.encode('ascii'), v) for k, v in _OCTETS.items())
+
+#: Packed network byte order 32-bit integer
+_PACKED = struct.Struct('!I')
+
+#: Mutable or borrowed binary buffers accepted in place of address strings
+_BUFFERS = (bytearray, memoryview)
+
+#: Decimal string for each octet value
+_OCTET_STRS = tuple(str(i) for i in range(256))
+
+#: Decimal string followed by a period for each octet value
+_OCTET_DOTS = tuple('%d.' % i for i in range(256))
+
 #: Mamimum IPv4 integer
 MAX_IP = 0xffffffff
 #: Minimum IPv4 integer
@@ -187,19 +277,26 @@ RESERVED = "240.0.0.0/4"
 BROADCAST = "255.255.255.255"
 
 
-def validate_ip(s):
+def validate_ip(s, strict=False):
     """Validate a dotted-quad ip address.
 
     The string is considered a valid dotted-quad address if it consists of
-    one to four octets (0-255) seperated by periods (.).
+    one to four octets (0-255) seperated by periods (.). In strict mode
+    exactly four octets are required.
 
 
     >>> validate_ip('127.0.0.1')
     True
     >>> validate_ip('127.0')
     True
+    >>> validate_ip('127.0', strict=True)
+    False
     >>> validate_ip('127.0.0.256')
     False
+    >>> validate_ip('127.0.0.1.')
+    False
+    >>> validate_ip(' 127.0.0.1')
+    False
     >>> validate_ip(LOCALHOST)
     True
     >>> validate_ip(None) #doctest: +IGNORE_EXCEPTION_DETAIL
@@ -210,16 +307,12 @@ def validate_ip(s):
 
     :param s: String to validate as a dotted-quad ip address.
     :type s: str
+    :param strict: Only accept the four octet form.
+    :type strict: bool
     :returns: ``True`` if a valid dotted-quad ip address, ``False`` otherwise.
     :raises: TypeError
     """
-    if _DOTTED_QUAD_RE.match(s):
-        quads = s.split('.')
-        for q in quads:
-            if int(q) > 255:
-                return False
-        return True
-    return False
+    return _parse(s, strict) is not None
 # end validate_ip
 
 
@@ -353,7 +446,69 @@ def validate_subnet(s):
 # end validate_subnet
 
 
-def ip2long(ip):
+def _buffer2bytes(buf):
+    """Copy a :class:`bytearray` or :class:`memoryview` to :class:`bytes`.
+
+    >>> _buffer2bytes(memoryview(b'10.0.0.1')[:4]) == b'10.0'
+    True
+
+    :param buf: Binary buffer.
+    :type buf: bytearray or memoryview
+    :returns: bytes
+    """
+    if isinstance(buf, memoryview):
+        return buf.tobytes()
+    return bytes(buf)
+# end _buffer2bytes
+
+
+def _parse(ip, strict=False):
+    """Validate and convert a dotted-quad ip address in a single pass.
+
+    Each octet is looked up in a precomputed table of valid decimal strings
+    which rejects bad input without needing a regular expression. ASCII
+    bytes are looked up as is, without decoding.
+
+    :param ip: Dotted-quad ip address (eg. '127.0.0.1').
+    :type ip: str, bytes, bytearray or memoryview
+    :param strict: Only accept the four octet form.
+    :type strict: bool
+    :returns: Network byte order 32-bit integer or ``None`` if ip is invalid.
+    :raises: TypeError
+    """
+    if isinstance(ip, _BUFFERS):
+        ip = _buffer2bytes(ip)
+    dot, octets = '.', _OCTETS
+    if isinstance(ip, bytes):
+        dot, octets = b'.', _BYTE_OCTETS
+    try:
+        quads = ip.split(dot)
+    except AttributeError:
+        raise TypeError("expected string or buffer")
+    try:
+        if len(quads) == 4:
+            a, b, c, d = quads
+            return (octets[a] << 24 | octets[b] << 16 |
+                    octets[c] << 8 | octets[d])
+        if strict:
+            return None
+        if len(quads) == 1:
+            # only a network quad
+            return octets[quads[0]] << 24
+        if len(quads) == 2:
+            # partial form, last supplied quad is host address, rest is
+            # network
+            return octets[quads[0]] << 24 | octets[quads[1]]
+        if len(quads) == 3:
+            return (octets[quads[0]] << 24 | octets[quads[1]] << 16 |
+                    octets[quads[2]])
+    except KeyError:
+        pass
+    return None
+# end _parse
+
+
+def ip2long(ip, strict=False):
     """Convert a dotted-quad ip address to a network byte order 32-bit
     integer.
 
@@ -366,27 +521,25 @@ def ip2long(ip):
     2130706432
     >>> ip2long('127.0.0.256') is None
     True
+    >>> ip2long('127.1', strict=True) is None
+    True
+    >>> ip2long('010.000.000.001', strict=True)
+    167772161
+    >>> ip2long(b'127.0.0.1')
+    2130706433
+    >>> ip2long(memoryview(b'GET 127.0.0.1')[4:])
+    2130706433
 
 
-    :param ip: Dotted-quad ip address (eg. '127.0.0.1').
-    :type ip: str
+    :param ip: Dotted-quad ip address (eg. '127.0.0.1'). Binary values must
+        hold ASCII text.
+    :type ip: str, bytes, bytearray or memoryview
+    :param strict: Only accept the four octet form, skipping partial address
+        expansion.
+    :type strict: bool
     :returns: Network byte order 32-bit integer or ``None`` if ip is invalid.
     """
-    if not validate_ip(ip):
-        return None
-    quads = ip.split('.')
-    if len(quads) == 1:
-        # only a network quad
-        quads = quads + [0, 0, 0]
-    elif len(quads) < 4:
-        # partial form, last supplied quad is host address, rest is network
-        host = quads[-1:]
-        quads = quads[:-1] + [0, ] * (4 - len(quads)) + host
-
-    lngip = 0
-    for q in quads:
-        lngip = (lngip << 8) | int(q)
-    return lngip
+    return _parse(ip, strict)
 # end ip2long
 
 
@@ -448,11 +601,272 @@ def long2ip(l):
     if MAX_IP < l or l < MIN_IP:
         raise TypeError(
             "expected int between %d and %d inclusive" % (MIN_IP, MAX_IP))
-    return '%d.%d.%d.%d' % (
-        l >> 24 & 255, l >> 16 & 255, l >> 8 & 255, l & 255)
+    return _OCTET_DOTS[l >> 24] + _OCTET_DOTS[l >> 16 & 255] + \
+        _OCTET_DOTS[l >> 8 & 255] + _OCTET_STRS[l & 255]
 # end long2ip
 
 
+def long2ip_many(iterable):
+    """Convert an iterable of network byte order 32-bit integers to a list of
+    dotted-quad ip addresses.
+
+    The range check is done once for the whole input rather than once per
+    address. Runs of consecutive addresses given as a ``range`` are formatted
+    one /24 block at a time, reusing the text of the first three octets.
+
+
+    >>> long2ip_many([2130706433, MIN_IP, MAX_IP])
+    ['127.0.0.1', '0.0.0.0', '255.255.255.255']
+    >>> long2ip_many(range(ip2long('10.0.0.254'), ip2long('10.0.1.2')))
+    ['10.0.0.254', '10.0.0.255', '10.0.1.0', '10.0.1.1']
+    >>> long2ip_many(range(ip2long('10.0.0.6'), ip2long('10.0.0.0'), -3))
+    ['10.0.0.6', '10.0.0.3']
+    >>> long2ip_many([])
+    []
+    >>> long2ip_many(range(MAX_IP, MAX_IP + 2))
+    ... #doctest: +IGNORE_EXCEPTION_DETAIL
+    Traceback (most recent call last):
+        ...
+    TypeError: expected int between 0 and 4294967295 inclusive
+
+
+    :param iterable: Network byte order 32-bit integers.
+    :type iterable: iterable of int
+    :returns: List of dotted-quad ip addresses.
+    :raises: TypeError
+    """
+    if isinstance(iterable, _RANGE_TYPES):
+        if not len(iterable):
+            return []
+        first, last = iterable[0], iterable[-1]
+        lo, hi = min(first, last), max(first, last)
+        consecutive = len(iterable) == 1 or iterable[1] - first == 1
+    else:
+        iterable = list(iterable)
+        if not iterable:
+            return []
+        lo, hi = min(iterable), max(iterable)
+        consecutive = False
+    if MAX_IP < hi or lo < MIN_IP:
+        raise TypeError(
+            "expected int between %d and %d inclusive" % (MIN_IP, MAX_IP))
+
+    if consecutive:
+        out = []
+        start, stop = lo, hi + 1
+        while start < stop:
+            block_stop = min((start | 255) + 1, stop)
+            prefix = _OCTET_DOTS[start >> 24] + \
+                _OCTET_DOTS[start >> 16 & 255] + _OCTET_DOTS[start >> 8 & 255]
+            out.extend(map(
+                prefix.__add__,
+                _OCTET_STRS[start & 255:(block_stop - 1 & 255) + 1]))
+            start = block_stop
+        return out
+
+    dots, strs = _OCTET_DOTS, _OCTET_STRS
+    return [
+        dots[lngip >> 24] + dots[lngip >> 16 & 255] +
+        dots[lngip >> 8 & 255] + strs[lngip & 255] for lngip in iterable]
+# end long2ip_many
+
+
+def _require_numpy():
+    """Raise ImportError if numpy is not available."""
+    if numpy is None:
+        raise ImportError("numpy is required for array conversions")
+# end _require_numpy
+
+
+def _parse_char_matrix(chars):
+    """Parse a matrix of character codes, one dotted-quad per row, into
+    32-bit integers.
+
+    Rows are zero padded on the right. The matrix is transposed so that each
+    column is contiguous, the structure of every row is checked with whole
+    matrix operations and then the octets are accumulated column by column
+    with every row of the batch handled at once.
+
+    :param chars: 2-d array of character codes.
+    :type chars: numpy.ndarray
+    :returns: Tuple of ``uint32`` values and ``bool`` validity mask.
+    """
+    cols = numpy.ascontiguousarray(chars.T)
+    digit = cols - cols.dtype.type(48)
+    is_digit = digit < 10
+    is_dot = cols == 46
+    is_pad = cols == 0
+    is_end = is_dot | is_pad
+
+    # only digits and dots, followed by zero padding
+    bad = ~(is_digit | is_end)
+    bad[:-1] |= is_pad[:-1] & ~is_pad[1:]
+    # every octet has 1 to 3 digits
+    bad[0] |= is_dot[0]
+    bad[-1] |= is_dot[-1]
+    bad[:-1] |= is_dot[:-1] & is_end[1:]
+    bad[:-3] |= is_digit[:-3] & is_digit[1:-2] & is_digit[2:-1] & is_digit[3:]
+    valid = ~bad.any(axis=0)
+    valid &= numpy.count_nonzero(is_dot, axis=0) == 3
+
+    # per column multiplier for the octet in progress: 10 for a digit, 0 for
+    # a dot (start a new octet) and 1 for padding
+    digit = (digit * is_digit).astype(numpy.uint16)
+    mul = (is_digit * numpy.uint8(9) + ~is_dot).astype(numpy.uint16)
+    shift = (is_dot * numpy.uint8(8)).astype(numpy.uint32)
+    dots = is_dot.astype(numpy.uint16)
+
+    rows = cols.shape[1]
+    value = numpy.zeros(rows, dtype=numpy.uint32)
+    octet = numpy.zeros(rows, dtype=numpy.uint16)
+    high = numpy.zeros(rows, dtype=numpy.uint16)
+    for col in range(cols.shape[0]):
+        done = octet * dots[col]
+        numpy.maximum(high, done, out=high)
+        value <<= shift[col]
+        value += done
+        octet *= mul[col]
+        octet += digit[col]
+    numpy.maximum(high, octet, out=high)
+    value <<= 8
+    value += octet
+
+    valid &= high <= 255
+    value *= valid
+    return value, valid
+# end _parse_char_matrix
+
+
+def _line_chars(buf, starts, lengths, width=16):
+    """Gather lines from a byte array into a zero padded character matrix.
+
+    :param buf: Flat array of bytes, with at least ``width`` bytes of padding
+        after the last line.
+    :type buf: numpy.ndarray
+    :param starts: Offset of each line in ``buf``.
+    :type starts: numpy.ndarray
+    :param lengths: Length of each line.
+    :type lengths: numpy.ndarray
+    :param width: Number of columns in the result.
+    :type width: int
+    :returns: 2-d ``uint8`` array of characters.
+    """
+    cols = numpy.arange(width)
+    chars = buf[starts[:, None] + cols]
+    # a NUL byte inside a line must not look like padding
+    chars[chars == 0] = 1
+    chars *= cols < lengths[:, None]
+    return chars
+# end _line_chars
+
+
+def ip2long_array(data, batch_size=8192):
+    """Convert many dotted-quad ip addresses to network byte order 32-bit
+    integers using numpy.
+
+    ``data`` is either a sequence of strings or a bytes-like buffer of
+    newline separated addresses (a trailing newline and ``\\r\\n`` line
+    endings are accepted). Input is parsed ``batch_size`` addresses at a time
+    with vectorized operations instead of one address at a time. Only the
+    four octet form is accepted, matching ``ip2long(ip, strict=True)``.
+
+    Invalid addresses are reported as ``False`` in the returned mask and
+    have a value of 0.
+
+
+    :param data: Addresses to convert.
+    :type data: sequence of str or bytes
+    :param batch_size: Number of addresses to parse per batch.
+    :type batch_size: int
+    :returns: Tuple of ``uint32`` array and ``bool`` validity mask array.
+    :raises: ImportError if numpy is not installed
+    """
+    _require_numpy()
+    values = []
+    valid = []
+
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        buf = numpy.frombuffer(data, dtype=numpy.uint8)
+        if len(buf) == 0:
+            return (
+                numpy.zeros(0, dtype=numpy.uint32),
+                numpy.zeros(0, dtype=bool))
+        padded = numpy.zeros(len(buf) + 16, dtype=numpy.uint8)
+        padded[:len(buf)] = buf
+        newlines = numpy.flatnonzero(buf == 10)
+        starts = numpy.concatenate(([0], newlines + 1))
+        ends = numpy.concatenate((newlines, [len(buf)]))
+        if buf[-1] == 10:
+            # no line after the trailing newline
+            starts, ends = starts[:-1], ends[:-1]
+        # drop '\r' from '\r\n' line endings
+        has_cr = (ends > starts) & (buf[numpy.maximum(ends - 1, 0)] == 13)
+        lengths = ends - starts - has_cr
+
+        for pos in range(0, len(starts), batch_size):
+            batch_starts = starts[pos:pos + batch_size]
+            batch_lengths = lengths[pos:pos + batch_size]
+            # lines longer than the 15 characters of '255.255.255.255' are
+            # cut off, but the 16th character is enough to make them invalid
+            val, ok = _parse_char_matrix(
+                _line_chars(padded, batch_starts, batch_lengths))
+            values.append(val)
+            valid.append(ok)
+    else:
+        data = list(data)
+        for pos in range(0, len(data), batch_size):
+            items = data[pos:pos + batch_size]
+            batch = numpy.array(items, dtype=str)
+            if batch.dtype.itemsize == 0:
+                # every address in the batch is an empty string
+                batch = numpy.zeros(len(batch), dtype='U1')
+            chars = batch.view(numpy.uint32).reshape(len(batch), -1)
+            val, ok = _parse_char_matrix(chars)
+            # numpy strings drop trailing NULs, which ip2long rejects
+            ok &= numpy.char.str_len(batch) == numpy.fromiter(
+                map(len, items), dtype=numpy.intp, count=len(items))
+            val *= ok
+            values.append(val)
+            valid.append(ok)
+
+    if not values:
+        return numpy.zeros(0, dtype=numpy.uint32), numpy.zeros(0, dtype=bool)
+    return numpy.concatenate(values), numpy.concatenate(valid)
+# end ip2long_array
+
+
+def long2ip_array(values):
+    """Convert an array of network byte order 32-bit integers to dotted-quad
+    ip addresses using numpy.
+
+    Each octet is looked up in an array of precomputed octet strings and the
+    pieces are joined with vectorized string concatenation. The result has
+    the shape of `values`.
+
+
+    :param values: Network byte order 32-bit integers.
+    :type values: numpy.ndarray or sequence of int
+    :returns: Array of dotted-quad ip addresses (``str`` dtype).
+    :raises: ImportError if numpy is not installed
+    :raises: TypeError if a value is out of range
+    """
+    _require_numpy()
+    values = numpy.asarray(values)
+    if values.size and (values.min() < MIN_IP or values.max() > MAX_IP):
+        raise TypeError(
+            "expected int between %d and %d inclusive" % (MIN_IP, MAX_IP))
+    shape = values.shape
+    values = values.astype(numpy.int64).ravel()
+
+    dots = numpy.array(_OCTET_DOTS)
+    strs = numpy.array(_OCTET_STRS)
+    add = numpy.char.add
+    return add(add(add(
+        dots[values >> 24], dots[values >> 16 & 255]),
+        dots[values >> 8 & 255]), strs[values & 255]).reshape(shape)
+# end long2ip_array
+
+
 def ip2hex(addr):
     """Convert a dotted-quad ip address to a hex encoded number.
 
@@ -511,6 +925,54 @@ def hex2ip(hex_str):
 # end hex2ip
 
 
+def ip2packed(addr):
+    """Convert a dotted-quad ip address to a packed 4 byte network byte order
+    string as found in packet headers.
+
+
+    >>> ip2packed('127.0.0.1') == b'\\x7f\\x00\\x00\\x01'
+    True
+    >>> ip2packed('127.1') == ip2packed('127.0.0.1')
+    True
+    >>> ip2packed('127.0.0.256') is None
+    True
+
+
+    :param addr: Dotted-quad ip address.
+    :type addr: str
+    :returns: Packed address as :class:`bytes` or ``None`` if invalid.
+    """
+    netip = ip2long(addr)
+    if netip is None:
+        return None
+    return _PACKED.pack(netip)
+# end ip2packed
+
+
+def packed2long(packed):
+    """Convert a packed 4 byte network byte order address to a 32-bit
+    integer.
+
+
+    >>> packed2long(b'\\x7f\\x00\\x00\\x01')
+    2130706433
+    >>> packed2long(memoryview(b'\\x45\\x00\\xc0\\x00\\x02\\x80')[2:])
+    3221226112
+    >>> packed2long(b'\\x7f\\x00\\x01') is None
+    True
+
+
+    :param packed: Packed address.
+    :type packed: bytes, bytearray or memoryview
+    :returns: Network byte order 32-bit integer or ``None`` if `packed` is not
+        4 bytes long.
+    """
+    if len(packed) != _PACKED.size:
+        return None
+    return _PACKED.unpack(packed)[0]
+# end packed2long
+
+
 def cidr2block(cidr):
     """Convert a CIDR notation ip address into a tuple containing the network
     block start and end addresses.
@@ -548,6 +1010,48 @@ def cidr2block(cidr):
 # end cidr2block
 
 
+def range2cidrs(start, end):
+    """Convert an inclusive range of network byte order 32-bit integers to
+    the shortest list of CIDR notation blocks that covers it exactly.
+
+    Each block is the largest one that starts at the first uncovered
+    address, which is limited by the number of trailing zero bits of that
+    address and by the number of addresses left.
+
+
+    >>> range2cidrs(ip2long('10.0.0.0'), ip2long('10.0.0.255'))
+    ['10.0.0.0/24']
+    >>> range2cidrs(ip2long('10.0.0.1'), ip2long('10.0.0.10'))
+    ... #doctest: +NORMALIZE_WHITESPACE
+    ['10.0.0.1/32', '10.0.0.2/31', '10.0.0.4/30', '10.0.0.8/31',
+     '10.0.0.10/32']
+    >>> range2cidrs(MIN_IP, MAX_IP)
+    ['0.0.0.0/0']
+
+
+    :param start: First address in range.
+    :type start: int
+    :param end: Last address in range.
+    :type end: int
+    :returns: List of CIDR notation blocks.
+    :raises: TypeError
+    """
+    if MAX_IP < end or start < MIN_IP or end < start:
+        raise TypeError(
+            "expected start <= end between %d and %d inclusive" % (
+                MIN_IP, MAX_IP))
+    cidrs = []
+    while start <= end:
+        # trailing zero bits of start allow a block of 2**shift addresses
+        shift = (start & -start).bit_length() - 1 if start else 32
+        # ...but the block must not run past end
+        shift = min(shift, (end - start + 1).bit_length() - 1)
+        cidrs.append('%s/%d' % (long2ip(start), 32 - shift))
+        start += 1 << shift
+    return cidrs
+# end range2cidrs
+
+
 def netmask2prefix(mask):
     """Convert a dotted-quad netmask into a CIDR prefix.
 
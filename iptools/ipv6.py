@@ -24,16 +24,34 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 import re
+import struct
 from . import ipv4
 
+try:
+    import numpy
+except ImportError:
+    # numpy is optional and only needed by the *_array functions
+    numpy = None
+
 __all__ = (
+    'array2long',
     'cidr2block',
+    'cidr2block_array',
+    'compare_array',
     'ip2long',
+    'ip2long_array',
+    'ip2packed',
+    'long2array',
     'long2ip',
+    'long2ip_array',
+    'long2ip_many',
     'long2rfc1924',
+    'packed2long',
+    'range2cidrs',
     'rfc19242long',
     'validate_cidr',
     'validate_ip',
+    'ARRAY_DTYPE',
     'DOCUMENTATION_NETWORK',
     'IPV4_MAPPED',
     'IPV6_TO_IPV4_NETWORK',
@@ -57,15 +75,43 @@ __all__ = (
     'UNSPECIFIED_ADDRESS',
 )
 
-#: Regex for validating an IPv6 in hex notation
-_HEX_RE = re.compile(r'^([0-9a-fA-F]{0,4}:){2,7}[0-9a-fA-F]{0,4}$')
+#: Characters allowed in a hextet
+_HEXDIGITS = '0123456789abcdefABCDEF'
+
+#: Separators, empty hextet and hextet characters used by :func:`_parse` for
+#: str and bytes addresses. The dot is only searched for, which is much
+#: faster with an int than a one byte string on python3.
+_STR_TOKENS = (':', '.', '', _HEXDIGITS)
+_BYTES_TOKENS = (b':', b'.' if bytes is str else ord('.'), b'',
+                 _HEXDIGITS.encode('ascii'))
+
+#: Runs of zero hextets that can be compressed to '::' (longest first)
+_ZERO_RUNS = tuple(':' + '0:' * n for n in range(8, 1, -1))
 
-#: Regex for validating an IPv6 in dotted-quad notation
-_DOTTED_QUAD_RE = re.compile(r'^([0-9a-f]{0,4}:){2,6}(\d{1,3}\.){0,3}\d{1,3}$')
+#: Template for formatting 8 hextets between sentinel colons
+_HEXTETS_FMT = ':%x:%x:%x:%x:%x:%x:%x:%x:'
+
+#: Text of a byte as the high (unpadded) or low (padded) half of a hextet
+_BYTE_HEX = tuple('%x' % i for i in range(256))
+_BYTE_HEX02 = tuple('%02x' % i for i in range(256))
 
 #: Regex for validating a CIDR network
 _CIDR_RE = re.compile(r'^([0-9a-f]{0,4}:){2,7}[0-9a-f]{0,4}/\d{1,3}$')
 
+#: numpy dtype for an array of IPv6 addresses. NumPy has no 128-bit integer
+#: so each address is held as a pair of network byte order 64-bit halves.
+#: The raw bytes of an item are the packed 16 byte address, which also
+#: compare in numeric order.
+ARRAY_DTYPE = None
+if numpy is not None:
+    ARRAY_DTYPE = numpy.dtype([('hi', '>u8'), ('lo', '>u8')])
+
+#: Mask for the low 64 bits of an address
+_LO_MASK = 0xffffffffffffffff
+
+#: Packed network byte order 128-bit integer as high and low 64-bit halves
+_PACKED = struct.Struct('!QQ')
+
 #: Mamimum IPv6 integer
 MAX_IP = 0xffffffffffffffffffffffffffffffff
 #: Minimum IPv6 integer
@@ -186,6 +232,18 @@ def validate_ip(s):
     TypeError: expected string or buffer
     >>> validate_ip('1080:0:0:0:8:800:200c:417a')
     True
+    >>> validate_ip('1:2:3')
+    False
+    >>> validate_ip('1:2:3:4:5:6:7:8:9')
+    False
+    >>> validate_ip('1:2:3:4:5:6:7::')
+    True
+    >>> validate_ip(':1::2')
+    False
+    >>> validate_ip('1:::2')
+    False
+    >>> validate_ip('::0x1f')
+    False
 
 
     :param s: String to validate as a hexidecimal IPv6 ip address.
@@ -194,22 +252,92 @@ def validate_ip(s):
               ``False`` otherwise.
     :raises: TypeError
     """
-    if _HEX_RE.match(s):
-        return len(s.split('::')) <= 2
-    if _DOTTED_QUAD_RE.match(s):
-        halves = s.split('::')
-        if len(halves) > 2:
-            return False
-        hextets = s.split(':')
-        quads = hextets[-1].split('.')
-        for q in quads:
-            if int(q) > 255:
-                return False
-        return True
-    return False
+    return _parse(s) is not None
 # end validate_ip
 
 
+def _parse(ip):
+    """Validate and convert a hexidecimal IPv6 address in a single pass.
+
+    The address is split on ':' once. Hextets are accumulated into a head
+    value until the '::' gap is seen and into a tail value afterwards, so the
+    zero run is expanded by a single shift instead of padding a list. A
+    trailing dotted-quad is converted with :func:`iptools.ipv4.ip2long` and
+    counts as two hextets. ASCII bytes are parsed as is, without decoding.
+
+    :param ip: Hexidecimal IPv6 address
+    :type ip: str, bytes, bytearray or memoryview
+    :returns: Network byte order 128-bit integer or ``None`` if ip is invalid.
+    :raises: TypeError
+    """
+    if isinstance(ip, ipv4._BUFFERS):
+        ip = ipv4._buffer2bytes(ip)
+    colon, dot, empty, hexdigits = _STR_TOKENS
+    if isinstance(ip, bytes):
+        colon, dot, empty, hexdigits = _BYTES_TOKENS
+    try:
+        parts = ip.split(colon)
+    except AttributeError:
+        raise TypeError("expected string or buffer")
+    end = len(parts)
+    if end < 3 or end > 9:
+        return None
+
+    pos = 0
+    if empty == parts[0]:
+        # leading '::'
+        if empty != parts[1]:
+            return None
+        pos = 1
+    if empty == parts[-1]:
+        # trailing '::'
+        if empty != parts[-2]:
+            return None
+        end -= 1
+
+    v4 = None
+    if dot in parts[end - 1]:
+        # embedded dotted-quad suffix
+        v4 = ipv4.ip2long(parts[end - 1])
+        if v4 is None:
+            return None
+        end -= 1
+
+    head = tail = 0
+    head_len = tail_len = 0
+    gap = False
+    for h in parts[pos:end]:
+        if empty == h:
+            if gap:
+                return None
+            gap = True
+        elif len(h) > 4 or h.lstrip(hexdigits):
+            return None
+        elif gap:
+            tail = (tail << 16) | int(h, 16)
+            tail_len += 1
+        else:
+            head = (head << 16) | int(h, 16)
+            head_len += 1
+
+    if v4 is not None:
+        if gap:
+            tail = (tail << 32) | v4
+            tail_len += 2
+        else:
+            head = (head << 32) | v4
+            head_len += 2
+
+    if gap:
+        if head_len + tail_len > 7:
+            return None
+        return (head << (16 * (8 - head_len))) | tail
+    if head_len != 8:
+        return None
+    return head
+# end _parse
+
+
 def ip2long(ip):
     """Convert a hexidecimal IPv6 address to a network byte order 128-bit
     integer.
@@ -229,8 +357,8 @@ def ip2long(ip):
     >>> expect = 0x20010db8000000000001000000000001
     >>> ip2long('2001:db8::1:0:0:1') == expect
     True
-    >>> expect = 281473902969472
-    >>> ip2long('::ffff:192.0.2.128') == expect
+    >>> mapped = 281473902969472
+    >>> ip2long('::ffff:192.0.2.128') == mapped
     True
     >>> expect = 0xffffffffffffffffffffffffffffffff
     >>> ip2long('ffff:ffff:ffff:ffff:ffff:ffff:ffff:ffff') == expect
@@ -240,41 +368,21 @@ def ip2long(ip):
     >>> expect = 21932261930451111902915077091070067066
     >>> ip2long('1080:0:0:0:8:800:200C:417A') == expect
     True
+    >>> ip2long('::1.2.3.4') == 0x01020304
+    True
+    >>> ip2long('1:2:3:4:5:6:7:1.2.3.4') == None
+    True
+    >>> ip2long(b'::ffff:192.0.2.128') == mapped
+    True
+    >>> ip2long(bytearray(b'::ffff:c000:280')) == mapped
+    True
 
 
-    :param ip: Hexidecimal IPv6 address
-    :type ip: str
+    :param ip: Hexidecimal IPv6 address. Binary values must hold ASCII text.
+    :type ip: str, bytes, bytearray or memoryview
     :returns: Network byte order 128-bit integer or ``None`` if ip is invalid.
     """
-    if not validate_ip(ip):
-        return None
-
-    if '.' in ip:
-        # convert IPv4 suffix to hex
-        chunks = ip.split(':')
-        v4_int = ipv4.ip2long(chunks.pop())
-        if v4_int is None:
-            return None
-        chunks.append('%x' % ((v4_int >> 16) & 0xffff))
-        chunks.append('%x' % (v4_int & 0xffff))
-        ip = ':'.join(chunks)
-
-    halves = ip.split('::')
-    hextets = halves[0].split(':')
-    if len(halves) == 2:
-        h2 = halves[1].split(':')
-        for z in range(8 - (len(hextets) + len(h2))):
-            hextets.append('0')
-        for h in h2:
-            hextets.append(h)
-    # end if
-
-    lngip = 0
-    for h in hextets:
-        if '' == h:
-            h = '0'
-        lngip = (lngip << 16) | int(h, 16)
-    return lngip
+    return _parse(ip)
 # end ip2long
 
 
@@ -322,36 +430,119 @@ def long2ip(l, rfc1924=False):
 
     if rfc1924:
         return long2rfc1924(l)
+    return _format(l)
+# end long2ip
+
+
+def _format(lngip):
+    """Format a 128-bit integer as a canonical IPv6 address without any
+    range checking.
+
+    The hextets are formatted in one operation between sentinel colons so
+    that the left most longest run of zeros can be found with substring
+    searches and replaced by '::'
+    (`RFC 5952 <https://tools.ietf.org/html/rfc5952>`_).
+
+    :param lngip: Network byte order 128-bit integer.
+    :type lngip: int
+    :returns: Canonical IPv6 address (eg. '::1').
+    """
+    hi = lngip >> 64
+    lo = lngip & 0xffffffffffffffff
+    s = _HEXTETS_FMT % (
+        hi >> 48, hi >> 32 & 0xffff, hi >> 16 & 0xffff, hi & 0xffff,
+        lo >> 48, lo >> 32 & 0xffff, lo >> 16 & 0xffff, lo & 0xffff)
+    if ':0:0:' not in s:
+        return s[1:-1]
+    for run in _ZERO_RUNS:
+        if run in s:
+            s = s.replace(run, '::', 1)
+            break
+    # keep a sentinel colon only where it is now part of '::'
+    start = 0 if '::' == s[:2] else 1
+    end = len(s) if '::' == s[-2:] else -1
+    return s[start:end]
+# end _format
+
+
+def long2ip_many(iterable):
+    """Convert an iterable of network byte order 128-bit integers to a list of
+    canonical IPv6 addresses.
+
+    The range check is done once for the whole input rather than once per
+    address. Runs of consecutive addresses given as a ``range`` are formatted
+    incrementally: the text before the last hextet is the same for every
+    address with a non-zero last hextet in a /112, so it is formatted once
+    per /112 and only the last hextet is appended for each address.
+
+
+    >>> long2ip_many([0, 1, 42540766411282592856904266426630537217])
+    ['::', '::1', '2001:db8::1:0:0:1']
+    >>> long2ip_many(range(MAX_IP - 1, MAX_IP + 1))
+    ... #doctest: +NORMALIZE_WHITESPACE
+    ['ffff:ffff:ffff:ffff:ffff:ffff:ffff:fffe',
+     'ffff:ffff:ffff:ffff:ffff:ffff:ffff:ffff']
+    >>> long2ip_many(range(ip2long('fe80::fffe'), ip2long('fe80::1:2')))
+    ['fe80::fffe', 'fe80::ffff', 'fe80::1:0', 'fe80::1:1']
+    >>> long2ip_many([])
+    []
+    >>> long2ip_many([1, -1]) #doctest: +IGNORE_EXCEPTION_DETAIL
+    Traceback (most recent call last):
+        ...
+    TypeError: expected int between 0 and <really big int> inclusive
+
+
+    :param iterable: Network byte order 128-bit integers.
+    :type iterable: iterable of int
+    :returns: List of canonical IPv6 addresses.
+    :raises: TypeError
+    """
+    if isinstance(iterable, ipv4._RANGE_TYPES):
+        if not len(iterable):
+            return []
+        first, last = iterable[0], iterable[-1]
+        lo, hi = min(first, last), max(first, last)
+        consecutive = len(iterable) == 1 or iterable[1] - first == 1
+    else:
+        iterable = list(iterable)
+        if not iterable:
+            return []
+        lo, hi = min(iterable), max(iterable)
+        consecutive = False
+    if MAX_IP < hi or lo < MIN_IP:
+        raise TypeError(
+            "expected int between %d and %d inclusive" % (MIN_IP, MAX_IP))
 
-    # format as one big hex value
-    hex_str = '%032x' % l
-    # split into double octet chunks without padding zeros
-    hextets = ['%x' % int(hex_str[x:x + 4], 16) for x in range(0, 32, 4)]
-
-    # find and remove left most longest run of zeros
-    dc_start, dc_len = (-1, 0)
-    run_start, run_len = (-1, 0)
-    for idx, hextet in enumerate(hextets):
-        if '0' == hextet:
-            run_len += 1
-            if -1 == run_start:
-                run_start = idx
-            if run_len > dc_len:
-                dc_len, dc_start = (run_len, run_start)
+    if not consecutive:
+        return list(map(_format, iterable))
+
+    out = []
+    start, stop = lo, hi + 1
+    prefix_base = None
+    while start < stop:
+        base = start & ~0xffff
+        if base != prefix_base:
+            # canonical text of base + 1 without its last hextet ('1')
+            prefix = _format(base | 1)[:-1]
+            prefix_base = base
+        if start == base:
+            out.append(_format(start))
+            start += 1
+            continue
+        block_stop = min((start | 255) + 1, stop)
+        high = start >> 8 & 255
+        if high:
+            block_prefix = prefix + _BYTE_HEX[high]
+            strs = _BYTE_HEX02
         else:
-            run_len, run_start = (0, -1)
-    # end for
-    if dc_len > 1:
-        dc_end = dc_start + dc_len
-        if dc_end == len(hextets):
-            hextets += ['']
-        hextets[dc_start:dc_end] = ['']
-        if dc_start == 0:
-            hextets = [''] + hextets
-    # end if
-
-    return ':'.join(hextets)
-# end long2ip
+            block_prefix = prefix
+            strs = _BYTE_HEX
+        out.extend(map(
+            block_prefix.__add__,
+            strs[start & 255:(block_stop - 1 & 255) + 1]))
+        start = block_stop
+    return out
+# end long2ip_many
 
 
 def long2rfc1924(l):
@@ -420,6 +611,55 @@ def rfc19242long(s):
     return x
 
 
+def ip2packed(addr):
+    """Convert a hexidecimal IPv6 address to a packed 16 byte network byte
+    order string as found in packet headers.
+
+
+    >>> ip2packed('::1') == b'\\x00' * 15 + b'\\x01'
+    True
+    >>> ip2packed('2001:db8::') == b'\\x20\\x01\\x0d\\xb8' + b'\\x00' * 12
+    True
+    >>> ip2packed('::fffff') is None
+    True
+
+
+    :param addr: Hexidecimal IPv6 address.
+    :type addr: str
+    :returns: Packed address as :class:`bytes` or ``None`` if invalid.
+    """
+    netip = ip2long(addr)
+    if netip is None:
+        return None
+    return _PACKED.pack(netip >> 64, netip & _LO_MASK)
+# end ip2packed
+
+
+def packed2long(packed):
+    """Convert a packed 16 byte network byte order address to a 128-bit
+    integer.
+
+
+    >>> packed2long(b'\\x00' * 15 + b'\\x01') == 1
+    True
+    >>> packed2long(ip2packed('2001:db8::1')) == ip2long('2001:db8::1')
+    True
+    >>> packed2long(b'\\x00' * 4) is None
+    True
+
+
+    :param packed: Packed address.
+    :type packed: bytes, bytearray or memoryview
+    :returns: Network byte order 128-bit integer or ``None`` if `packed` is
+        not 16 bytes long.
+    """
+    if len(packed) != _PACKED.size:
+        return None
+    hi, lo = _PACKED.unpack(packed)
+    return hi << 64 | lo
+# end packed2long
+
+
 def validate_cidr(s):
     """Validate a CIDR notation ip address.
 
@@ -496,4 +736,223 @@ def cidr2block(cidr):
     return (long2ip(block_start), long2ip(block_end))
 # end cidr2block
 
+
+def range2cidrs(start, end):
+    """Convert an inclusive range of network byte order 128-bit integers to
+    the shortest list of CIDR notation blocks that covers it exactly.
+
+    Each block is the largest one that starts at the first uncovered
+    address, which is limited by the number of trailing zero bits of that
+    address and by the number of addresses left.
+
+
+    >>> range2cidrs(ip2long('2001:db8::'), ip2long('2001:db8::ffff'))
+    ['2001:db8::/112']
+    >>> range2cidrs(ip2long('fe80::ff'), ip2long('fe80::200'))
+    ['fe80::ff/128', 'fe80::100/120', 'fe80::200/128']
+    >>> range2cidrs(MIN_IP, MAX_IP)
+    ['::/0']
+
+
+    :param start: First address in range.
+    :type start: int
+    :param end: Last address in range.
+    :type end: int
+    :returns: List of CIDR notation blocks.
+    :raises: TypeError
+    """
+    if MAX_IP < end or start < MIN_IP or end < start:
+        raise TypeError(
+            "expected start <= end between %d and %d inclusive" % (
+                MIN_IP, MAX_IP))
+    cidrs = []
+    while start <= end:
+        # trailing zero bits of start allow a block of 2**shift addresses
+        shift = (start & -start).bit_length() - 1 if start else 128
+        # ...but the block must not run past end
+        shift = min(shift, (end - start + 1).bit_length() - 1)
+        cidrs.append('%s/%d' % (long2ip(start), 128 - shift))
+        start += 1 << shift
+    return cidrs
+# end range2cidrs
+
+
+def long2array(values):
+    """Convert network byte order 128-bit integers to a numpy array of
+    :data:`ARRAY_DTYPE`.
+
+
+    :param values: Network byte order 128-bit integers.
+    :type values: iterable of int
+    :returns: Array of :data:`ARRAY_DTYPE`.
+    :raises: ImportError if numpy is not installed
+    :raises: TypeError if a value is out of range
+    """
+    ipv4._require_numpy()
+    values = list(values)
+    arr = numpy.zeros(len(values), dtype=ARRAY_DTYPE)
+    if values:
+        if MAX_IP < max(values) or min(values) < MIN_IP:
+            raise TypeError(
+                "expected int between %d and %d inclusive" % (
+                    MIN_IP, MAX_IP))
+        arr['hi'] = [v >> 64 for v in values]
+        arr['lo'] = [v & _LO_MASK for v in values]
+    return arr
+# end long2array
+
+
+def array2long(arr):
+    """Convert a numpy array of :data:`ARRAY_DTYPE` to a list of network byte
+    order 128-bit integers.
+
+
+    :param arr: Array of :data:`ARRAY_DTYPE`.
+    :type arr: numpy.ndarray
+    :returns: List of network byte order 128-bit integers.
+    """
+    return [
+        hi << 64 | lo for hi, lo in zip(
+            arr['hi'].ravel().tolist(), arr['lo'].ravel().tolist())]
+# end array2long
+
+
+def ip2long_array(data):
+    """Convert many hexidecimal IPv6 addresses to a numpy array of
+    :data:`ARRAY_DTYPE`.
+
+    ``data`` is either a sequence of strings or a bytes-like buffer of
+    newline separated addresses (a trailing newline and ``\\r\\n`` line
+    endings are accepted). The addresses are parsed with the same single
+    pass parser as :func:`ip2long` and written straight into the result
+    array.
+
+    Invalid addresses are reported as ``False`` in the returned mask and
+    have a value of 0.
+
+
+    :param data: Addresses to convert.
+    :type data: sequence of str or bytes
+    :returns: Tuple of :data:`ARRAY_DTYPE` array and ``bool`` validity mask
+        array.
+    :raises: ImportError if numpy is not installed
+    """
+    ipv4._require_numpy()
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        text = bytes(data).decode('ascii', 'replace')
+        data = text.split('\n')
+        if text.endswith('\n'):
+            data.pop()
+        data = [line[:-1] if line.endswith('\r') else line for line in data]
+
+    hi = []
+    lo = []
+    valid = []
+    for ip in data:
+        lngip = _parse(ip)
+        if lngip is None:
+            lngip = 0
+            valid.append(False)
+        else:
+            valid.append(True)
+        hi.append(lngip >> 64)
+        lo.append(lngip & _LO_MASK)
+    arr = numpy.zeros(len(valid), dtype=ARRAY_DTYPE)
+    arr['hi'] = hi
+    arr['lo'] = lo
+    return arr, numpy.array(valid, dtype=bool)
+# end ip2long_array
+
+
+def long2ip_array(arr):
+    """Convert a numpy array of :data:`ARRAY_DTYPE` to canonical IPv6
+    addresses.
+
+    The result has the shape of `arr`.
+
+
+    :param arr: Array of :data:`ARRAY_DTYPE`.
+    :type arr: numpy.ndarray
+    :returns: Array of canonical IPv6 addresses (``str`` dtype).
+    :raises: ImportError if numpy is not installed
+    """
+    ipv4._require_numpy()
+    return numpy.array(
+        list(map(_format, array2long(arr))), dtype=str).reshape(arr.shape)
+# end long2ip_array
+
+
+def _prefix_mask(bits):
+    """Build ``uint64`` masks with the left most ``bits`` bits set.
+
+    :param bits: Number of bits to set (0-64).
+    :type bits: numpy.ndarray
+    :returns: ``uint64`` array of masks.
+    """
+    # shifting a 64-bit value by 64 is undefined, so 0 bits is special
+    shift = (64 - numpy.maximum(bits, 1)).astype(numpy.uint64)
+    mask = numpy.left_shift(numpy.uint64(_LO_MASK), shift)
+    return numpy.where(bits == 0, numpy.uint64(0), mask)
+# end _prefix_mask
+
+
+def cidr2block_array(arr, prefix):
+    """Compute the network block containing each address of an array.
+
+    This is the vectorized equivalent of the shift logic in
+    :func:`cidr2block`: the left most ``prefix`` bits of each address are
+    kept for the block start and the remaining bits are set for the block
+    end.
+
+
+    :param arr: Array of :data:`ARRAY_DTYPE`.
+    :type arr: numpy.ndarray
+    :param prefix: Prefix length (0-128) for all addresses or an array of
+        prefix lengths, one per address.
+    :type prefix: int or numpy.ndarray
+    :returns: Tuple of block (start, end) arrays of :data:`ARRAY_DTYPE`.
+    :raises: ImportError if numpy is not installed
+    :raises: ValueError if a prefix is out of range
+    """
+    ipv4._require_numpy()
+    prefix = numpy.asarray(prefix, dtype=numpy.int64)
+    if prefix.size and (prefix.min() < 0 or prefix.max() > 128):
+        raise ValueError("expected prefix between 0 and 128 inclusive")
+    hi_mask = _prefix_mask(numpy.minimum(prefix, 64))
+    lo_mask = _prefix_mask(numpy.maximum(prefix - 64, 0))
+
+    start = numpy.zeros(arr.shape, dtype=ARRAY_DTYPE)
+    end = numpy.zeros(arr.shape, dtype=ARRAY_DTYPE)
+    start['hi'] = arr['hi'] & hi_mask
+    start['lo'] = arr['lo'] & lo_mask
+    end['hi'] = arr['hi'] | ~hi_mask
+    end['lo'] = arr['lo'] | ~lo_mask
+    return start, end
+# end cidr2block_array
+
+
+def compare_array(a, b):
+    """Compare two arrays of :data:`ARRAY_DTYPE` element by element.
+
+    Addresses are ordered by their high then low 64-bit half, which is the
+    same as comparing the 128-bit integers.
+
+
+    :param a: Array of :data:`ARRAY_DTYPE`.
+    :type a: numpy.ndarray
+    :param b: Array of :data:`ARRAY_DTYPE` or a single 128-bit integer.
+    :type b: numpy.ndarray or int
+    :returns: ``int8`` array holding -1 where ``a < b``, 0 where ``a == b``
+        and 1 where ``a > b``.
+    :raises: ImportError if numpy is not installed
+    """
+    ipv4._require_numpy()
+    if not isinstance(b, numpy.ndarray):
+        b = long2array([b])[0]
+    a_hi, a_lo, b_hi, b_lo = a['hi'], a['lo'], b['hi'], b['lo']
+    less = (a_hi < b_hi) | ((a_hi == b_hi) & (a_lo < b_lo))
+    greater = (a_hi > b_hi) | ((a_hi == b_hi) & (a_lo > b_lo))
+    return greater.astype(numpy.int8) - less
+# end compare_array
+
 # vim: set sw=4 ts=4 sts=4 et :
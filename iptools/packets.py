@@ -0,0 +1,458 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2008-2014, Bryan Davis and iptools contributors
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     - Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+r"""
+Bulk lookups of packed addresses in binary records and packet captures.
+
+Flow exports (NetFlow, IPFIX) and packet headers hold addresses as packed 4
+or 16 byte network byte order fields. :func:`match_records` tests such
+fields in a buffer of fixed size records against an
+:class:`iptools.IpRangeList` without converting each record to text or
+objects, and :class:`PcapReader` reads the packets of classic libpcap
+capture files.
+
+
+>>> from iptools import IpRangeList
+>>> from iptools.ipv4 import ip2packed
+>>> # 12 byte records: source, destination, 4 bytes of counters
+>>> flows = b''.join(ip2packed(src) + ip2packed(dst) + b'\x00' * 4
+...     for src, dst in [('10.0.0.1', '192.0.2.1'),
+...                      ('192.0.2.2', '10.0.0.2'),
+...                      ('192.0.2.3', '198.51.100.1')])
+>>> list(iter_records(flows, 12, (0, 4)))
+[(167772161, 3221225985), (3221225986, 167772162), (3221225987, 3325256705)]
+>>> list(match_records(IpRangeList('10/8'), flows, 12, (0, 4)))
+[1, 2, 0]
+"""
+
+import struct
+
+from . import ipv6
+from . import IpRangeList
+from . import _contains_array
+
+try:
+    import numpy
+except ImportError:
+    # numpy is optional and only speeds up match_records
+    numpy = None
+
+__all__ = (
+    'iter_records',
+    'match_records',
+    'packet_addresses',
+    'PcapReader',
+    'LINKTYPE_ETHERNET',
+    'LINKTYPE_IPV4',
+    'LINKTYPE_IPV6',
+    'LINKTYPE_LINUX_SLL',
+    'LINKTYPE_NULL',
+    'LINKTYPE_RAW',
+)
+
+#: BSD loopback encapsulation
+LINKTYPE_NULL = 0
+
+#: Ethernet II frames, optionally 802.1Q tagged
+LINKTYPE_ETHERNET = 1
+
+#: Raw IPv4 or IPv6 packets
+LINKTYPE_RAW = 101
+
+#: Linux "cooked" capture
+LINKTYPE_LINUX_SLL = 113
+
+#: Raw IPv4 packets
+LINKTYPE_IPV4 = 228
+
+#: Raw IPv6 packets
+LINKTYPE_IPV6 = 229
+
+#: Struct format of one packed address field of each family
+_FIELD_CODES = {4: ('I', 4), 6: ('QQ', 16)}
+
+#: Ethernet types of IPv4, IPv6 and VLAN tags
+_ETHERTYPE_IPV4 = 0x0800
+_ETHERTYPE_IPV6 = 0x86dd
+_ETHERTYPE_VLAN = (0x8100, 0x88a8, 0x9100)
+
+#: BSD loopback address families of IPv6 (they differ by OS)
+_NULL_AF_INET6 = (24, 28, 30)
+
+_UINT16 = struct.Struct('!H')
+_IPV4_ADDRESSES = struct.Struct('!II')
+_IPV6_ADDRESSES = struct.Struct('!QQQQ')
+
+
+def _records(buffer, stride, start, count):
+    """
+    Get a byte view of `count` records of `stride` bytes from offset `start`.
+
+    :returns: Tuple of the view and the number of records.
+    :raises: ValueError
+    """
+    if stride < 1:
+        raise ValueError('stride must be at least 1')
+    view = memoryview(buffer)
+    if view.itemsize != 1 or view.ndim != 1:
+        view = view.cast('B')
+    available = max(len(view) - start, 0) // stride
+    if count is None:
+        count = available
+    elif count > available:
+        raise ValueError('buffer holds only %d records' % available)
+    return view[start:start + count * stride], count
+# end _records
+
+
+def _field_struct(stride, offset, version):
+    """
+    Build a struct that unpacks one address field from a record.
+
+    :raises: ValueError
+    """
+    try:
+        code, size = _FIELD_CODES[version]
+    except KeyError:
+        raise ValueError('version must be 4 or 6')
+    if offset < 0 or offset + size > stride:
+        raise ValueError(
+            'field at offset %d does not fit in a %d byte record' % (
+                offset, stride))
+    return struct.Struct(
+        '!%dx%s%dx' % (offset, code, stride - offset - size))
+# end _field_struct
+
+
+def _iter_unpack(layout, view):
+    """
+    :meth:`struct.Struct.iter_unpack` for pythons that do not have it.
+    """
+    if hasattr(layout, 'iter_unpack'):
+        return layout.iter_unpack(view)
+    return (layout.unpack_from(view, pos)
+            for pos in range(0, len(view), layout.size))
+# end _iter_unpack
+
+
+def _iter_field(view, stride, offset, version):
+    """
+    Iterate over the integer values of one address field of each record.
+    """
+    layout = _field_struct(stride, offset, version)
+    if version == 4:
+        return (value for value, in _iter_unpack(layout, view))
+    return (hi << 64 | lo for hi, lo in _iter_unpack(layout, view))
+# end _iter_field
+
+
+def iter_records(buffer, stride, offsets, version=4, start=0, count=None):
+    """
+    Iterate over the packed address fields of fixed size records.
+
+
+    :param buffer: Records.
+    :type buffer: bytes, bytearray, memoryview or any buffer
+    :param stride: Size of a record in bytes.
+    :type stride: int
+    :param offsets: Offsets of the address fields in a record.
+    :type offsets: sequence of int
+    :param version: Address family of the fields, ``4`` or ``6``.
+    :type version: int
+    :param start: Offset of the first record in `buffer`, eg. to skip a
+        header.
+    :type start: int
+    :param count: Number of records, as many as `buffer` holds if ``None``.
+    :type count: int
+    :returns: Iterator of tuples of integer addresses, one per offset.
+    :raises: ValueError
+    """
+    view, count = _records(buffer, stride, start, count)
+    return zip(*[_iter_field(view, stride, offset, version)
+                 for offset in offsets])
+# end iter_records
+
+
+def _match_array(ranges, view, stride, offset, count, version):
+    """
+    Vectorized membership test of one address field of each record.
+    """
+    _field_struct(stride, offset, version)
+    if not count:
+        # numpy rejects strides for an empty view
+        return numpy.zeros(0, dtype=bool)
+    dtype = '>u4' if version == 4 else ipv6.ARRAY_DTYPE
+    values = numpy.ndarray(
+        (count,), dtype=dtype, buffer=view, offset=offset, strides=(stride,))
+    return _contains_array(ranges._v4, ranges._v6, values)
+# end _match_array
+
+
+def match_records(ranges, buffer, stride, offsets, version=4, start=0,
+                  count=None):
+    r"""
+    Test the packed address fields of fixed size records against ranges.
+
+    Fields are read straight from the buffer. With numpy installed each
+    field is viewed as a strided array and tested with
+    :meth:`iptools.IpRangeList.contains_many` style vectorized lookups,
+    without copying the records. Fields match exactly when their integer
+    value is ``in`` `ranges`, so IPv4-mapped IPv6 fields also match the IPv4
+    ranges.
+
+
+    >>> from iptools import IpRangeList
+    >>> from iptools.ipv6 import ip2packed
+    >>> records = ip2packed('::ffff:10.0.0.1') + ip2packed('2001:db8::1')
+    >>> list(match_records(IpRangeList('10/8'), records, 16, (0,), 6))
+    [1, 0]
+
+
+    :param ranges: Ranges to test against.
+    :type ranges: IpRangeList
+    :param buffer: Records.
+    :type buffer: bytes, bytearray, memoryview or any buffer
+    :param stride: Size of a record in bytes.
+    :type stride: int
+    :param offsets: Offsets of up to 8 address fields in a record.
+    :type offsets: sequence of int
+    :param version: Address family of the fields, ``4`` or ``6``.
+    :type version: int
+    :param start: Offset of the first record in `buffer`, eg. to skip a
+        header.
+    :type start: int
+    :param count: Number of records, as many as `buffer` holds if ``None``.
+    :type count: int
+    :returns: :class:`bytearray` with one byte per record in which bit ``i``
+        is set if the field at ``offsets[i]`` is in `ranges`.
+    :raises: ValueError
+    """
+    if len(offsets) > 8:
+        raise ValueError('at most 8 fields can be matched at once')
+    if not isinstance(ranges, IpRangeList):
+        ranges = IpRangeList(ranges)
+    view, count = _records(buffer, stride, start, count)
+
+    if numpy is not None:
+        flags = numpy.zeros(count, dtype=numpy.uint8)
+        for bit, offset in enumerate(offsets):
+            found = _match_array(ranges, view, stride, offset, count, version)
+            flags |= found.astype(numpy.uint8) << bit
+        return bytearray(flags.tobytes())
+
+    flags = bytearray(count)
+    contains = ranges.__contains__
+    for bit, offset in enumerate(offsets):
+        mask = 1 << bit
+        values = _iter_field(view, stride, offset, version)
+        for pos, value in enumerate(values):
+            if contains(value):
+                flags[pos] |= mask
+    return flags
+# end match_records
+
+
+def packet_addresses(packet, linktype=LINKTYPE_ETHERNET):
+    r"""
+    Get the source and destination addresses of an IPv4 or IPv6 packet.
+
+
+    >>> from iptools.ipv4 import ip2packed
+    >>> header = b'\x45' + b'\x00' * 11
+    >>> packet = header + ip2packed('192.0.2.1') + ip2packed('10.0.0.1')
+    >>> packet_addresses(packet, LINKTYPE_RAW)
+    (4, 3221225985, 167772161)
+    >>> frame = b'\x00' * 12 + b'\x08\x00' + packet
+    >>> packet_addresses(frame)
+    (4, 3221225985, 167772161)
+    >>> packet_addresses(b'\x00' * 12 + b'\x08\x06' + packet) is None
+    True
+
+
+    :param packet: Captured packet, starting with the link layer header.
+    :type packet: bytes, bytearray or memoryview
+    :param linktype: Link layer header type, one of the ``LINKTYPE_*``
+        constants.
+    :type linktype: int
+    :returns: ``(version, source, destination)`` tuple or ``None`` if the
+        packet is not IPv4 or IPv6 or is truncated.
+    :raises: ValueError for an unsupported link type.
+    """
+    try:
+        if linktype == LINKTYPE_ETHERNET:
+            offset = 12
+            ethertype, = _UINT16.unpack_from(packet, offset)
+            while ethertype in _ETHERTYPE_VLAN:
+                offset += 4
+                ethertype, = _UINT16.unpack_from(packet, offset)
+            offset += 2
+            if ethertype not in (_ETHERTYPE_IPV4, _ETHERTYPE_IPV6):
+                return None
+        elif linktype == LINKTYPE_LINUX_SLL:
+            offset = 16
+            ethertype, = _UINT16.unpack_from(packet, 14)
+            if ethertype not in (_ETHERTYPE_IPV4, _ETHERTYPE_IPV6):
+                return None
+        elif linktype == LINKTYPE_NULL:
+            offset = 4
+        elif linktype in (LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6):
+            offset = 0
+        else:
+            raise ValueError('unsupported link type %d' % linktype)
+
+        version = bytearray(packet[offset:offset + 1])[0] >> 4
+        if version == 4:
+            src, dst = _IPV4_ADDRESSES.unpack_from(packet, offset + 12)
+        elif version == 6:
+            src_hi, src_lo, dst_hi, dst_lo = _IPV6_ADDRESSES.unpack_from(
+                packet, offset + 8)
+            src, dst = src_hi << 64 | src_lo, dst_hi << 64 | dst_lo
+        else:
+            return None
+    except (IndexError, struct.error):
+        # truncated packet
+        return None
+    return (version, src, dst)
+# end packet_addresses
+
+
+class PcapReader (object):
+    r"""
+    Read the packets of a classic libpcap capture file.
+
+    Both byte orders and the microsecond and nanosecond timestamp variants
+    are supported. The pcapng format is not.
+
+
+    >>> import io, struct
+    >>> from iptools.ipv6 import ip2packed
+    >>> header = struct.pack('<IHHiIII', 0xa1b2c3d4, 2, 4, 0, 0, 65535,
+    ...                      LINKTYPE_RAW)
+    >>> packet = b'\x60' + b'\x00' * 7 + ip2packed('::1') + ip2packed('::2')
+    >>> record = struct.pack('<IIII', 1404218096, 500000, 40, 40) + packet
+    >>> pcap = PcapReader(io.BytesIO(header + record))
+    >>> pcap.linktype == LINKTYPE_RAW, pcap.snaplen
+    (True, 65535)
+    >>> for timestamp, data in pcap:
+    ...     print('%.1f %d' % (timestamp, len(data)))
+    1404218096.5 40
+    >>> list(PcapReader(io.BytesIO(header + record)).addresses())
+    [(1404218096.5, 6, 1, 2)]
+
+
+    :param source: Path or open binary file.
+    :type source: str or file
+    :raises: ValueError if `source` is not a pcap file.
+    """
+
+    #: Magic numbers of microsecond and nanosecond resolution files
+    _MAGIC = {0xa1b2c3d4: 1e-6, 0xa1b23c4d: 1e-9}
+
+    def __init__(self, source):
+        if hasattr(source, 'read'):
+            self._file = source
+            self._owned = False
+        else:
+            self._file = open(source, 'rb')
+            self._owned = True
+        try:
+            self._read_header()
+        except Exception:
+            self.close()
+            raise
+    # end __init__
+
+    def _read_header(self):
+        header = self._file.read(24)
+        if len(header) < 24:
+            raise ValueError('not a pcap file')
+        for order in ('<', '>'):
+            magic, = struct.unpack(order + 'I', header[:4])
+            if magic in self._MAGIC:
+                break
+        else:
+            raise ValueError('not a pcap file')
+        self.resolution = self._MAGIC[magic]
+        (_, major, minor, _, _, self.snaplen, self.linktype) = \
+            struct.unpack(order + 'IHHiIII', header)
+        self.version = (major, minor)
+        self._record = struct.Struct(order + 'IIII')
+    # end _read_header
+
+    def __iter__(self):
+        """
+        Iterate over the packets.
+
+        :returns: Iterator of ``(timestamp, data)`` tuples where timestamp
+            is in seconds since the epoch and data is the captured bytes.
+        :raises: ValueError if the file is truncated.
+        """
+        read, record, resolution = self._file.read, self._record, \
+            self.resolution
+        while True:
+            header = read(record.size)
+            if not header:
+                return
+            if len(header) < record.size:
+                raise ValueError('truncated pcap record header')
+            seconds, fraction, length, _ = record.unpack(header)
+            data = read(length)
+            if len(data) < length:
+                raise ValueError('truncated pcap packet')
+            yield (seconds + fraction * resolution, data)
+    # end __iter__
+
+    def addresses(self):
+        """
+        Iterate over the addresses of the IPv4 and IPv6 packets.
+
+        :returns: Iterator of ``(timestamp, version, source, destination)``
+            tuples. Other packets are skipped.
+        :raises: ValueError
+        """
+        linktype = self.linktype
+        for timestamp, data in self:
+            found = packet_addresses(data, linktype)
+            if found is not None:
+                yield (timestamp,) + found
+    # end addresses
+
+    def close(self):
+        """
+        Close the file if it was opened from a path.
+        """
+        if self._owned:
+            self._file.close()
+    # end close
+
+    def __enter__(self):
+        return self
+    # end __enter__
+
+    def __exit__(self, *exc_info):
+        self.close()
+    # end __exit__
+# end class PcapReader
+
+# vim: set sw=4 ts=4 sts=4 et :
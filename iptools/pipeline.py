@@ -0,0 +1,456 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2008-2014, Bryan Davis and iptools contributors
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     - Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""
+Classify the client addresses of log lines against lists of ranges.
+"""
+
+import itertools
+import os
+import time
+
+from . import IpAddress
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:
+    # only needed by FileClassifier
+    ProcessPoolExecutor = None
+
+__all__ = (
+    'FileClassifier',
+    'LineClassifier',
+)
+
+try:
+    _timer = time.perf_counter
+except AttributeError:
+    # python < 3.3
+    _timer = time.time
+
+try:
+    basestring = basestring
+except NameError:
+    # 'basestring' is undefined, must be python3k
+    basestring = str
+
+
+class LineClassifier (object):
+    """
+    Tag lines with the first list of ranges that contains an address taken
+    from each line.
+
+    Each address is parsed once into an :class:`iptools.IpAddress` and then
+    tested against the lists in order. Any container that accepts
+    :class:`iptools.IpAddress` in ``in`` tests can be used as a list, such as
+    :class:`iptools.IpRangeList` or
+    :class:`iptools.compiled.CompiledRanges`. Log files usually repeat the
+    same clients, so enabling :func:`iptools.enable_parse_cache` can help.
+
+    Counters are updated as lines are classified: `lines` and `chars` read,
+    `invalid` lines without a valid address, `counts` of lines per label
+    (``None`` for lines matching no list) and `elapsed` seconds spent
+    classifying.
+
+
+    >>> from iptools import IpRangeList
+    >>> classifier = LineClassifier([
+    ...     ('internal', IpRangeList('10/8', '::1')),
+    ...     ('partner', IpRangeList('192.0.2.0/24')),
+    ... ])
+    >>> log = [
+    ...     '10.1.2.3 - - "GET / HTTP/1.1" 200\\n',
+    ...     '192.0.2.9 - - "GET /api HTTP/1.1" 200\\n',
+    ...     '::1 - - "GET / HTTP/1.1" 304\\n',
+    ...     '198.51.100.1 - - "GET / HTTP/1.1" 404\\n',
+    ...     '- - - "GET / HTTP/1.1" 400\\n',
+    ... ]
+    >>> for batch in classifier.run(log, batch_size=2):
+    ...     print([label for line, label in batch])
+    ['internal', 'partner']
+    ['internal', None]
+    [None]
+    >>> classifier.lines, classifier.invalid
+    (5, 1)
+    >>> sorted(classifier.counts.items(), key=str)
+    [('internal', 2), ('partner', 1), (None, 2)]
+
+
+    :param lists: Labels and the ranges they stand for, in priority order.
+    :type lists: dict or iterable of ``(label, ranges)`` tuples
+    :param field: Index of the whitespace (or `separator`) separated field
+        holding the address, or a function returning the address of a line.
+    :type field: int or callable
+    :param separator: Field separator, any whitespace if ``None``.
+    :type separator: str
+    """
+
+    def __init__(self, lists, field=0, separator=None):
+        if hasattr(lists, 'items'):
+            lists = lists.items()
+        self.lists = tuple(lists)
+        self.field = field
+        self.separator = separator
+        self.reset()
+    # end __init__
+
+    def reset(self):
+        """
+        Reset the counters.
+        """
+        self.lines = 0
+        self.chars = 0
+        self.invalid = 0
+        self.elapsed = 0.0
+        self.counts = {}
+    # end reset
+
+    def extract(self, line):
+        """
+        Get the address text of a line.
+
+
+        :param line: Log line.
+        :type line: str
+        :returns: Address text or ``None`` if the line has no such field.
+        """
+        if callable(self.field):
+            return self.field(line)
+        parts = line.split(self.separator, self.field + 1)
+        if len(parts) > self.field:
+            return parts[self.field]
+        return None
+    # end extract
+
+    def classify(self, address):
+        """
+        Find the label of the first list containing `address`.
+
+        Does not update the counters.
+
+
+        :param address: Ip address.
+        :type address: str, int or IpAddress
+        :returns: Label or ``None`` if no list contains the address.
+        :raises: TypeError, ValueError if the address is invalid.
+        """
+        address = IpAddress(address)
+        for label, ranges in self.lists:
+            if address in ranges:
+                return label
+        return None
+    # end classify
+
+    def classify_line(self, line):
+        """
+        Find the label of the first list containing the address of a line
+        and update the counters.
+
+
+        :param line: Log line.
+        :type line: str
+        :returns: Label or ``None`` if the line has no valid address or no
+            list contains it.
+        """
+        label = None
+        try:
+            label = self.classify(self.extract(line))
+        except (TypeError, ValueError):
+            self.invalid += 1
+        self.lines += 1
+        self.chars += len(line)
+        self.counts[label] = self.counts.get(label, 0) + 1
+        return label
+    # end classify_line
+
+    def run(self, source, batch_size=1024):
+        """
+        Classify lines lazily in batches.
+
+        Only one batch is held in memory at a time, so arbitrarily large
+        inputs can be processed. Time spent by the consumer between batches
+        is not counted in `elapsed`.
+
+
+        :param source: Path of a text file, an open file or any iterable of
+            lines.
+        :type source: str or iterable
+        :param batch_size: Number of lines per batch.
+        :type batch_size: int
+        :returns: Generator of lists of ``(line, label)`` tuples.
+        """
+        if batch_size < 1:
+            raise ValueError('batch_size must be at least 1')
+        if isinstance(source, basestring):
+            with open(source) as lines:
+                for batch in self._run(lines, batch_size):
+                    yield batch
+        else:
+            for batch in self._run(source, batch_size):
+                yield batch
+    # end run
+
+    def _run(self, lines, batch_size):
+        classify_line = self.classify_line
+        batch = []
+        started = _timer()
+        for line in lines:
+            batch.append((line, classify_line(line)))
+            if len(batch) == batch_size:
+                self.elapsed += _timer() - started
+                yield batch
+                batch = []
+                started = _timer()
+        self.elapsed += _timer() - started
+        if batch:
+            yield batch
+    # end _run
+
+    @property
+    def lines_per_second(self):
+        """
+        Lines classified per second of `elapsed` time.
+        """
+        return self.lines / self.elapsed if self.elapsed else 0.0
+    # end lines_per_second
+
+    @property
+    def chars_per_second(self):
+        """
+        Characters classified per second of `elapsed` time.
+        """
+        return self.chars / self.elapsed if self.elapsed else 0.0
+    # end chars_per_second
+# end class LineClassifier
+
+
+#: Run key and classifier of the current worker process, see
+#: :func:`_worker_classifier`
+_worker = (None, None)
+
+#: Source of the keys identifying each :meth:`FileClassifier.run`
+_runs = itertools.count()
+
+
+def _worker_classifier(settings):
+    """
+    Build the classifier of a worker process once per run.
+
+    `settings` is the run key followed by the lists, field, separator and
+    encoding.
+    Lists given as paths are compiled tables which are memory mapped rather
+    than copied. Labels are replaced by their 1-based position so results can
+    be returned as compact bytes.
+    """
+    global _worker
+    key, lists, field, separator, encoding = settings
+    if _worker[0] != key:
+        from . import compiled
+        indexed = []
+        for position, (label, ranges) in enumerate(lists, 1):
+            if isinstance(ranges, basestring):
+                ranges = compiled.load(ranges)
+            indexed.append((position, ranges))
+        _worker = (key, (LineClassifier(indexed, field, separator), encoding))
+    return _worker[1]
+# end _worker_classifier
+
+
+def _classify_chunk(settings, path, start, end):
+    """
+    Classify the lines in bytes `start` to `end` of `path` in a worker.
+
+    :returns: Tuple of the label positions of the lines (0 for no label) as
+        ``bytes`` and the line, invalid line and per-label counts.
+    """
+    classifier, encoding = _worker_classifier(settings)
+    classifier.reset()
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    lines = data.decode(encoding, 'replace').split('\n')
+    if lines[-1] == '':
+        lines.pop()
+    classify_line = classifier.classify_line
+    labels = bytearray(classify_line(line) or 0 for line in lines)
+    return (bytes(labels), classifier.lines, classifier.invalid,
+            classifier.counts)
+# end _classify_chunk
+
+
+class FileClassifier (object):
+    """
+    Classify the lines of a file in parallel worker processes.
+
+    The file is split into byte ranges that start and end on line
+    boundaries. Each worker process builds its :class:`LineClassifier` for
+    the first range it receives and then classifies whole ranges, returning
+    one byte per line. Results are yielded in file order. The lists are sent
+    along with every range, so large lists should be given as paths of
+    tables written by :func:`iptools.compiled.compile_ranges`, which every
+    worker memory maps so their pages are shared instead of copied.
+
+    Counters are updated as ranges complete: `lines`, `bytes`, `invalid`,
+    per-label `counts` and wall clock `elapsed` seconds.
+
+    Needs :mod:`concurrent.futures`, which python2 only has through the
+    ``futures`` backport::
+
+        classifier = FileClassifier([
+            ('internal', 'internal.iprt'),
+            ('partner', IpRangeList('192.0.2.0/24')),
+        ])
+        for labels in classifier.run('access.log'):
+            for label in labels:
+                ...
+        classifier.counts['internal'], classifier.lines_per_second
+
+
+    :param lists: Labels and the ranges they stand for, in priority order.
+        Ranges are any picklable container or the path of a compiled table.
+    :type lists: dict or iterable of ``(label, ranges)`` tuples
+    :param field: Index of the whitespace (or `separator`) separated field
+        holding the address, or a picklable function returning the address of
+        a line.
+    :type field: int or callable
+    :param separator: Field separator, any whitespace if ``None``.
+    :type separator: str
+    :param workers: Number of worker processes, the number of CPUs if
+        ``None``.
+    :type workers: int
+    :param chunk_size: Approximate number of bytes per range.
+    :type chunk_size: int
+    :param encoding: Encoding of the file.
+    :type encoding: str
+    :raises: ImportError, ValueError
+    """
+
+    def __init__(self, lists, field=0, separator=None, workers=None,
+                 chunk_size=16 * 1024 * 1024, encoding='utf-8'):
+        if ProcessPoolExecutor is None:
+            raise ImportError('concurrent.futures is required')
+        if hasattr(lists, 'items'):
+            lists = lists.items()
+        self.lists = tuple(lists)
+        if len(self.lists) > 255:
+            raise ValueError('at most 255 lists are supported')
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be at least 1')
+        self.field = field
+        self.separator = separator
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.encoding = encoding
+        self.reset()
+    # end __init__
+
+    def reset(self):
+        """
+        Reset the counters.
+        """
+        self.lines = 0
+        self.bytes = 0
+        self.invalid = 0
+        self.elapsed = 0.0
+        self.counts = {}
+    # end reset
+
+    def split(self, path):
+        """
+        Split a file into line aligned byte ranges.
+
+
+        :param path: File to split.
+        :type path: str
+        :returns: List of ``(start, end)`` byte offsets.
+        """
+        size = os.path.getsize(path)
+        ranges = []
+        with open(path, 'rb') as f:
+            start = 0
+            while start < size:
+                f.seek(min(start + self.chunk_size, size))
+                # move the end past the line the nominal end falls into
+                f.readline()
+                end = min(f.tell(), size)
+                ranges.append((start, end))
+                start = end
+        return ranges
+    # end split
+
+    def run(self, path):
+        """
+        Classify every line of a file.
+
+
+        :param path: File to classify.
+        :type path: str
+        :returns: Generator of lists of labels, one list per byte range and
+            one label (or ``None``) per line, in file order.
+        """
+        labels = (None,) + tuple(label for label, ranges in self.lists)
+        ranges = self.split(path)
+        # sent with every range, workers only build a classifier for a new key
+        settings = ('%d-%d' % (os.getpid(), next(_runs)), self.lists,
+                    self.field, self.separator, self.encoding)
+        started = _timer()
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            results = executor.map(
+                _classify_chunk, [settings] * len(ranges),
+                [path] * len(ranges), [start for start, end in ranges],
+                [end for start, end in ranges])
+            for (start, end), result in zip(ranges, results):
+                positions, lines, invalid, counts = result
+                self.lines += lines
+                self.bytes += end - start
+                self.invalid += invalid
+                for position, count in counts.items():
+                    label = labels[position or 0]
+                    self.counts[label] = self.counts.get(label, 0) + count
+                self.elapsed = _timer() - started
+                yield [labels[position] for position in bytearray(positions)]
+        finally:
+            executor.shutdown()
+            self.elapsed = _timer() - started
+    # end run
+
+    @property
+    def lines_per_second(self):
+        """
+        Lines classified per second of `elapsed` time.
+        """
+        return self.lines / self.elapsed if self.elapsed else 0.0
+    # end lines_per_second
+
+    @property
+    def bytes_per_second(self):
+        """
+        Bytes classified per second of `elapsed` time.
+        """
+        return self.bytes / self.elapsed if self.elapsed else 0.0
+    # end bytes_per_second
+# end class FileClassifier
+
+# vim: set sw=4 ts=4 sts=4 et :
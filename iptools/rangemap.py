@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2008-2014, Bryan Davis and iptools contributors
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     - Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""
+Mapping of address ranges to values.
+"""
+
+import heapq
+from array import array
+from bisect import bisect_right
+
+from . import ipv4
+from . import ipv6
+from . import IpAddress
+from . import IpRange
+from . import _address_families
+
+__all__ = (
+    'IpRangeMap',
+)
+
+try:
+    basestring = basestring
+except NameError:
+    # 'basestring' is undefined, must be python3k
+    basestring = str
+
+#: Smallest array typecode that holds an unsigned 32-bit integer
+_UINT32 = 'I' if array('I').itemsize >= 4 else 'L'
+
+
+def _spec_family(spec, r):
+    """
+    Address family module of the range `spec` was parsed into as `r`.
+
+    :class:`iptools.IpRange` picks the family from the end address, which
+    makes IPv6 ranges like '::1' or '::/96' IPv4. The map keeps them IPv6.
+
+
+    >>> _spec_family('::/96', IpRange('::/96')).__name__
+    'iptools.ipv6'
+    >>> _spec_family(('0.0.0.0', '0.0.0.9'), IpRange('0/28')).__name__
+    'iptools.ipv4'
+    """
+    if isinstance(spec, tuple):
+        spec = spec[0]
+    if isinstance(spec, IpAddress):
+        return ipv4 if spec.version == 4 else ipv6
+    if isinstance(spec, basestring):
+        return ipv6 if ':' in spec else ipv4
+    if isinstance(spec, (bytes, bytearray, memoryview)):
+        return ipv6 if b':' in bytes(spec) else ipv4
+    return r._ipver
+# end _spec_family
+
+
+def _flatten(entries):
+    """
+    Flatten overlapping prioritized ranges into disjoint segments.
+
+    Sweeps the sorted range boundaries keeping the ranges that cover the
+    current position in a heap ordered by priority and insertion order.
+    Neighbouring segments with the same winner are merged.
+
+
+    >>> _flatten([(0, 9, 0, 0, 'a'), (5, 14, 1, 1, 'b'), (20, 29, 0, 2, 'a')])
+    [(0, 4, 'a'), (5, 14, 'b'), (20, 29, 'a')]
+    >>> _flatten([(0, 9, 1, 0, 'a'), (5, 14, 0, 1, 'b'), (3, 4, 2, 2, 'a')])
+    [(0, 9, 'a'), (10, 14, 'b')]
+
+
+    :param entries: ``(start, end, priority, order, value)`` tuples.
+    :type entries: list
+    :returns: Sorted list of disjoint ``(start, end, value)`` tuples.
+    """
+    entries = sorted(entries, key=lambda e: e[0])
+    positions = sorted(set(
+        [e[0] for e in entries] + [e[1] + 1 for e in entries]))
+
+    segments = []
+    active = []
+    i, n = 0, len(entries)
+    for position, next_position in zip(positions, positions[1:]):
+        while i < n and entries[i][0] == position:
+            start, end, priority, order, value = entries[i]
+            heapq.heappush(active, (-priority, -order, end, value))
+            i += 1
+        # drop ranges that ended before this position
+        while active and active[0][2] < position:
+            heapq.heappop(active)
+        if not active:
+            continue
+        value = active[0][3]
+        if segments and segments[-1][1] == position - 1 and \
+                segments[-1][2] == value:
+            segments[-1] = (segments[-1][0], next_position - 1, value)
+        else:
+            segments.append((position, next_position - 1, value))
+    return segments
+# end _flatten
+
+
+class _Segments (object):
+    """
+    Disjoint sorted segments of one address family.
+    """
+    __slots__ = ('starts', 'ends', 'values')
+
+    def __init__(self, segments, typecode):
+        if typecode is None:
+            self.starts = [s[0] for s in segments]
+            self.ends = [s[1] for s in segments]
+        else:
+            self.starts = array(typecode, [s[0] for s in segments])
+            self.ends = array(typecode, [s[1] for s in segments])
+        self.values = array(_UINT32, [s[2] for s in segments])
+    # end __init__
+
+    def find(self, address):
+        i = bisect_right(self.starts, address) - 1
+        if i >= 0 and address <= self.ends[i]:
+            return self.values[i]
+        return None
+    # end find
+# end class _Segments
+
+
+class IpRangeMap (object):
+    """
+    Map of disjoint address ranges to values.
+
+    Built from ``(range, value)`` or ``(range, value, priority)`` entries where
+    range is anything :class:`iptools.IpRange` accepts. Where ranges overlap
+    the entry with the highest priority wins, and of those with equal
+    priority the one given last. Overlaps are resolved once when the map is
+    built into sorted disjoint segments, so a lookup is a single binary
+    search.
+
+    Each distinct value is stored once and segments refer to it by index.
+    Values that can not be hashed are only shared when they are the same
+    object.
+
+    Ranges keep the address family they were given in, so '::/96' only
+    holds IPv6 addresses. IPv4-mapped IPv6 addresses are looked up in the
+    IPv4 ranges first.
+
+
+    >>> m = IpRangeMap([
+    ...     (('1.0.0.0', '1.0.0.255'), 'AU'),
+    ...     (('1.0.1.0', '1.0.3.255'), 'CN'),
+    ...     ('1.0.2.0/24', 'CN-BJ', 1),
+    ...     ('2001:db8::/32', 'DOC'),
+    ... ])
+    >>> m.get('1.0.0.1')
+    'AU'
+    >>> m.get('1.0.2.1')
+    'CN-BJ'
+    >>> m.get('::ffff:1.0.3.1')
+    'CN'
+    >>> m.get('2001:db8::1')
+    'DOC'
+    >>> m.get('10.0.0.1', 'unknown')
+    'unknown'
+    >>> m['10.0.0.1']
+    Traceback (most recent call last):
+        ...
+    KeyError: '10.0.0.1'
+    >>> len(m)
+    5
+    >>> for r, value in m.items():
+    ...     print('%s %s' % (r, value))
+    ('1.0.0.0', '1.0.0.255') AU
+    ('1.0.1.0', '1.0.1.255') CN
+    ('1.0.2.0', '1.0.2.255') CN-BJ
+    ('1.0.3.0', '1.0.3.255') CN
+    ('2001:db8::', '2001:db8:ffff:ffff:ffff:ffff:ffff:ffff') DOC
+    >>> m.values()
+    ['AU', 'CN', 'CN-BJ', 'DOC']
+
+
+    :param entries: Ranges and their values.
+    :type entries: iterable of tuple
+    :raises: TypeError, ValueError
+    """
+    __slots__ = ('_v4', '_v6', '_values')
+
+    def __init__(self, entries=()):
+        values = []
+        ids = {}
+        pending = {ipv4: [], ipv6: []}
+        for order, entry in enumerate(entries):
+            if len(entry) == 2:
+                spec, value = entry
+                priority = 0
+            elif len(entry) == 3:
+                spec, value, priority = entry
+            else:
+                raise ValueError(
+                    'expected (range, value) or (range, value, priority)')
+            r = IpRange(spec)
+
+            try:
+                # equal values of different types, like 1 and True, are
+                # kept apart
+                key = (True, type(value), value)
+                value_id = ids.get(key)
+            except TypeError:
+                # unhashable values are only shared if they are identical
+                key = (False, id(value))
+                value_id = ids.get(key)
+            if value_id is None:
+                value_id = ids[key] = len(values)
+                values.append(value)
+
+            pending[_spec_family(spec, r)].append(
+                (r.startIp, r.endIp, priority, order, value_id))
+
+        self._values = values
+        self._v4 = _Segments(_flatten(pending[ipv4]), _UINT32)
+        self._v6 = _Segments(_flatten(pending[ipv6]), None)
+    # end __init__
+
+    def _find(self, addr):
+        v4, v6 = _address_families(addr)
+        value_id = None
+        if v4 is not None:
+            value_id = self._v4.find(v4)
+        if value_id is None and v6 is not None:
+            value_id = self._v6.find(v6)
+        return value_id
+    # end _find
+
+    def get(self, addr, default=None):
+        """
+        Return the value of the range containing `addr`.
+
+
+        :param addr: Ip address.
+        :type addr: str, int or IpAddress
+        :param default: Value to return if no range contains `addr`.
+        :returns: Value of the matching range or `default`.
+        :raises: TypeError
+        """
+        value_id = self._find(addr)
+        if value_id is None:
+            return default
+        return self._values[value_id]
+    # end get
+
+    def __getitem__(self, addr):
+        value_id = self._find(addr)
+        if value_id is None:
+            raise KeyError(addr)
+        return self._values[value_id]
+    # end __getitem__
+
+    def __contains__(self, addr):
+        return self._find(addr) is not None
+    # end __contains__
+
+    def __len__(self):
+        """
+        Return the number of disjoint segments in the map.
+        """
+        return len(self._v4.starts) + len(self._v6.starts)
+    # end __len__
+
+    def items(self):
+        """
+        Iterate over the segments in address order.
+
+
+        :returns: Iterator of ``(IpRange, value)`` tuples.
+        """
+        for version, segments in ((4, self._v4), (6, self._v6)):
+            for start, end, value_id in zip(
+                    segments.starts, segments.ends, segments.values):
+                yield (IpRange.from_longs(start, end, version),
+                       self._values[value_id])
+    # end items
+
+    def values(self):
+        """
+        Return the distinct values in the order they were first given.
+
+
+        :returns: List of values.
+        """
+        return list(self._values)
+    # end values
+# end class IpRangeMap
+
+# vim: set sw=4 ts=4 sts=4 et :
@@ -0,0 +1,442 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2008-2014, Bryan Davis and iptools contributors
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     - Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#     - Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""
+Longest prefix matching of addresses against CIDR blocks.
+"""
+
+from . import ipv4
+from . import ipv6
+from . import _address_families
+
+__all__ = (
+    'PrefixTrie',
+)
+
+#: Marker for nodes that only join two branches and hold no value
+_EMPTY = object()
+
+
+class _Node (object):
+    """
+    Node of a :class:`PrefixTrie`.
+
+    `network` is the network number of the prefix with all host bits zero and
+    `length` is the prefix length. The children are the branches for the next
+    bit after the prefix being 0 (`left`) or 1 (`right`).
+    """
+    __slots__ = ('network', 'length', 'value', 'left', 'right')
+
+    def __init__(self, network, length, value=_EMPTY):
+        self.network = network
+        self.length = length
+        self.value = value
+        self.left = None
+        self.right = None
+    # end __init__
+# end class _Node
+
+
+class _Family (object):
+    """
+    Compressed binary trie of the prefixes of one address family.
+    """
+    __slots__ = ('module', 'bits', 'masks', 'branch', 'root', 'size')
+
+    def __init__(self, module, bits):
+        self.module = module
+        self.bits = bits
+        all_ones = (1 << bits) - 1
+        #: netmask of each prefix length
+        self.masks = tuple(
+            all_ones ^ ((1 << (bits - length)) - 1)
+            for length in range(bits + 1))
+        #: bit following each prefix length that selects the branch
+        self.branch = tuple(
+            1 << (bits - length - 1) for length in range(bits)) + (0,)
+        self.root = _Node(0, 0)
+        self.size = 0
+    # end __init__
+
+    def insert(self, network, length, value):
+        masks, branch = self.masks, self.branch
+        node = self.root
+        while True:
+            # invariant: node's prefix is a prefix of the new one
+            if node.length == length:
+                if node.value is _EMPTY:
+                    self.size += 1
+                node.value = value
+                return
+            right = network & branch[node.length]
+            child = node.right if right else node.left
+            if child is None:
+                child = _Node(network, length, value)
+                self.size += 1
+
+            else:
+                shared = min(child.length, length)
+                if (child.network ^ network) & masks[shared] == 0:
+                    if child.length <= length:
+                        node = child
+                        continue
+                    # new prefix sits between node and child
+                    new = _Node(network, length, value)
+                    self.size += 1
+                    if child.network & branch[length]:
+                        new.right = child
+                    else:
+                        new.left = child
+                    child = new
+
+                else:
+                    # branches diverge after the bits they have in common
+                    diff = (child.network ^ network) & masks[shared]
+                    common = self.bits - diff.bit_length()
+                    glue = _Node(network & masks[common], common)
+                    new = _Node(network, length, value)
+                    self.size += 1
+                    if network & branch[common]:
+                        glue.left, glue.right = child, new
+                    else:
+                        glue.left, glue.right = new, child
+                    child = glue
+
+            if right:
+                node.right = child
+            else:
+                node.left = child
+            return
+    # end insert
+
+    def find(self, network, length):
+        masks, branch = self.masks, self.branch
+        parent, node = None, self.root
+        while node is not None and node.length < length:
+            if network & masks[node.length] != node.network:
+                return None, None
+            parent = node
+            node = node.right if network & branch[node.length] else node.left
+        if node is None or node.length != length or \
+                node.network != network or node.value is _EMPTY:
+            return None, None
+        return parent, node
+    # end find
+
+    def delete(self, network, length):
+        parent, node = self.find(network, length)
+        if node is None:
+            return False
+        node.value = _EMPTY
+        self.size -= 1
+        if node is self.root:
+            return True
+
+        # splice out the node if it no longer joins two branches, then do
+        # the same for a parent that was only joining it to a sibling
+        for node, parent in ((node, parent), (parent, None)):
+            if node is None or node is self.root or node.value is not _EMPTY:
+                break
+            if node.left is not None and node.right is not None:
+                break
+            if parent is None:
+                parent = self._parent(node)
+            child = node.left if node.left is not None else node.right
+            if parent.left is node:
+                parent.left = child
+            else:
+                parent.right = child
+        return True
+    # end delete
+
+    def _parent(self, target):
+        branch = self.branch
+        parent, node = None, self.root
+        while node is not target:
+            parent = node
+            node = node.right if \
+                target.network & branch[node.length] else node.left
+        return parent
+    # end _parent
+
+    def matches(self, address):
+        masks, branch = self.masks, self.branch
+        found = []
+        node = self.root
+        while node is not None and \
+                address & masks[node.length] == node.network:
+            if node.value is not _EMPTY:
+                found.append(node)
+            node = node.right if address & branch[node.length] else node.left
+        return found
+    # end matches
+
+    def longest(self, address):
+        masks, branch = self.masks, self.branch
+        best = None
+        node = self.root
+        while node is not None and \
+                address & masks[node.length] == node.network:
+            if node.value is not _EMPTY:
+                best = node
+            node = node.right if address & branch[node.length] else node.left
+        return best
+    # end longest
+
+    def nodes(self):
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node.value is not _EMPTY:
+                yield node
+            if node.right is not None:
+                stack.append(node.right)
+            if node.left is not None:
+                stack.append(node.left)
+    # end nodes
+
+    def cidr(self, node):
+        return '%s/%d' % (self.module.long2ip(node.network), node.length)
+    # end cidr
+# end class _Family
+
+
+class PrefixTrie (object):
+    """
+    Map of CIDR blocks to values with longest prefix matching.
+
+    Prefixes are stored in a compressed binary (Patricia) trie keyed on
+    their integer network numbers, one trie per address family. Nodes are
+    only created where prefixes branch, so a lookup visits at most one node
+    per stored prefix that is a parent of the address, plus one node per
+    branch point on the way.
+
+    IPv4-mapped IPv6 addresses also match the IPv4 prefixes that contain the
+    mapped address. Those matches are more specific than any IPv6 prefix
+    that contains the whole IPv4-mapped block.
+
+
+    >>> t = PrefixTrie()
+    >>> t.insert('10/8', 'private')
+    >>> t.insert('10.1.0.0/16', 'office')
+    >>> t.insert('2001:db8::/32', 'documentation')
+    >>> t.longest_match('10.1.2.3')
+    ('10.1.0.0/16', 'office')
+    >>> t.longest_match('10.2.0.1')
+    ('10.0.0.0/8', 'private')
+    >>> t.longest_match('::ffff:10.1.2.3')
+    ('10.1.0.0/16', 'office')
+    >>> t.longest_match('192.0.2.1') is None
+    True
+    >>> t.all_matches('10.1.2.3')
+    [('10.0.0.0/8', 'private'), ('10.1.0.0/16', 'office')]
+    >>> t.delete('10.1.0.0/16')
+    >>> t.longest_match('10.1.2.3')
+    ('10.0.0.0/8', 'private')
+    >>> len(t)
+    2
+    >>> '2001:db8::/32' in t
+    True
+    >>> t.delete('10.1.0.0/16')
+    Traceback (most recent call last):
+        ...
+    KeyError: '10.1.0.0/16'
+    """
+    __slots__ = ('_v4', '_v6')
+
+    def __init__(self):
+        self._v4 = _Family(ipv4, 32)
+        self._v6 = _Family(ipv6, 128)
+    # end __init__
+
+    def _parse(self, cidr):
+        """
+        Convert a CIDR block or single address to its address family, network
+        number and prefix length.
+        """
+        if '/' in cidr:
+            ip, prefix = cidr.split('/', 1)
+            if ipv4.validate_cidr(cidr):
+                family = self._v4
+                network = ipv4.ip2network(ip)
+            elif ipv6.validate_cidr(cidr):
+                family = self._v6
+                network = ipv6.ip2long(ip)
+            else:
+                raise ValueError('invalid CIDR block %r' % (cidr,))
+            length = int(prefix)
+
+        elif ':' in cidr:
+            family, network, length = self._v6, ipv6.ip2long(cidr), 128
+        else:
+            family, network, length = self._v4, ipv4.ip2long(cidr), 32
+        if network is None:
+            raise ValueError('invalid CIDR block %r' % (cidr,))
+        return family, network & family.masks[length], length
+    # end _parse
+
+    def insert(self, cidr, value=None):
+        """
+        Add a prefix or replace the value of an existing prefix.
+
+        Host bits in `cidr` are ignored.
+
+
+        :param cidr: CIDR notation block or single ip address.
+        :type cidr: str
+        :param value: Value to return for addresses matching the prefix.
+        :raises: ValueError
+        """
+        family, network, length = self._parse(cidr)
+        family.insert(network, length, value)
+    # end insert
+
+    def delete(self, cidr):
+        """
+        Remove a prefix.
+
+
+        :param cidr: CIDR notation block or single ip address.
+        :type cidr: str
+        :raises: KeyError if the prefix is not in the trie, ValueError
+        """
+        family, network, length = self._parse(cidr)
+        if not family.delete(network, length):
+            raise KeyError(cidr)
+    # end delete
+
+    def get(self, cidr, default=None):
+        """
+        Return the value stored for exactly `cidr`.
+
+
+        >>> t = PrefixTrie()
+        >>> t.insert('10/8', 'private')
+        >>> t.get('10.0.0.0/8')
+        'private'
+        >>> t.get('10.0.0.0/16', 'missing')
+        'missing'
+
+
+        :param cidr: CIDR notation block or single ip address.
+        :type cidr: str
+        :param default: Value to return if the prefix is not in the trie.
+        :returns: Stored value or `default`.
+        :raises: ValueError
+        """
+        family, network, length = self._parse(cidr)
+        node = family.find(network, length)[1]
+        return default if node is None else node.value
+    # end get
+
+    def __contains__(self, cidr):
+        family, network, length = self._parse(cidr)
+        return family.find(network, length)[1] is not None
+    # end __contains__
+
+    def __len__(self):
+        return self._v4.size + self._v6.size
+    # end __len__
+
+    def longest_match(self, addr):
+        """
+        Find the most specific prefix containing `addr`.
+
+
+        :param addr: Ip address.
+        :type addr: str, int or IpAddress
+        :returns: ``(cidr, value)`` tuple or ``None`` if no prefix matches.
+        :raises: TypeError
+        """
+        v4, v6 = _address_families(addr)
+        best = None
+        if v6 is not None:
+            node = self._v6.longest(v6)
+            if node is not None:
+                best = (node.length, self._v6, node)
+        if v4 is not None:
+            node = self._v4.longest(v4)
+            # an IPv4 prefix of a mapped address is that much longer than
+            # the IPv6 prefix of the IPv4-mapped block
+            if node is not None and (
+                    best is None or node.length + 96 > best[0]):
+                best = (node.length, self._v4, node)
+        if best is None:
+            return None
+        family, node = best[1:]
+        return family.cidr(node), node.value
+    # end longest_match
+
+    def all_matches(self, addr):
+        """
+        Find all prefixes containing `addr`.
+
+
+        :param addr: Ip address.
+        :type addr: str, int or IpAddress
+        :returns: List of ``(cidr, value)`` tuples from least to most
+            specific.
+        :raises: TypeError
+        """
+        v4, v6 = _address_families(addr)
+        found = []
+        if v6 is not None:
+            found.extend(
+                (node.length, self._v6.cidr(node), node.value)
+                for node in self._v6.matches(v6))
+        if v4 is not None:
+            offset = 0 if v6 is None else 96
+            found.extend(
+                (node.length + offset, self._v4.cidr(node), node.value)
+                for node in self._v4.matches(v4))
+            # order IPv4 prefixes of a mapped address by their length within
+            # the IPv4-mapped block
+            found.sort(key=lambda match: match[0])
+        return [match[1:] for match in found]
+    # end all_matches
+
+    def items(self):
+        """
+        Iterate over the stored prefixes in address order.
+
+        Within a family a prefix comes before the more specific prefixes it
+        contains. IPv4 prefixes come before IPv6 prefixes.
+
+
+        >>> t = PrefixTrie()
+        >>> for cidr in ('10.1/16', '::/0', '10/8', '9/8'):
+        ...     t.insert(cidr, len(t))
+        >>> list(t.items())
+        [('9.0.0.0/8', 3), ('10.0.0.0/8', 2), ('10.1.0.0/16', 0), ('::/0', 1)]
+
+
+        :returns: Iterator of ``(cidr, value)`` tuples.
+        """
+        for family in (self._v4, self._v6):
+            for node in family.nodes():
+                yield family.cidr(node), node.value
+    # end items
+# end class PrefixTrie
+
+# vim: set sw=4 ts=4 sts=4 et :
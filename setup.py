@@ -50,6 +50,7 @@ setup(
     """,
     zip_safe=False,
     extras_require={
+        'numpy': ['numpy'],
         'testing': tests_require,
     },
 )
@@ -1,7 +1,28 @@
 # -*- coding: utf-8 -*-
 
+import io
+import os
+import pickle
+import random
+import shutil
+import struct
+import tempfile
+import threading
 import unittest
 import iptools
+from iptools import compiled
+from iptools import extract
+from iptools import ipv4
+from iptools import ipv6
+from iptools import packets
+from iptools import pipeline
+from iptools import rangemap
+from iptools import trie
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class IpRangeListTests(unittest.TestCase):
@@ -35,6 +56,121 @@ class IpRangeListTests(unittest.TestCase):
 
         self.assertFalse('209.19.170.129' in INTERNAL_IPS)
     # end testMixedRange
+
+    def testIndexMatchesRangeScan(self):
+        fixture = iptools.IpRangeList(
+            '10/8',
+            ('10.255.0.0', '11.0.0.255'),   # overlaps and extends 10/8
+            '11.0.1.0/24',                  # adjacent to previous range
+            '192.168.1.0/24',
+            '::ffff:ac10:0/108',            # IPv4 mapped 172.16/12
+            'fe80::/10',
+            '::/64',                        # IPv6 range holding small ints
+        )
+        probes = (
+            '9.255.255.255', '10.0.0.0', '10.255.255.255', '11.0.0.255',
+            '11.0.1.0', '11.0.1.255', '11.0.2.0', '192.168.0.255',
+            '192.168.1.1', '::ffff:10.1.2.3', '::ffff:11.0.2.0',
+            '::ffff:172.16.1.1', '172.16.1.1', 'fe80::1', 'fec0::1',
+            '::1', '::1:0:0:0:0', 0, 2 ** 64,
+        )
+        for ip in probes:
+            expect = any(ip in r for r in fixture.ips)
+            self.assertEqual(expect, ip in fixture, ip)
+    # end testIndexMatchesRangeScan
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def testContainsMany(self):
+        fixture = iptools.IpRangeList(
+            '10/8',
+            ('10.255.0.0', '11.0.0.255'),
+            '192.168.1.0/24',
+            '::ffff:ac10:0/108',
+            '2001:db8::/32',
+        )
+        probes = [
+            0, ipv4.ip2long('10.1.2.3'), ipv4.ip2long('11.0.1.0'),
+            ipv4.ip2long('192.168.1.255'), ipv4.ip2long('172.16.1.1'),
+            iptools._address2long('::ffff:10.1.1.1'),
+            iptools._address2long('::ffff:172.16.1.1'),
+            iptools._address2long('::ffff:9.1.1.1'),
+            2 ** 64 - 1,
+        ]
+        expect = [p in fixture for p in probes]
+        found = fixture.contains_many(numpy.array(probes, dtype=numpy.uint64))
+        self.assertEqual(expect, found.tolist())
+        found = fixture.contains_many(
+            numpy.array([-1, probes[1]], dtype=numpy.int64))
+        self.assertEqual([False, True], found.tolist())
+        found = fixture.contains_many(
+            numpy.array(['10.0.0.1', '::ffff:10.0.0.1', '9.0.0.1']))
+        self.assertEqual([True, True, False], found.tolist())
+    # end testContainsMany
+
+    def testIterBatches(self):
+        fixture = iptools.IpRangeList('10.0.0.0/30', '192.168.0.0/29', '::1')
+        longs = list(fixture.iter_longs())
+        self.assertEqual(len(fixture), len(longs))
+        for size in (1, 3, 4, 13, 100):
+            batches = list(fixture.iter_batches(size))
+            self.assertEqual(longs, sum(batches, []))
+            self.assertTrue(all(len(b) == size for b in batches[:-1]))
+            strings = list(fixture.iter_batches(size, as_strings=True))
+            self.assertEqual(list(fixture), sum(strings, []))
+        self.assertRaises(ValueError, next, fixture.iter_batches(0))
+    # end testIterBatches
+
+    def testNormalizeAndCidrs(self):
+        rng = random.Random(1)
+        for _ in range(50):
+            args = []
+            for _ in range(rng.randint(1, 6)):
+                start = rng.randint(0, 600)
+                args.append((ipv4.long2ip(start),
+                             ipv4.long2ip(start + rng.randint(0, 100))))
+            fixture = iptools.IpRangeList(*args)
+            expect = sorted(set(fixture.iter_longs()))
+            normal = fixture.normalize()
+            self.assertEqual(expect, list(normal.iter_longs()))
+            cidrs = iptools.IpRangeList(*fixture.to_cidrs())
+            self.assertEqual(expect, list(cidrs.iter_longs()))
+            for cidr in cidrs.ips:
+                # every block is as large as its alignment allows
+                self.assertEqual(0, cidr.startIp & (len(cidr) - 1))
+            # adjacent blocks can never be merged into one
+            for a, b in zip(cidrs.ips, cidrs.ips[1:]):
+                if a.endIp + 1 == b.startIp and len(a) == len(b):
+                    self.assertNotEqual(
+                        0, a.startIp & (2 * len(a) - 1), (a, b))
+    # end testNormalizeAndCidrs
+
+    def testSetOperationsMatchSets(self):
+        rng = random.Random(2)
+
+        def random_list():
+            args = []
+            for _ in range(rng.randint(0, 5)):
+                start = rng.randint(0, 300)
+                end = start + rng.randint(0, 60)
+                args.append((ipv4.long2ip(start), ipv4.long2ip(end)))
+                args.append(iptools.IpRange.from_longs(
+                    2 ** 64 + start, 2 ** 64 + end, 6))
+            return iptools.IpRangeList(*args)
+
+        for _ in range(50):
+            a, b = random_list(), random_list()
+            sa, sb = set(a.iter_longs()), set(b.iter_longs())
+            for result, expect in (
+                    (a | b, sa | sb),
+                    (a & b, sa & sb),
+                    (a - b, sa - sb),
+                    (a ^ b, sa ^ sb)):
+                self.assertEqual(sorted(expect), list(result.iter_longs()))
+                self.assertEqual(result, result.normalize())
+            self.assertEqual(sa.isdisjoint(sb), a.isdisjoint(b))
+        self.assertRaises(TypeError, a.union, ['10.0.0.1'])
+        self.assertRaises(TypeError, lambda: a | set())
+    # end testSetOperationsMatchSets
 # end class IpRangeListTests
 
 
@@ -61,6 +197,947 @@ class IpRangeTests(unittest.TestCase):
         self.assertTrue('::ffff:192.168.0.12' in fixture)
         self.assertFalse('::ffff:192.168.1.12' in fixture)
     # end test6to4AddressInIPv6Range
+
+    def testFromLongs(self):
+        fixture = iptools.IpRange.from_longs(
+            ipv4.ip2long('10.0.0.255'), ipv4.ip2long('10.0.0.0'))
+        self.assertEqual(iptools.IpRange('10.0.0.0/24'), fixture)
+        self.assertFalse(hasattr(fixture, '__dict__'))
+        self.assertEqual(fixture, iptools.IpRange(fixture))
+
+        mapped = iptools.IpRange('::ffff:0:0/96')
+        self.assertEqual(
+            mapped, iptools.IpRange.from_longs(mapped[0:1].startIp,
+                                               mapped.endIp, 6))
+        self.assertRaises(TypeError, iptools.IpRange.from_longs, '1', 2)
+        self.assertRaises(ValueError, iptools.IpRange.from_longs, -1, 2)
+        self.assertRaises(ValueError, iptools.IpRange.from_longs, 1, 2, 5)
+    # end testFromLongs
+
+    def testSlicesKeepAddressFamily(self):
+        fixture = iptools.IpRange.from_longs(0, 255, 6)
+        self.assertEqual(['::1', '::2'], list(fixture[1:3]))
+        self.assertEqual(['::fe', '::ff'], list(fixture[-2:]))
+        copied = pickle.loads(pickle.dumps(fixture[1:3]))
+        self.assertEqual("IpRange('::1', '::2')", repr(copied))
+    # end testSlicesKeepAddressFamily
+
+    def testIterMatchesLong2ip(self):
+        for start, end in (
+                ('10.0.0.250', '10.0.17.3'),
+                ('fe80::fff0', 'fe80::2:10'),
+                ('::fff0', '::1:0'),
+                ('1:0:0:1::fffe', '1:0:0:1::1:1'),
+                ('ffff:ffff:ffff:ffff:ffff:ffff:ffff:ff00',
+                 'ffff:ffff:ffff:ffff:ffff:ffff:ffff:ffff')):
+            fixture = iptools.IpRange(start, end)
+            expect = [fixture._ipver.long2ip(i) for i in fixture.iter_longs()]
+            self.assertEqual(expect, list(fixture))
+    # end testIterMatchesLong2ip
+
+    def testSteppedSliceMatchesList(self):
+        fixture = iptools.IpRange('10.0.0.0/26')
+        expect = list(fixture)
+        for key in (slice(None, None, 2), slice(3, 50, 7), slice(None, 5, -3),
+                    slice(-1, None, -10), slice(40, 10, 3)):
+            view = fixture[key]
+            self.assertEqual(expect[key], list(view), key)
+            self.assertEqual(len(expect[key]), len(view))
+            for ip in expect:
+                self.assertEqual(ip in expect[key], ip in view)
+            self.assertEqual(expect[key][1::2], list(view[1::2]))
+        self.assertRaises(ValueError, fixture.__getitem__, slice(0, 5, 0))
+    # end testSteppedSliceMatchesList
+
+    def testSteppedSliceOfHugeRange(self):
+        fixture = iptools.IpRange('2001:db8::/32')[5::2 ** 80]
+        self.assertEqual(2 ** 16, fixture.__len__())
+        self.assertEqual('2001:db8:ffff::5', fixture[-1])
+        self.assertTrue('2001:db8:1234::5' in fixture)
+        self.assertFalse('2001:db8:1234::6' in fixture)
+        self.assertEqual(0x1234, fixture.index('2001:db8:1234::5'))
+        self.assertEqual(
+            ['2001:db8::5', '2001:db8:1::5'], list(fixture[:2]))
+        self.assertEqual(fixture, pickle.loads(pickle.dumps(fixture)))
+        self.assertEqual(
+            fixture, iptools.IpRangeSlice('2001:db8::5', 2 ** 80, 2 ** 16))
+        self.assertRaises(
+            ValueError, iptools.IpRangeSlice, '2001:db8::5', 2 ** 80, 2 ** 48)
+    # end testSteppedSliceOfHugeRange
+
+    def testBinaryRanges(self):
+        specs = (
+            '10.0.0.1', '::1', '10/8', '2001:db8::/32', '127/255.255.255.0',
+            '::ffff:0:0/96',
+        )
+        for spec in specs:
+            data = spec.encode('ascii')
+            expect = iptools.IpRange(spec)
+            for binary in (data, bytearray(data), memoryview(data)):
+                self.assertEqual(expect, iptools.IpRange(binary), spec)
+                self.assertEqual(
+                    iptools.IpRangeList(spec), iptools.IpRangeList(binary))
+        self.assertEqual(
+            iptools.IpRange('10.0.0.1', '10.0.0.5'),
+            iptools.IpRange(b'10.0.0.1', memoryview(b'10.0.0.5')))
+        fixture = iptools.IpRangeList('10/8')
+        # membership tests take single addresses, not blocks
+        for item in ('10.0.0.0/8', b'10.0.0.0/8', bytearray(b'10/8')):
+            self.assertRaises(TypeError, fixture.__contains__, item)
+            self.assertRaises(TypeError, fixture.ips[0].__contains__, item)
+    # end testBinaryRanges
 # end class IpRangeTests
 
+
+class IpAddressTests(unittest.TestCase):
+
+    def testMatchesStringMembership(self):
+        ranges = (
+            iptools.IpRange('10/8'),
+            iptools.IpRange('::ffff:0:0/96'),
+            iptools.IpRange('fe80::/10'),
+            iptools.IpRangeList('10/8', '192.168/16'),
+            iptools.IpRangeList('::ffff:0:0/96', 'fe80::/10'),
+            iptools.IpRangeList('127.0.0.1', '::1'),
+        )
+        addresses = (
+            '10.1.2.3', '11.0.0.1', '::ffff:10.0.0.1', '::ffff:11.0.0.1',
+            'fe80::1', '::1', '127.0.0.1', '192.168.1.1',
+        )
+        for ip in addresses:
+            parsed = iptools.IpAddress(ip)
+            for fixture in ranges:
+                self.assertEqual(ip in fixture, parsed in fixture,
+                                 '%s in %r' % (ip, fixture))
+    # end testMatchesStringMembership
+
+    def testValueType(self):
+        ip = iptools.IpAddress('192.168.1.1')
+        self.assertEqual(ip, iptools.IpAddress(ip))
+        self.assertEqual(ip, pickle.loads(pickle.dumps(ip)))
+        self.assertEqual(1, len(set([ip, iptools.IpAddress(int(ip))])))
+        self.assertNotEqual(iptools.IpAddress(1, 4), iptools.IpAddress(1, 6))
+        self.assertFalse(hasattr(ip, '__dict__'))
+        self.assertRaises(AttributeError, setattr, ip, 'version', 6)
+        self.assertRaises(ValueError, iptools.IpAddress, 2 ** 32, 4)
+        self.assertRaises(ValueError, iptools.IpAddress, -1)
+        self.assertRaises(TypeError, iptools.IpAddress, 1.5)
+    # end testValueType
+
+    def testBinaryAddresses(self):
+        fixture = iptools.IpRangeList('10/8', '::ffff:0:0/96', 'fe80::/10')
+        addresses = (
+            '10.1.2.3', '010.001.002.003', '10.1', '11.0.0.1', '::1',
+            'fe80::1', 'FE80::A:1', '::ffff:10.0.0.1', '1:2:3:4:5:6:7:8',
+            '10.0.0.256', 'fe80::1::1', ':1:2', 'invalid', '',
+        )
+        for address in addresses:
+            data = address.encode('ascii')
+            wrapped = memoryview(b'<' + data + b'>')[1:-1]
+            for parse in (ipv4.ip2long, ipv6.ip2long):
+                expect = parse(address)
+                for binary in (data, bytearray(data), wrapped):
+                    self.assertEqual(expect, parse(binary), (address, binary))
+            try:
+                expect = address in fixture
+            except TypeError:
+                for binary in (data, bytearray(data), wrapped):
+                    self.assertRaises(TypeError, fixture.__contains__, binary)
+                    self.assertRaises(ValueError, iptools.IpAddress, binary)
+                continue
+            iptools.enable_parse_cache()
+            try:
+                for binary in (data, bytearray(data), wrapped, data):
+                    self.assertEqual(expect, binary in fixture, address)
+                    self.assertEqual(
+                        iptools.IpAddress(address), iptools.IpAddress(binary))
+            finally:
+                iptools.disable_parse_cache()
+            for binary in (data, bytearray(data), wrapped):
+                self.assertEqual(expect, binary in fixture, address)
+        self.assertEqual(None, ipv4.ip2long(b'\xff.0.0.1'))
+        self.assertEqual(None, ipv6.ip2long(b'::\xff'))
+    # end testBinaryAddresses
+# end class IpAddressTests
+
+
+class PrefixTrieTests(unittest.TestCase):
+
+    def testMatchesBruteForce(self):
+        rng = random.Random(3)
+        fixture = trie.PrefixTrie()
+        expect = {}
+        for step in range(400):
+            length = rng.randint(0, 16)
+            shift = 32 - length
+            network = rng.getrandbits(16) << 16 >> shift << shift
+            cidr = '%s/%d' % (ipv4.long2ip(network), length)
+            if expect and rng.random() < 0.25:
+                cidr = rng.choice(sorted(expect))
+                fixture.delete(cidr)
+                del expect[cidr]
+            else:
+                fixture.insert(cidr, step)
+                expect[cidr] = step
+            self.assertEqual(len(expect), len(fixture))
+
+        ranges = dict((cidr, iptools.IpRange(cidr)) for cidr in expect)
+        for _ in range(200):
+            ip = ipv4.long2ip(rng.getrandbits(32))
+            matches = sorted(
+                (len(ranges[cidr]), cidr) for cidr in expect
+                if ip in ranges[cidr])
+            found = fixture.all_matches(ip)
+            self.assertEqual(
+                [(cidr, expect[cidr]) for _, cidr in reversed(matches)],
+                found)
+            self.assertEqual(
+                found[-1] if found else None, fixture.longest_match(ip))
+        self.assertEqual(sorted(expect.items()), sorted(fixture.items()))
+    # end testMatchesBruteForce
+
+    def testMixedFamilies(self):
+        fixture = trie.PrefixTrie()
+        fixture.insert('::/0', 'default')
+        fixture.insert('::ffff:0:0/96', 'mapped')
+        fixture.insert('10/8', 'ten')
+        fixture.insert('::1', 'loopback')
+        self.assertEqual(('::1/128', 'loopback'), fixture.longest_match('::1'))
+        self.assertEqual(
+            ('10.0.0.0/8', 'ten'), fixture.longest_match('::ffff:10.0.0.1'))
+        self.assertEqual(
+            ['default', 'mapped', 'ten'],
+            [v for _, v in fixture.all_matches('::ffff:10.0.0.1')])
+        self.assertEqual(
+            [('10.0.0.0/8', 'ten')], fixture.all_matches('10.0.0.1'))
+        self.assertEqual(('::/0', 'default'), fixture.longest_match('fe80::1'))
+        self.assertRaises(ValueError, fixture.insert, '10.0.0.0/33')
+        self.assertRaises(TypeError, fixture.longest_match, 'invalid')
+        self.assertRaises(KeyError, fixture.delete, '11/8')
+    # end testMixedFamilies
+# end class PrefixTrieTests
+
+
+class IpRangeMapTests(unittest.TestCase):
+
+    def testMatchesPriorityScan(self):
+        rng = random.Random(4)
+        for _ in range(30):
+            entries = []
+            for _ in range(rng.randint(0, 12)):
+                start = rng.randint(0, 200)
+                entries.append((
+                    (ipv4.long2ip(start),
+                     ipv4.long2ip(start + rng.randint(0, 50))),
+                    rng.choice('abc'), rng.randint(0, 2)))
+            fixture = rangemap.IpRangeMap(entries)
+            for lngip in range(0, 260):
+                expect = None
+                best = None
+                for order, (spec, value, priority) in enumerate(entries):
+                    if lngip in iptools.IpRange(spec) and \
+                            (best is None or (priority, order) > best):
+                        best = (priority, order)
+                        expect = value
+                self.assertEqual(expect, fixture.get(lngip), lngip)
+            segments = list(fixture.items())
+            self.assertEqual(len(fixture), len(segments))
+            for (a, va), (b, vb) in zip(segments, segments[1:]):
+                self.assertTrue(a.endIp < b.startIp)
+                self.assertFalse(a.endIp + 1 == b.startIp and va == vb)
+    # end testMatchesPriorityScan
+
+    def testDeduplicatesValues(self):
+        shared = {'country': 'NZ'}
+        fixture = rangemap.IpRangeMap(
+            [('10.0.%d.0/24' % i, ('NZ', 'AS1')) for i in range(0, 256, 2)] +
+            [('fe80::%x/128' % i, shared) for i in range(10)] +
+            [('11/8', {'country': 'NZ'})])
+        self.assertEqual(3, len(fixture.values()))
+        self.assertEqual(('NZ', 'AS1'), fixture['::ffff:10.0.4.1'])
+        self.assertTrue(fixture['fe80::9'] is shared)
+        self.assertFalse('10.0.1.1' in fixture)
+        self.assertRaises(ValueError, rangemap.IpRangeMap, [('10/8',)])
+
+        fixture = rangemap.IpRangeMap([
+            ('10/8', 1), ('11/8', True), ('12/8', 0.0), ('13/8', False)])
+        self.assertEqual(4, len(fixture.values()))
+        for ip, value in (('10.0.0.1', 1), ('11.0.0.1', True),
+                          ('12.0.0.1', 0.0), ('13.0.0.1', False)):
+            self.assertTrue(type(fixture[ip]) is type(value), ip)
+            self.assertEqual(value, fixture[ip])
+    # end testDeduplicatesValues
+
+    def testSmallIpv6Ranges(self):
+        fixture = rangemap.IpRangeMap([
+            ('::1', 'loopback', 1), ('::/96', 'compat'), ('0.0.0.0/8', 'this'),
+            (('::2', '::9'), 'low', 1),
+        ])
+        self.assertEqual('loopback', fixture.get('::1'))
+        self.assertEqual('low', fixture.get('::5'))
+        self.assertEqual('compat', fixture.get('::a'))
+        self.assertEqual('compat', fixture.get('::1.2.3.4'))
+        self.assertEqual('this', fixture.get('0.0.0.1'))
+        self.assertEqual(None, fixture.get('1.2.3.4'))
+        self.assertEqual(
+            [('0.0.0.0', '0.255.255.255'), ('::', '::'), ('::1', '::1'),
+             ('::2', '::9'), ('::a', '::ffff:ffff')],
+            [(r[0], r[-1]) for r, value in fixture.items()])
+    # end testSmallIpv6Ranges
+# end class IpRangeMapTests
+
+
+class CompiledRangesTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'table.iprt')
+    # end setUp
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+    # end tearDown
+
+    ADDRESSES = (
+        '0.0.0.0', '9.255.255.255', '10.0.0.0', '10.200.1.1', '11.0.0.0',
+        '172.16.5.4', '192.168.0.0', '192.168.255.255', '255.255.255.255',
+        '::ffff:10.1.1.1', '::ffff:11.1.1.1', '::1', 'fe80::', 'fe80::1',
+        'febf:ffff:ffff:ffff:ffff:ffff:ffff:ffff', 'fec0::',
+        'ffff:ffff:ffff:ffff:ffff:ffff:ffff:ffff',
+    )
+
+    def testIpRangeList(self):
+        fixture = iptools.IpRangeList(
+            '10/8', '172.16/12', '192.168/16', '10.1/16', 'fe80::/10',
+            'ffff:ffff:ffff:ffff:ffff:ffff:ffff:ffff')
+        compiled.compile_ranges(fixture, self.path)
+        with compiled.load(self.path) as table:
+            self.assertEqual(len(fixture.normalize().ips), len(table))
+            for ip in self.ADDRESSES:
+                self.assertEqual(ip in fixture, ip in table, ip)
+    # end testIpRangeList
+
+    def testOverlappingFamilies(self):
+        fixture = iptools.IpRangeList(
+            '::/64', '0.0.0.0/8', '::ffff:0:0/96', '10/8')
+        addresses = self.ADDRESSES + (
+            '1.2.3.4', 16909060, 2 ** 40, 2 ** 64, '::1.2.3.4',
+            iptools.IpAddress('1.2.3.4'), iptools.IpAddress(16909060, 6))
+        tables = []
+        compiled.compile_ranges(fixture, self.path)
+        tables.append(compiled.load(self.path))
+        block = None
+        if compiled.shared_memory is not None:
+            block = compiled.publish(fixture)
+            tables.append(compiled.attach(block.name))
+        try:
+            for table in tables:
+                for ip in addresses:
+                    self.assertEqual(ip in fixture, ip in table, ip)
+        finally:
+            for table in tables:
+                table.close()
+            if block is not None:
+                block.close()
+                block.unlink()
+    # end testOverlappingFamilies
+
+    def testIpRangeMap(self):
+        fixture = rangemap.IpRangeMap([
+            ('10/8', ['ten']), ('10.1/16', ['ten', 'one'], 1),
+            ('fe80::/10', {'scope': 'link'}), ('::/96', 'compat'),
+            ('::1', None),
+        ])
+        compiled.compile_ranges(fixture, self.path)
+        with compiled.load(self.path) as table:
+            for ip in self.ADDRESSES + ('0.0.0.1', '::2'):
+                self.assertEqual(
+                    fixture.get(ip, 'missing'), table.get(ip, 'missing'), ip)
+            self.assertEqual(None, table.get('::1', 'missing'))
+            self.assertEqual('compat', table.get('::2'))
+            self.assertEqual('missing', table.get('0.0.0.1', 'missing'))
+    # end testIpRangeMap
+
+    def testEmptyAndInvalidTables(self):
+        compiled.compile_ranges(iptools.IpRangeList(), self.path)
+        with compiled.load(self.path) as table:
+            self.assertEqual(0, len(table))
+            self.assertFalse('10.0.0.1' in table)
+
+        compiled.compile_ranges(iptools.IpRangeList('10/8'), self.path)
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        self.assertRaises(ValueError, compiled.CompiledRanges, data[:-1])
+        self.assertRaises(ValueError, compiled.CompiledRanges, b'x' + data)
+        self.assertRaises(
+            TypeError, compiled.compile_ranges, ['10/8'], self.path)
+    # end testEmptyAndInvalidTables
+
+    @unittest.skipIf(compiled.shared_memory is None,
+                     'multiprocessing.shared_memory is not available')
+    def testSharedMemory(self):
+        fixture = rangemap.IpRangeMap([
+            ('10/8', 'internal'), ('192.0.2.0/24', 'partner'),
+            ('2001:db8::/32', 'partner'),
+        ])
+        block = compiled.publish(fixture)
+        try:
+            table = compiled.attach(block.name)
+            for ip in self.ADDRESSES + ('192.0.2.1', '2001:db8::1'):
+                self.assertEqual(fixture.get(ip), table.get(ip), ip)
+            table.close()
+        finally:
+            block.close()
+            block.unlink()
+    # end testSharedMemory
+# end class CompiledRangesTests
+
+
+class LineClassifierTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+    # end setUp
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+    # end tearDown
+
+    def testClassifyFile(self):
+        lists = (
+            ('blocked', iptools.IpRangeList('10.66/16')),
+            ('internal', iptools.IpRangeList('10/8', 'fe80::/10')),
+        )
+        rng = random.Random(6)
+        path = os.path.join(self.tmpdir, 'access.log')
+        expect = []
+        with open(path, 'w') as f:
+            for i in range(1000):
+                ip = rng.choice((
+                    '10.66.%d.1' % (i % 256), '10.1.1.%d' % (i % 256),
+                    'fe80::%x' % i, '::ffff:10.66.0.%d' % (i % 256),
+                    '203.0.113.%d' % (i % 256), 'bogus'))
+                f.write('%d,%s,GET /\n' % (i, ip))
+                label = None
+                for name, ranges in lists:
+                    if ip != 'bogus' and ip in ranges:
+                        label = name
+                        break
+                expect.append(label)
+
+        classifier = pipeline.LineClassifier(lists, field=1, separator=',')
+        labels = []
+        for batch in classifier.run(path, batch_size=64):
+            self.assertTrue(len(batch) <= 64)
+            labels.extend(label for _, label in batch)
+        self.assertEqual(expect, labels)
+        self.assertEqual(1000, classifier.lines)
+        self.assertEqual(expect.count(None), classifier.counts[None])
+        self.assertTrue(classifier.invalid > 0)
+        self.assertTrue(classifier.lines_per_second > 0)
+    # end testClassifyFile
+
+    def testFieldFunction(self):
+        classifier = pipeline.LineClassifier(
+            {'internal': iptools.IpRangeList('10/8')},
+            field=lambda line: line.split('"')[1])
+        batches = list(classifier.run(['x "10.0.0.1" y', 'x "11.0.0.1" y']))
+        self.assertEqual(
+            [[('x "10.0.0.1" y', 'internal'), ('x "11.0.0.1" y', None)]],
+            batches)
+        self.assertEqual(0, classifier.invalid)
+    # end testFieldFunction
+
+    @unittest.skipIf(pipeline.ProcessPoolExecutor is None,
+                     'concurrent.futures is not available')
+    def testFileClassifierMatchesLineClassifier(self):
+        table = os.path.join(self.tmpdir, 'internal.iprt')
+        compiled.compile_ranges(
+            iptools.IpRangeList('10/8', 'fe80::/10'), table)
+        rng = random.Random(22)
+        path = os.path.join(self.tmpdir, 'access.log')
+        with open(path, 'w') as f:
+            for i in range(3000):
+                ip = rng.choice((
+                    '10.66.%d.1' % (i % 256), 'fe80::%x' % i,
+                    '::ffff:10.0.0.%d' % (i % 256), '203.0.113.%d' % (i % 256),
+                    'bogus'))
+                f.write('%s - - "GET /%s HTTP/1.1" 200\n' % (ip, 'x' * i))
+
+        lists = (
+            ('blocked', iptools.IpRangeList('10.66/16')),
+            ('internal', table),
+        )
+        serial = pipeline.LineClassifier(
+            (lists[0], ('internal', iptools.IpRangeList('10/8', 'fe80::/10'))))
+        expect = [label for batch in serial.run(path) for _, label in batch]
+
+        classifier = pipeline.FileClassifier(
+            lists, workers=2, chunk_size=50000)
+        ranges = classifier.split(path)
+        self.assertTrue(len(ranges) > 2)
+        self.assertEqual(0, ranges[0][0])
+        self.assertEqual(os.path.getsize(path), ranges[-1][1])
+        with open(path, 'rb') as f:
+            for start, end in ranges[1:]:
+                f.seek(start - 1)
+                self.assertEqual(b'\n', f.read(1))
+        labels = []
+        for chunk in classifier.run(path):
+            labels.extend(chunk)
+        self.assertEqual(expect, labels)
+        self.assertEqual(serial.counts, classifier.counts)
+        self.assertEqual(serial.invalid, classifier.invalid)
+        self.assertEqual(os.path.getsize(path), classifier.bytes)
+        self.assertTrue(classifier.lines_per_second > 0)
+    # end testFileClassifierMatchesLineClassifier
+# end class LineClassifierTests
+
+
+class ExtractTests(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(23)
+        self.expect = []
+        parts = []
+        offset = 0
+        for i in range(500):
+            noise = rng.choice((
+                'GET /a.html HTTP/1.1 ', '12:34:56 ', 'std::string ',
+                '1.2.3 ', 'v2.0.1.9.3 ', 'cafe:babe ', '\n', '- '))
+            parts.append(noise)
+            offset += len(noise)
+            value = rng.getrandbits(rng.choice((32, 128)))
+            if value > ipv4.MAX_IP:
+                addr, family = ipv6.long2ip(value), 6
+            else:
+                addr, family = ipv4.long2ip(value), 4
+            text = rng.choice(('%s ', '[%s]:80 ', '(%s). ', 'ip:%s\n')) % addr
+            if family == 4 and rng.random() < 0.3:
+                text = '%s:8080 ' % addr
+            self.expect.append((offset + text.index(addr), value, family))
+            parts.append(text)
+            offset += len(text)
+        self.text = ''.join(parts)
+    # end setUp
+
+    def testFindAddresses(self):
+        self.assertEqual(self.expect, extract.find_addresses(self.text))
+        self.assertEqual(
+            self.expect, extract.find_addresses(self.text.encode('ascii')))
+        self.assertEqual([], extract.find_addresses(
+            'std::b 1.2.3.4.5 999.1.1.1 10.0.0.1x ::ffff:1.2.3 12:34:56'))
+    # end testFindAddresses
+
+    def testRangeFilter(self):
+        ranges = iptools.IpRangeList('0/1', '8000::/1')
+        found = extract.find_addresses(self.text, ranges)
+        self.assertEqual(
+            [e for e in self.expect
+                if iptools.IpAddress(e[1], e[2]) in ranges],
+            found)
+        self.assertTrue(0 < len(found) < len(self.expect))
+    # end testRangeFilter
+
+    def testIterAddresses(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'text')
+            with open(path, 'w') as f:
+                f.write(self.text)
+            self.assertEqual(self.expect, list(extract.iter_addresses(path)))
+            for chunk_size in (1, 7, 100, 4096):
+                with open(path) as f:
+                    self.assertEqual(self.expect, list(
+                        extract.iter_addresses(f, chunk_size=chunk_size)))
+        finally:
+            shutil.rmtree(tmpdir)
+    # end testIterAddresses
+
+    def testLongRuns(self):
+        text = ''.join((
+            'a ', 'Zm9v' * 5000, ':10.0.0.1 ', 'c0ffee' * 5000, ' ',
+            '2001:db8::1', '.' * 5000, ' 10.0.0.2', ':' * 5000, ' ',
+            '10.0.0.3:8080 10.0.0.4:123456 ', '10.0.0.5.', '1' * 100,
+        ))
+        expect = [
+            (20003, 167772161, 4),
+            (50013, 42540766411282592856903984951653826561, 6),
+            (60034, 167772163, 4),
+        ]
+        self.assertEqual(expect, extract.find_addresses(text))
+        data = text.encode('ascii')
+        for chunk_size in (1, 7, 64, 4096):
+            self.assertEqual(expect, list(extract.iter_addresses(
+                io.StringIO(data.decode('ascii')), chunk_size=chunk_size)))
+            self.assertEqual(expect, list(extract.iter_addresses(
+                io.BytesIO(data), chunk_size=chunk_size)))
+    # end testLongRuns
+# end class ExtractTests
+
+
+class PacketsTests(unittest.TestCase):
+
+    RANGES = iptools.IpRangeList(
+        '10/8', '192.0.2.0/24', '::ffff:ac10:0/108', 'fe80::/10')
+
+    def _records(self, version, count=300):
+        rng = random.Random(25 + version)
+        values = []
+        for _ in range(count):
+            if version == 4:
+                value = rng.choice((
+                    rng.getrandbits(32), ipv4.ip2long('10.0.0.0') +
+                    rng.getrandbits(24)))
+                pack = ipv4.ip2packed(ipv4.long2ip(value))
+            else:
+                value = rng.choice((
+                    rng.getrandbits(128), 0xffff00000000 + rng.getrandbits(32),
+                    ipv6.ip2long('fe80::') + rng.getrandbits(64),
+                    ipv6.ip2long('::ffff:172.16.0.0') + rng.getrandbits(20)))
+                pack = ipv6.ip2packed(ipv6.long2ip(value))
+            self.assertEqual(value, (ipv4, ipv6)[version == 6].packed2long(
+                memoryview(b'-' + pack)[1:]))
+            values.append(value)
+        return values
+    # end _records
+
+    def _check_match(self, version):
+        values = self._records(version)
+        size = 4 if version == 4 else 16
+        # header, then records of a padding byte, two fields and a trailer
+        stride = 2 * size + 3
+        data = bytearray(b'HDR')
+        pairs = list(zip(values, reversed(values)))
+        for src, dst in pairs:
+            for value in (src, dst):
+                if version == 4:
+                    field = ipv4.ip2packed(ipv4.long2ip(value))
+                else:
+                    field = ipv6.ip2packed(ipv6.long2ip(value))
+                data += (b'x' if value == src else b'') + field
+            data += b'yz'
+        self.assertEqual(pairs, list(packets.iter_records(
+            data, stride, (1, 1 + size), version, start=3)))
+
+        expect = []
+        for src, dst in pairs:
+            flags = 0
+            for bit, value in enumerate((src, dst)):
+                if iptools.IpAddress(value, version) in self.RANGES:
+                    flags |= 1 << bit
+            expect.append(flags)
+        self.assertTrue(0 < expect.count(3) and 0 < expect.count(0))
+        offsets = (1, 1 + size)
+        found = packets.match_records(
+            self.RANGES, data, stride, offsets, version, start=3)
+        self.assertEqual(expect, list(found))
+        saved = packets.numpy
+        packets.numpy = None
+        try:
+            found = packets.match_records(
+                self.RANGES, data, stride, offsets, version, start=3)
+        finally:
+            packets.numpy = saved
+        self.assertEqual(expect, list(found))
+        self.assertEqual(expect[10:20], list(packets.match_records(
+            self.RANGES, data, stride, offsets, version,
+            start=3 + 10 * stride, count=10)))
+    # end _check_match
+
+    def testMatchIpv4Records(self):
+        self._check_match(4)
+    # end testMatchIpv4Records
+
+    def testMatchIpv6Records(self):
+        self._check_match(6)
+    # end testMatchIpv6Records
+
+    def testMatchEmptyAndOverlappingFamilies(self):
+        # small integer IPv6 ranges hold IPv4 values and the reverse
+        ranges = iptools.IpRangeList(('::100:0', '::1ff:ffff'), '10/8')
+        v4 = [ipv4.ip2long(ip) for ip in ('1.2.3.4', '10.0.0.1', '11.0.0.1')]
+        v6 = [ipv6.ip2long(ip) for ip in (
+            '::1.2.3.4', '::10.0.0.1', '::ffff:10.0.0.1', '::ffff:1.2.3.4',
+            'fe80::1')]
+        data4 = b''.join(ipv4.ip2packed(ipv4.long2ip(v)) for v in v4)
+        data6 = b''.join(ipv6.ip2packed(ipv6.long2ip(v)) for v in v6)
+        saved = packets.numpy
+        try:
+            for numpy_module in (saved, None):
+                packets.numpy = numpy_module
+                for data, version, values in (
+                        (data4, 4, v4), (data6, 6, v6)):
+                    expect = [
+                        int(iptools.IpAddress(v, version) in ranges)
+                        for v in values]
+                    self.assertTrue(0 in expect and 1 in expect)
+                    size = len(data) // len(values)
+                    self.assertEqual(expect, list(packets.match_records(
+                        ranges, data, size, (0,), version)))
+                    self.assertEqual(bytearray(), packets.match_records(
+                        ranges, b'', size, (0,), version))
+                    self.assertEqual(bytearray(), packets.match_records(
+                        ranges, b'HDR' + data, size, (0,), version, start=3,
+                        count=0))
+        finally:
+            packets.numpy = saved
+    # end testMatchEmptyAndOverlappingFamilies
+
+    def testInvalidLayouts(self):
+        data = b'\x00' * 64
+        self.assertRaises(
+            ValueError, packets.match_records, self.RANGES, data, 8, (6,))
+        self.assertRaises(
+            ValueError, packets.match_records, self.RANGES, data, 8, (0,), 5)
+        self.assertRaises(
+            ValueError, packets.match_records, self.RANGES, data, 8, (0,),
+            count=9)
+        self.assertRaises(
+            ValueError, packets.match_records, self.RANGES, data, 1,
+            (0,) * 9)
+        self.assertEqual(None, ipv4.packed2long(b'\x00' * 16))
+        self.assertEqual(None, ipv6.packed2long(b'\x00' * 4))
+    # end testInvalidLayouts
+
+    def testPcapReader(self):
+        src4, dst4 = ipv4.ip2packed('10.0.0.1'), ipv4.ip2packed('192.0.2.1')
+        src6, dst6 = ipv6.ip2packed('fe80::1'), ipv6.ip2packed('2001:db8::1')
+        ip4 = b'\x45' + b'\x00' * 11 + src4 + dst4
+        ip6 = b'\x60' + b'\x00' * 7 + src6 + dst6
+        frames = {
+            packets.LINKTYPE_ETHERNET: (
+                b'\x00' * 12 + b'\x08\x00' + ip4,
+                b'\x00' * 12 + b'\x81\x00\x00\x05\x86\xdd' + ip6,
+                b'\x00' * 12 + b'\x08\x06' + b'\x00' * 28,
+                b'\x00' * 12 + b'\x08\x00' + ip4[:15],
+            ),
+            packets.LINKTYPE_LINUX_SLL: (
+                b'\x00' * 14 + b'\x08\x00' + ip4,
+                b'\x00' * 14 + b'\x86\xdd' + ip6,
+            ),
+            packets.LINKTYPE_NULL: (b'\x02\x00\x00\x00' + ip4,),
+            packets.LINKTYPE_RAW: (ip6, ip4),
+        }
+        expect4 = (4, ipv4.ip2long('10.0.0.1'), ipv4.ip2long('192.0.2.1'))
+        expect6 = (6, ipv6.ip2long('fe80::1'), ipv6.ip2long('2001:db8::1'))
+        tmpdir = tempfile.mkdtemp()
+        try:
+            for order, magic, fraction, scale in (
+                    ('<', 0xa1b2c3d4, 250000, 1e-6),
+                    ('>', 0xa1b23c4d, 250000000, 1e-9)):
+                for linktype, packets_ in frames.items():
+                    path = os.path.join(tmpdir, 'capture.pcap')
+                    with open(path, 'wb') as f:
+                        f.write(struct.pack(
+                            order + 'IHHiIII', magic, 2, 4, 0, 0, 65535,
+                            linktype))
+                        for i, data in enumerate(packets_):
+                            f.write(struct.pack(
+                                order + 'IIII', 1000 + i, fraction, len(data),
+                                len(data)))
+                            f.write(data)
+                    with packets.PcapReader(path) as pcap:
+                        self.assertEqual(linktype, pcap.linktype)
+                        self.assertEqual(scale, pcap.resolution)
+                        read = list(pcap)
+                    self.assertEqual(list(packets_), [d for t, d in read])
+                    self.assertEqual(
+                        [1000.25 + i for i in range(len(packets_))],
+                        [t for t, d in read])
+                    with packets.PcapReader(path) as pcap:
+                        found = [a[1:] for a in pcap.addresses()]
+                    self.assertEqual(
+                        [a for a in (packets.packet_addresses(d, linktype)
+                                     for d in packets_) if a is not None],
+                        found)
+                    self.assertTrue(expect4 in found or expect6 in found)
+
+            with open(path, 'ab') as f:
+                f.write(b'\x00' * 5)
+            with packets.PcapReader(path) as pcap:
+                self.assertRaises(ValueError, list, pcap)
+            with open(path, 'wb') as f:
+                f.write(b'\x0a\x0d\x0d\x0a' + b'\x00' * 28)
+            self.assertRaises(ValueError, packets.PcapReader, path)
+        finally:
+            shutil.rmtree(tmpdir)
+        self.assertRaises(
+            ValueError, packets.packet_addresses, ip4, 9999)
+    # end testPcapReader
+# end class PacketsTests
+
+
+class ParseCacheTests(unittest.TestCase):
+
+    def tearDown(self):
+        iptools.disable_parse_cache()
+    # end tearDown
+
+    def testLeastRecentlyUsedEviction(self):
+        cache = iptools.ParseCache(maxsize=2)
+        cache.lookup('10.0.0.1')
+        cache.lookup('10.0.0.2')
+        cache.lookup('10.0.0.1')
+        cache.lookup('10.0.0.3')
+        self.assertEqual(2, len(cache))
+        self.assertEqual(1, cache.info().evictions)
+        cache.lookup('10.0.0.1')
+        self.assertEqual(2, cache.info().hits)
+        cache.lookup('10.0.0.2')
+        self.assertEqual(4, cache.info().misses)
+    # end testLeastRecentlyUsedEviction
+
+    def testCachedMembershipMatchesUncached(self):
+        fixture = iptools.IpRangeList('10/8', '::ffff:0:0/96', 'fe80::/10')
+        addresses = (
+            '10.1.2.3', '11.0.0.1', '::ffff:10.0.0.1', 'fe80::1', '::1',
+            'invalid',
+        )
+        expect = [ip in fixture for ip in addresses if ip != 'invalid']
+        iptools.enable_parse_cache(maxsize=4)
+        for _ in range(3):
+            self.assertEqual(
+                expect,
+                [ip in fixture for ip in addresses if ip != 'invalid'])
+        self.assertRaises(TypeError, fixture.__contains__, 'invalid')
+        self.assertEqual(4, len(iptools.get_parse_cache()))
+    # end testCachedMembershipMatchesUncached
+
+    def testThreadedLookups(self):
+        cache = iptools.ParseCache(maxsize=64)
+        addresses = ['10.0.%d.%d' % (i // 256, i % 256) for i in range(128)]
+        errors = []
+
+        def worker():
+            for ip in addresses * 4:
+                if cache.lookup(ip) != (ipv4.ip2long(ip), 4):
+                    errors.append(ip)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual([], errors)
+        info = cache.info()
+        self.assertEqual(4 * 4 * 128, info.hits + info.misses)
+        self.assertEqual(64, info.currsize)
+    # end testThreadedLookups
+# end class ParseCacheTests
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class Ipv4ArrayTests(unittest.TestCase):
+
+    ADDRESSES = (
+        '127.0.0.1', '0.0.0.0', '255.255.255.255', '010.001.000.009',
+        '256.0.0.1', '1.2.3', '1.2.3.4.5', '1..2.3', '.1.2.3', '1.2.3.',
+        '1.2.3.0004', 'a.b.c.d', ' 1.2.3.4', '', '1.2.3.4567890123456',
+        '1.2.3.4\x00', '1.2.3.4\x00\x00', '1.2\x00.3.4', '\x00',
+    )
+
+    def testIp2longArrayMatchesIp2long(self):
+        values, valid = ipv4.ip2long_array(self.ADDRESSES, batch_size=4)
+        self.assertEqual(values.dtype, numpy.uint32)
+        for ip, value, ok in zip(self.ADDRESSES, values, valid):
+            expect = ipv4.ip2long(ip, strict=True)
+            self.assertEqual(expect is not None, ok, ip)
+            self.assertEqual(expect or 0, value, ip)
+    # end testIp2longArrayMatchesIp2long
+
+    def testIp2longArrayFromBuffer(self):
+        buf = '\r\n'.join(self.ADDRESSES).encode('ascii') + b'\n'
+        values, valid = ipv4.ip2long_array(buf, batch_size=4)
+        expect = ipv4.ip2long_array(self.ADDRESSES)
+        self.assertEqual(values.tolist(), expect[0].tolist())
+        self.assertEqual(valid.tolist(), expect[1].tolist())
+        self.assertEqual(ipv4.ip2long_array(b'')[0].size, 0)
+    # end testIp2longArrayFromBuffer
+
+    def testLong2ipArray(self):
+        values = [0, 2130706433, ipv4.MAX_IP]
+        self.assertEqual(
+            ipv4.long2ip_array(numpy.array(values, dtype=numpy.uint32))
+            .tolist(),
+            [ipv4.long2ip(v) for v in values])
+        self.assertRaises(TypeError, ipv4.long2ip_array, [ipv4.MAX_IP + 1])
+        grid = numpy.array([values, values[::-1]], dtype=numpy.uint32)
+        self.assertEqual(
+            [[ipv4.long2ip(v) for v in row] for row in grid.tolist()],
+            ipv4.long2ip_array(grid).tolist())
+        self.assertEqual(
+            '127.0.0.1', ipv4.long2ip_array(numpy.uint32(2130706433))[()])
+    # end testLong2ipArray
+# end class Ipv4ArrayTests
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class Ipv6ArrayTests(unittest.TestCase):
+
+    ADDRESSES = (
+        '::', '::1', '::ffff:10.1.2.3', '::ffff:172.16.1.1', '10.1.2.3',
+        '2001:db8::1', '2001:db8:ffff:ffff:ffff:ffff:ffff:ffff',
+        '2001:db9::', 'fe80::1', 'ffff:ffff:ffff:ffff:ffff:ffff:ffff:ffff',
+    )
+
+    def testRoundTrip(self):
+        arr, valid = ipv6.ip2long_array(self.ADDRESSES)
+        self.assertEqual(arr.dtype, ipv6.ARRAY_DTYPE)
+        self.assertEqual(
+            [ipv6.ip2long(ip) for ip in self.ADDRESSES if ':' in ip],
+            ipv6.array2long(arr[valid]))
+        self.assertEqual(
+            [ipv6.long2ip(ipv6.ip2long(ip))
+                for ip in self.ADDRESSES if ':' in ip],
+            ipv6.long2ip_array(arr[valid]).tolist())
+        self.assertEqual(
+            ipv6.array2long(arr[valid]),
+            ipv6.array2long(ipv6.long2array(ipv6.array2long(arr[valid]))))
+        grid = arr[valid][:6].reshape(2, 3)
+        self.assertEqual(
+            [[ipv6.long2ip(v) for v in ipv6.array2long(row)] for row in grid],
+            ipv6.long2ip_array(grid).tolist())
+        self.assertEqual('::1', ipv6.long2ip_array(arr[1])[()])
+    # end testRoundTrip
+
+    def testCidr2blockArray(self):
+        arr, valid = ipv6.ip2long_array(self.ADDRESSES)
+        arr = arr[valid]
+        for prefix in (0, 1, 32, 63, 64, 65, 96, 127, 128):
+            start, end = ipv6.cidr2block_array(arr, prefix)
+            for lngip, s, e in zip(
+                    ipv6.array2long(arr), ipv6.array2long(start),
+                    ipv6.array2long(end)):
+                expect = ipv6.cidr2block('%s/%d' % (
+                    ipv6.long2ip(lngip), prefix))
+                self.assertEqual(
+                    expect, (ipv6.long2ip(s), ipv6.long2ip(e)))
+    # end testCidr2blockArray
+
+    def testCompareArray(self):
+        values = [0, 1, 2 ** 64, 2 ** 64 + 1, ipv6.MAX_IP]
+        a = ipv6.long2array(values)
+        b = ipv6.long2array(list(reversed(values)))
+        expect = [(x > y) - (x < y) for x, y in zip(values, reversed(values))]
+        self.assertEqual(expect, ipv6.compare_array(a, b).tolist())
+    # end testCompareArray
+
+    def testContainsMany(self):
+        arr, valid = ipv6.ip2long_array(self.ADDRESSES)
+        fixtures = (
+            iptools.IpRangeList(
+                '10/8', '::ffff:ac10:0/108', '2001:db8::/32', '::1'),
+            iptools.IpRangeList('::/0'),
+            iptools.IpRangeList(),
+            iptools.IpRange('10/8'),
+            iptools.IpRange('2001:db8::/32'),
+        )
+        for fixture in fixtures:
+            expect = [v in fixture for v in ipv6.array2long(arr)]
+            self.assertEqual(
+                expect, fixture.contains_many(arr).tolist(), fixture)
+    # end testContainsMany
+# end class Ipv6ArrayTests
+
 # vim:se sw=4 ts=4 sts=4 et: